@@ -0,0 +1,218 @@
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+from contextlib import nullcontext
+from datetime import date
+
+
+# Shortest stay worth selling; free runs shorter than this between two stays are stranded.
+MIN_STAY = 2
+_UNBOUNDED = float("inf")
+
+Move = namedtuple("Move", ["booking_id", "from_room", "to_room", "check_in", "check_out"])
+
+
+class RoomAssigner:
+    """
+    Best-fit placement of stays booked by room class into concrete rooms.
+
+    A stay goes to the free room of its class where it leaves no stranded
+    nights (free runs shorter than ``min_stay``), then where it closes or
+    extends an existing gap rather than splitting one, then where the
+    enclosing gap is tightest. reoptimize() re-packs the flexible future
+    stays of each class in one sweep in check-in order: each stay takes the
+    room whose last stay ended closest before it arrives, so free nights
+    collect into long runs instead of scattered single nights.
+    """
+    def __init__(self, inventory, min_stay=MIN_STAY, scan_limit=32, booking_service=None):
+        """
+        Initialize the assigner.
+        :param inventory: InventoryIndex, rooms grouped by class
+        :param min_stay: int, shortest free run that can still be sold
+        :param scan_limit: int, candidate rooms tried per stay during reoptimize()
+        :param booking_service: BookingService, whose room locks reoptimize() holds while it re-packs
+        """
+        self._inventory = inventory
+        self._booking_service = booking_service
+        self._min_stay = min_stay
+        self._scan_limit = scan_limit
+
+    def _stranded(self, *gaps):
+        return sum(gap for gap in gaps if gap is not None and 0 < gap < self._min_stay)
+
+    def best_room(self, room_type, check_in, check_out, exclude=()):
+        """
+        Choose the room of a class that a stay fragments least.
+        :param room_type: class or str, e.g. Suite or "Suite"
+        :param check_in: date, check-in date
+        :param check_out: date, check-out date (exclusive)
+        :param exclude: collection, room numbers not to consider
+        :return: Room object, or None if no room of the class is free
+        """
+        start, end = check_in.toordinal(), check_out.toordinal()
+        best, best_score = None, None
+        for room in self._inventory.rooms_of_type(room_type):
+            if room.room_number in exclude or not room.is_available_for(start, end):
+                continue
+            previous_end, next_start = room.stays.free_gap(start, end)
+            before = None if previous_end is None else start - previous_end
+            after = None if next_start is None else next_start - end
+            # -1 closes a gap exactly, 0 fills one end of it, 1 splits it in two.
+            splits = (before != 0) + (after != 0) - 1
+            gap = (_UNBOUNDED if before is None else before) + (_UNBOUNDED if after is None else after)
+            score = (self._stranded(before, after), splits, gap,
+                     _UNBOUNDED if before is None else before, room.room_number)
+            if best_score is None or score < best_score:
+                best, best_score = room, score
+        return best
+
+    def fragmentation(self, intervals, cutoff):
+        """
+        Measure how fragmented the free nights between stays are.
+        :param intervals: iterable, per room, (start, end) ordinal pairs sorted by start
+        :param cutoff: int, ordinal of the first night considered
+        :return: tuple, (stranded nights, free runs between stays)
+        """
+        stranded = runs = 0
+        for stays in intervals:
+            previous_end = None
+            for start, end in stays:
+                if end <= cutoff:
+                    continue
+                if previous_end is not None and start > previous_end:
+                    runs += 1
+                    stranded += self._stranded(start - previous_end)
+                previous_end = end
+        return stranded, runs
+
+    def reoptimize(self, movable, today):
+        """
+        Re-pack flexible future stays to lengthen the free runs of every room class.
+
+        Stays checking in after ``today`` whose booking is in ``movable`` are
+        lifted out and placed again; every other stay keeps its room. A class
+        is only re-packed when every lifted stay finds a room and the result
+        strands fewer nights (or, failing that, leaves fewer free runs). With a
+        booking service, each class is planned and moved while holding its
+        rooms' booking locks, so concurrent bookings wait for the move and
+        then see the new layout; without one, run this while no bookings are
+        being taken.
+        :param movable: collection, IDs of the bookings whose room may change
+        :param today: date, business date; only stays checking in later are moved
+        :return: tuple, (list of Move tuples, dict of run statistics)
+        """
+        started = time.perf_counter()
+        cutoff = today.toordinal() + 1
+        moves = []
+        stats = {"room_types": 0, "movable": 0, "moved": 0, "stranded_before": 0, "stranded_after": 0,
+                 "free_runs_before": 0, "free_runs_after": 0}
+        for room_type in self._inventory.room_types():
+            rooms = sorted(self._inventory.rooms_of_type(room_type), key=lambda room: room.room_number)
+            with self._booking_service.locked(rooms) if self._booking_service else nullcontext():
+                current = [[(start, end) for start, end, _ in room.stays] for room in rooms]
+                before = self.fragmentation(current, cutoff)
+                plan = self._repack(rooms, movable, cutoff)
+                after = before
+                if plan is not None:
+                    placed, layout = plan
+                    after = self.fragmentation(layout, cutoff)
+                    stats["movable"] += len(placed)
+                    if after < before:
+                        moves.extend(self._apply(rooms, placed))
+                    else:
+                        after = before
+            stats["room_types"] += 1
+            stats["stranded_before"] += before[0]
+            stats["stranded_after"] += after[0]
+            stats["free_runs_before"] += before[1]
+            stats["free_runs_after"] += after[1]
+        stats["moved"] = len(moves)
+        stats["seconds"] = time.perf_counter() - started
+        return moves, stats
+
+    def _repack(self, rooms, movable, cutoff):
+        """
+        Sweep the stays of one class in check-in order and place the movable ones best-fit.
+        :return: tuple, (list of (start, end, booking_id, from_index, to_index), per-room sorted
+                 intervals), or None if nothing is movable or some stay could not be placed
+        """
+        events, lifted = [], []
+        fixed = [[] for _ in rooms]
+        for index, room in enumerate(rooms):
+            for start, end, booking_id in room.stays:
+                if end <= cutoff:
+                    continue
+                if start >= cutoff and booking_id in movable:
+                    lifted.append((start, end, booking_id, index))
+                else:
+                    fixed[index].append((start, end))
+                    events.append((start, 0, -end, index))
+        if not lifted:
+            return None
+        # On equal check-in, fixed stays claim their room first, then longer movable stays go first.
+        events.extend((start, 1, start - end, position) for position, (start, end, _, _) in enumerate(lifted))
+        events.sort()
+
+        frontier = [cutoff] * len(rooms)
+        free = sorted((cutoff, index) for index, room in enumerate(rooms) if room.is_available)
+        placed = []
+        for start, kind, negative, position in events:
+            if kind == 0:
+                index = position
+                if rooms[index].is_available:
+                    del free[bisect_left(free, (frontier[index], index))]
+                    insort(free, (-negative, index))
+                frontier[index] = -negative
+                continue
+            end = start - negative
+            best = best_score = None
+            scored = 0
+            for slot in range(bisect_right(free, (start, _UNBOUNDED)) - 1, -1, -1):
+                index = free[slot][1]
+                stays = fixed[index]
+                following = bisect_left(stays, (start,))
+                next_start = stays[following][0] if following < len(stays) else None
+                if next_start is not None and next_start < end:
+                    continue
+                if scored == self._scan_limit:
+                    break
+                scored += 1
+                # A frontier still at the cutoff means the room has no stay before this one.
+                before = None if frontier[index] == cutoff else start - frontier[index]
+                score = self._stranded(before, None if next_start is None else next_start - end)
+                if best_score is None or score < best_score:
+                    best, best_score = slot, score
+                    if not score:
+                        break
+            if best is None:
+                return None
+            index = free.pop(best)[1]
+            frontier[index] = end
+            insort(free, (end, index))
+            lifted_start, lifted_end, booking_id, from_index = lifted[position]
+            placed.append((lifted_start, lifted_end, booking_id, from_index, index))
+
+        layout = fixed
+        for start, end, _, _, index in placed:
+            layout[index].append((start, end))
+        for stays in layout:
+            stays.sort()
+        return placed, layout
+
+    @staticmethod
+    def _apply(rooms, placed):
+        """
+        Move the re-packed stays: release every old stay first so swaps between rooms never collide.
+        Callers hold the rooms' booking locks; each change bumps the room version, so optimistic
+        readers retry.
+        :return: list, Move tuples of the stays whose room changed
+        """
+        moved = [stay for stay in placed if stay[3] != stay[4]]
+        for start, end, _, from_index, _ in moved:
+            rooms[from_index].release(start, end)
+        moves = []
+        for start, end, booking_id, from_index, to_index in moved:
+            rooms[to_index].reserve(start, end, booking_id)
+            moves.append(Move(booking_id, rooms[from_index].room_number, rooms[to_index].room_number,
+                              date.fromordinal(start), date.fromordinal(end)))
+        return moves
@@ -0,0 +1,1134 @@
+import argparse
+import functools
+import inspect
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from hotel.ids import configure as configure_ids
+from hotel.room import SingleRoom, DoubleRoom, Suite
+
+
+ROOM_TYPES = (SingleRoom, DoubleRoom, Suite)
+
+
+def _best_of(func, repeat=5):
+    """
+    Run a callable several times and return the fastest wall time in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def make_rooms(count):
+    """
+    Build a synthetic inventory cycling through the room classes.
+    :param count: int, number of rooms
+    :return: list, Room objects numbered from 1
+    """
+    return [ROOM_TYPES[i % len(ROOM_TYPES)](i + 1) for i in range(count)]
+
+
+def fill_stays(rooms, start_date, days, seed=0):
+    """
+    Reserve random back-to-back stays in every room across a window.
+    :param rooms: list, Room objects to fill
+    :param start_date: date, first night of the window
+    :param days: int, length of the window
+    :param seed: int, random seed for reproducible data
+    """
+    rng = random.Random(seed)
+    origin = start_date.toordinal()
+    for room in rooms:
+        cursor = origin + rng.randint(0, 5)
+        while cursor < origin + days:
+            nights = rng.randint(1, 7)
+            room.reserve(cursor, min(cursor + nights, origin + days))
+            cursor += nights + rng.randint(0, 6)
+
+
+# Data sizes for bench_hot_paths; "production" is the size of the largest property group.
+SCALES = {
+    "small": {"rooms": 1000, "guests": 10000, "bookings": 100000, "feedback": 10000},
+    "medium": {"rooms": 10000, "guests": 100000, "bookings": 1000000, "feedback": 100000},
+    "production": {"rooms": 10000, "guests": 1000000, "bookings": 10000000, "feedback": 1000000},
+}
+
+_AMENITY_CHOICES = ("WiFi", "TV", "Air Conditioning", "Mini Bar", "Balcony", "Sea View")
+_FEEDBACK_WORDS = ("great", "clean", "friendly", "staff", "noisy", "dirty", "slow", "breakfast", "pool",
+                   "view", "bed", "comfortable", "wifi", "check-in", "parking", "quiet", "spa", "expensive")
+
+
+def make_guests(count, seed=0):
+    """
+    Build synthetic guests with distinct names, emails and phone numbers.
+    :param count: int, number of guests
+    :param seed: int, random seed for reproducible data
+    :return: list, Guest objects with IDs "00000000", "00000001", ...
+    """
+    from hotel.guest import Guest
+
+    rng = random.Random(seed)
+    first = ("Ada", "Ben", "Chen", "Dana", "Eli", "Fatima", "Goran", "Hana", "Ivan", "Jia", "Kofi", "Lena")
+    return [Guest(f"{i:08x}", f"{rng.choice(first)} Guest{i}", f"guest{i}@example.com", f"555{i:07d}")
+            for i in range(count)]
+
+
+def make_bookings(rooms, guests, count, start_date, seed=0):
+    """
+    Generate paid, invoiced bookings as back-to-back stays spread evenly across the rooms.
+
+    Each booking is reserved on its room and added to its guest's history as
+    it is generated, so the stream can be consumed without keeping a list.
+    :param rooms: list, Room objects to book
+    :param guests: list, Guest objects making the bookings
+    :param count: int, number of bookings
+    :param start_date: date, first night of the booking window
+    :param seed: int, random seed for reproducible data
+    :return: generator, Booking objects
+    """
+    from hotel.booking import Booking, CreditCardPayment, MobileWalletPayment
+
+    rng = random.Random(seed)
+    cursors = [start_date.toordinal() + rng.randint(0, 3) for _ in rooms]
+    for i in range(count):
+        slot = i % len(rooms)
+        room = rooms[slot]
+        check_in, nights = cursors[slot], rng.randint(1, 5)
+        cursors[slot] = check_in + nights + rng.randint(0, 1)
+        booking_id = f"{i:08x}"
+        guest = rng.choice(guests)
+        booking = Booking(guest, room, date.fromordinal(check_in), date.fromordinal(check_in + nights), booking_id)
+        amount = room.price_per_night * nights
+        if rng.random() < 0.7:
+            payment = CreditCardPayment(amount, "4111111111111111", "12/30", str(booking.check_in_date), booking_id)
+        else:
+            payment = MobileWalletPayment(amount, "PayNow", guest.contact, str(booking.check_in_date), booking_id)
+        booking.set_payment(payment)
+        booking.generate_invoice()
+        room.reserve(check_in, check_in + nights, booking_id)
+        guest.make_booking(booking)
+        yield booking
+
+
+def make_feedback(count, start_date, days=365, room_types=("SingleRoom", "DoubleRoom", "Suite"), seed=0):
+    """
+    Generate feedback entries with skewed ratings and keyword comments across a date range.
+    :param count: int, number of entries
+    :param start_date: date, first feedback date
+    :param days: int, length of the date range
+    :param room_types: tuple, room class names the feedback is linked to
+    :param seed: int, random seed for reproducible data
+    :return: generator, Feedback objects in date order
+    """
+    from hotel.services import Feedback
+
+    rng = random.Random(seed)
+    origin = start_date.toordinal()
+    for i in range(count):
+        day = date.fromordinal(origin + i * days // count)
+        yield Feedback(rng.choice((1, 2, 3, 4, 4, 5, 5, 5)), " ".join(rng.sample(_FEEDBACK_WORDS, 5)),
+                       f"Guest{i}", day.isoformat(), f"{i:08x}", rng.choice(room_types))
+
+
+def bench_occupancy(room_count=10000, days=730, repeat=5):
+    """
+    Compare the occupancy matrix against a Python scan of the room list.
+    :param room_count: int, number of rooms
+    :param days: int, calendar window in nights
+    :param repeat: int, timing repetitions per query
+    :return: dict, timings in seconds
+    """
+    from hotel.occupancy import OccupancyMatrix
+
+    start = date(2026, 1, 1)
+    rooms = make_rooms(room_count)
+    fill_stays(rooms, start, days)
+    matrix = OccupancyMatrix.from_rooms(rooms, start, days)
+    check_in, check_out = start + timedelta(days=200), start + timedelta(days=203)
+
+    def scan_free_rooms():
+        return [room.room_number for room in rooms
+                if isinstance(room, DoubleRoom) and room.is_available_for(check_in, check_out)]
+
+    def scan_free_counts():
+        return [sum(1 for room in rooms if room.is_available_for(night, night + 1))
+                for night in range(start.toordinal(), start.toordinal() + 365)]
+
+    assert sorted(scan_free_rooms()) == sorted(matrix.free_rooms(check_in, check_out, DoubleRoom).tolist())
+    return {
+        "rooms": room_count,
+        "days": days,
+        "free_rooms_scan": _best_of(scan_free_rooms, repeat),
+        "free_rooms_matrix": _best_of(lambda: matrix.free_rooms(check_in, check_out, DoubleRoom), repeat),
+        "free_counts_scan": _best_of(scan_free_counts, 1),
+        "free_counts_matrix": _best_of(lambda: matrix.free_count_per_night(start, 365), repeat),
+    }
+
+
+def stress_concurrent_bookings(room_count=200, requests=20000, workers=32, seed=0):
+    """
+    Drive parallel bookings through BookingService and verify none overlap.
+    :param room_count: int, number of rooms competing requests target
+    :param requests: int, number of booking attempts
+    :param workers: int, thread pool size
+    :param seed: int, random seed for reproducible requests
+    :return: dict, committed/rejected counts, retries, committed bookings and attempts per second
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from hotel.guest import Guest
+    from hotel.booking import Booking
+    from hotel.booking_service import BookingService, BookingConflictError
+
+    rng = random.Random(seed)
+    rooms = make_rooms(room_count)
+    service = BookingService(rooms)
+    guests = [Guest(f"g{i}", f"Guest {i}", f"g{i}@example.com", "555") for i in range(workers * 4)]
+    start = date(2026, 1, 1)
+    attempts = []
+    for i in range(requests):
+        check_in = start + timedelta(days=rng.randint(0, 90))
+        attempts.append(Booking(rng.choice(guests), rng.choice(rooms), check_in,
+                                check_in + timedelta(days=rng.randint(1, 5)), f"b{i}"))
+
+    def attempt(booking):
+        try:
+            return service.book(booking)
+        except BookingConflictError:
+            return None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        committed = [booking for booking in pool.map(attempt, attempts) if booking is not None]
+    seconds = time.perf_counter() - started
+
+    by_room = {}
+    for booking in committed:
+        by_room.setdefault(booking.room.room_number, []).append(booking)
+    double_bookings = 0
+    for stays in by_room.values():
+        stays.sort(key=lambda booking: booking.check_in_date)
+        double_bookings += sum(1 for before, after in zip(stays, stays[1:])
+                               if after.check_in_date < before.check_out_date)
+    assert double_bookings == 0, f"{double_bookings} double bookings"
+    assert sum(len(guest.bookings) for guest in guests) == len(committed)
+    return {
+        "attempts": requests,
+        "committed": len(committed),
+        "rejected": requests - len(committed),
+        "retries": service.retries,
+        "double_bookings": double_bookings,
+        "seconds": seconds,
+        "bookings_per_second": len(committed) / seconds,
+        "attempts_per_second": requests / seconds,
+    }
+
+
+def bench_memory(count=200000, seed=0):
+    """
+    Measure bytes per archived booking: dict-backed objects, slotted objects and the column store.
+    :param count: int, number of bookings to build
+    :param seed: int, random seed for reproducible data
+    :return: dict, bytes per booking for each representation
+    """
+    import gc
+    import tracemalloc
+    from hotel.guest import Guest
+    from hotel.booking import Booking, CreditCardPayment
+    from hotel.booking_store import BookingStore
+
+    # The pre-__slots__ layout: same constructor, but every instance carries a __dict__.
+    LegacyBooking = type("LegacyBooking", (), {"__init__": Booking.__init__, "set_payment": Booking.set_payment})
+
+    rng = random.Random(seed)
+    rooms = make_rooms(1000)
+    guests = [Guest(f"{i:08x}", f"Guest {i}", f"g{i}@example.com", "555") for i in range(10000)]
+    origin = date(2024, 1, 1).toordinal()
+    specs = []
+    for i in range(count):
+        check_in = origin + rng.randint(0, 730)
+        specs.append((rng.choice(guests), rng.choice(rooms), check_in, check_in + rng.randint(1, 7), f"{i:08x}"))
+
+    def build(cls):
+        bookings = []
+        for guest, room, check_in, check_out, booking_id in specs:
+            booking = cls(guest, room, date.fromordinal(check_in), date.fromordinal(check_out), booking_id)
+            booking.set_payment(CreditCardPayment(room.price_per_night, "4111", "01/30", "2024-01-01", booking_id))
+            bookings.append(booking)
+        return bookings
+
+    def measure(factory):
+        gc.collect()
+        tracemalloc.start()
+        result = factory()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return result, size / count
+
+    _, legacy = measure(lambda: build(LegacyBooking))
+    bookings, slotted = measure(lambda: build(Booking))
+
+    def archive():
+        store = BookingStore()
+        store.extend(bookings)
+        return store
+
+    store, columns = measure(archive)
+    assert store.record(0).booking_id == bookings[0].booking_id
+    return {
+        "bookings": count,
+        "bytes_per_booking_dict": legacy,
+        "bytes_per_booking_slots": slotted,
+        "bytes_per_booking_columns": columns,
+    }
+
+
+def bench_reporting(count=300000, room_count=2000, seed=0, repeat=3):
+    """
+    Compare the vectorized revenue report against a per-booking Python loop.
+    :param count: int, bookings across one year
+    :param room_count: int, rooms in inventory
+    :param seed: int, random seed for reproducible data
+    :param repeat: int, timing repetitions for the vectorized report
+    :return: dict, timings in seconds
+    """
+    import numpy as np
+    from hotel.reporting import BookingColumns, daily_occupancy, revenue_summary
+
+    rng = np.random.default_rng(seed)
+    origin = date(2025, 1, 1).toordinal()
+    check_ins = origin + rng.integers(0, 365, count)
+    columns = BookingColumns(rng.integers(1, room_count + 1, count), rng.integers(0, 3, count), check_ins,
+                             check_ins + rng.integers(1, 8, count), rng.choice([100.0, 150.0, 300.0], count),
+                             rng.integers(1, 3, count), ["SingleRoom", "DoubleRoom", "Suite"])
+    start, end = date(2025, 1, 1), date(2026, 1, 1)
+    rows = list(zip(columns.check_ins.tolist(), columns.check_outs.tolist(), columns.rates.tolist(),
+                    columns.room_types.tolist()))
+
+    def loop_report():
+        nightly_revenue, nightly_sold, by_type = {}, {}, {}
+        for check_in, check_out, rate, room_type in rows:
+            for night in range(max(check_in, start.toordinal()), min(check_out, end.toordinal())):
+                nightly_revenue[night] = nightly_revenue.get(night, 0.0) + rate
+                nightly_sold[night] = nightly_sold.get(night, 0) + 1
+                by_type[room_type] = by_type.get(room_type, 0.0) + rate
+        return nightly_revenue, nightly_sold, by_type
+
+    def vector_report():
+        return daily_occupancy(columns, start, end, room_count), revenue_summary(columns, start, end, room_count)
+
+    (daily, summary), (nightly_revenue, _, _) = vector_report(), loop_report()
+    assert abs(summary["revenue"] - sum(nightly_revenue.values())) < 1e-6 * summary["revenue"]
+    assert abs(daily["revenue"].sum() - summary["revenue"]) < 1e-6 * summary["revenue"]
+    return {
+        "bookings": count,
+        "report_loop": _best_of(loop_report, 1),
+        "report_vectorized": _best_of(vector_report, repeat),
+    }
+
+
+def bench_pricing(room_count=1000, nights=14, repeat=20):
+    """
+    Time quoting one stay across many rooms with cold and warm rate calendars.
+    :param room_count: int, rooms quoted per search
+    :param nights: int, length of the stay
+    :param repeat: int, timing repetitions
+    :return: dict, timings in seconds
+    """
+    from hotel.pricing import PricingEngine
+
+    start = date(2026, 1, 1)
+    rooms = make_rooms(room_count)
+    fill_stays(rooms, start, 120)
+    pricing = PricingEngine(rooms, weekend_multiplier=1.2, occupancy_surcharges=[(0.7, 1.1), (0.9, 1.25)])
+    pricing.add_season(date(2026, 2, 1), date(2026, 3, 1), 1.15)
+    check_in = date(2026, 2, 10)
+    check_out = check_in + timedelta(days=nights)
+    cold = _best_of(lambda: (pricing.set_weekend_multiplier(1.2), pricing.quote_many(rooms, check_in, check_out)),
+                    repeat)
+    return {
+        "rooms": room_count,
+        "nights": nights,
+        "quote_many_cold": cold,
+        "quote_many_warm": _best_of(lambda: pricing.quote_many(rooms, check_in, check_out), repeat),
+        "quote_per_room_warm": _best_of(lambda: [pricing.quote(room, check_in, check_out) for room in rooms], repeat),
+    }
+
+
+def bench_loyalty(accounts=200000, rows=3000000, seed=0):
+    """
+    Time ledger appends through account listeners and the nightly expiry and re-tiering run.
+    :param accounts: int, loyalty accounts
+    :param rows: int, ledger entries spread over the last three years
+    :param seed: int, random seed for reproducible data
+    :return: dict, timings in seconds
+    """
+    import numpy as np
+    from hotel.guest import LoyaltyAccount
+    from hotel.loyalty import LoyaltyLedger, EARN, REDEEM
+
+    today = date(2026, 1, 1)
+    ledger = LoyaltyLedger((LoyaltyAccount(f"{i:08x}") for i in range(accounts)), today=lambda: today)
+    rng = np.random.default_rng(seed)
+    # Bulk-load history straight into the columns; going through listeners is timed separately below.
+    numbers = rng.integers(0, accounts, rows)
+    kinds = np.where(rng.random(rows) < 0.9, EARN, REDEEM)
+    points = np.where(kinds == EARN, rng.integers(100, 2000, rows), -rng.integers(10, 100, rows))
+    ledger.account_numbers.extend(numbers.tolist())
+    ledger.days.extend(np.sort(rng.integers(today.toordinal() - 3 * 365, today.toordinal(), rows)).tolist())
+    ledger.points.extend(points.tolist())
+    ledger.kinds.extend(kinds.tolist())
+    ledger.references.extend([None] * rows)
+    account = LoyaltyAccount("bench")
+    ledger.register(account)
+    started = time.perf_counter()
+    for _ in range(100000):
+        account.earn_points(10, "stay")
+    append = (time.perf_counter() - started) / 100000
+    summary = ledger.run_nightly(today)
+    return {
+        "accounts": accounts,
+        "ledger_rows": summary["ledger_rows"],
+        "append_per_entry": append,
+        "nightly_run": summary["seconds"],
+        "expired_accounts": summary["expired_accounts"],
+        "promoted": summary["promoted"],
+        "demoted": summary["demoted"],
+    }
+
+
+def stress_dispatch(requests=20000, workers=16, service_time=0.0005, seed=0):
+    """
+    Push a check-out rush of service requests through the dispatcher and measure how it keeps up.
+    :param requests: int, requests submitted in one burst
+    :param workers: int, staff worker threads
+    :param service_time: float, seconds each simulated staff member spends on a request
+    :param seed: int, random seed for request types and guest tiers
+    :return: dict, throughput and queue metrics
+    """
+    from hotel.dispatch import ServiceDispatcher, TYPE_DEADLINES, TIER_CREDITS
+    from hotel.services import ServiceRequest
+
+    rng = random.Random(seed)
+    types = sorted(TYPE_DEADLINES) + ["Laundry"]
+    tiers = sorted(TIER_CREDITS)
+    dispatcher = ServiceDispatcher(workers, handler=lambda request: time.sleep(service_time))
+    dispatcher.start()
+    started = time.perf_counter()
+    for i in range(requests):
+        dispatcher.submit(ServiceRequest(rng.choice(types), "", request_id=str(i)), rng.choice(tiers))
+    dispatcher.stop()
+    elapsed = time.perf_counter() - started
+    stats = dispatcher.stats()
+    return {
+        "requests": requests,
+        "workers": workers,
+        "seconds": elapsed,
+        "per_hour": requests / elapsed * 3600,
+        "max_depth": stats["max_depth"],
+        "wait_p95": stats["wait_p95"],
+        "latency_p95": stats["latency_p95"],
+        "latency_max": stats["latency_max"],
+    }
+
+
+def _mint_and_check(node_id, count):
+    """
+    Mint IDs on one node and verify each is greater than the last and carries the node's ID.
+    :return: tuple, (IDs minted, violations)
+    """
+    from hotel.ids import IdAllocator, MAX_NODE_ID, SEQUENCE_BITS
+
+    next_int = IdAllocator(node_id).next_int
+    previous = next_int()
+    violations = 0
+    for _ in range(count - 1):
+        value = next_int()
+        if value <= previous or (value >> SEQUENCE_BITS) & MAX_NODE_ID != node_id:
+            violations += 1
+        previous = value
+    return count, violations
+
+
+def bench_ids(count=1000000, sample=5000000, seed=0):
+    """
+    Time ID minting against uuid4()[:8] and check a sample of allocated IDs for collisions.
+
+    The sample is minted on several nodes at once and checked directly with
+    np.unique; see bench_id_collisions for the long multi-process run.
+    :param count: int, IDs minted per throughput timing
+    :param sample: int, IDs compared directly for duplicates
+    :param seed: int, random seed for the uuid collision estimate
+    :return: dict, throughput and collision results
+    """
+    import uuid
+    import numpy as np
+    from hotel.ids import IdAllocator
+
+    allocator = IdAllocator(1)
+    timings = {
+        "uuid4_prefix_per_id": _best_of(lambda: [str(uuid.uuid4())[:8] for _ in range(count)], 3) / count,
+        "next_id_per_id": _best_of(lambda: [allocator.next_id() for _ in range(count)], 3) / count,
+        "next_int_per_id": _best_of(lambda: [allocator.next_int() for _ in range(count)], 3) / count,
+    }
+
+    nodes = [IdAllocator(node) for node in range(4)]
+    minted = np.fromiter((nodes[i % 4].next_int() for i in range(sample)), dtype=np.int64, count=sample)
+    sample_duplicates = sample - len(np.unique(minted))
+    rng = random.Random(seed)
+    prefixes = {format(rng.getrandbits(32), "08x") for _ in range(100000)}
+    return dict(timings, **{
+        "sample_ids": sample,
+        "sample_duplicates": sample_duplicates,
+        "uuid4_prefix_duplicates_per_100k": 100000 - len(prefixes),
+    })
+
+
+def bench_id_collisions(collision_count=200000000, processes=8):
+    """
+    Mint a large number of IDs across processes and check them for collisions (opt-in: takes minutes).
+
+    Uniqueness follows from two checks: every process mints on its own node
+    ID and verifies its IDs strictly increase, and the node bits keep
+    different processes' IDs apart.
+    :param collision_count: int, IDs minted across all processes
+    :param processes: int, concurrently minting processes (one node ID each)
+    :return: dict, IDs minted, ordering violations and run time
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    started = time.perf_counter()
+    per_process = collision_count // processes
+    with ProcessPoolExecutor(processes) as pool:
+        results = list(pool.map(_mint_and_check, range(processes), [per_process] * processes))
+    return {
+        "collision_run_ids": sum(result[0] for result in results),
+        "collision_run_violations": sum(result[1] for result in results),
+        "collision_run_seconds": time.perf_counter() - started,
+    }
+
+
+def bench_hot_paths(rooms=1000, guests=10000, bookings=100000, feedback=10000, operations=2000, seed=0):
+    """
+    Time the booking hot paths over a generated property (see SCALES for preset sizes).
+
+    Covers the calls behind the CLI menu: room search with stay quotes
+    (search_rooms/available_rooms), room lookup (make_booking),
+    Booking.generate_invoice, Guest.view_reservation_history, loyalty point
+    updates through the ledger, and feedback aggregation and search.
+    :param rooms: int, rooms in inventory
+    :param guests: int, guest accounts
+    :param bookings: int, historical bookings
+    :param feedback: int, feedback entries
+    :param operations: int, calls timed per hot path
+    :param seed: int, random seed for reproducible data
+    :return: dict, build times and seconds per call
+    """
+    from hotel.booking_service import BookingService
+    from hotel.feedback_store import FeedbackStore
+    from hotel.inventory import InventoryIndex
+    from hotel.loyalty import LoyaltyLedger
+    from hotel.pricing import PricingEngine
+
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    results = {"rooms": rooms, "guests": guests, "bookings": bookings, "feedback": feedback}
+
+    started = time.perf_counter()
+    inventory_rooms = make_rooms(rooms)
+    for room in inventory_rooms:
+        room.amenities = tuple(rng.sample(_AMENITY_CHOICES, 3))
+    guest_list = make_guests(guests, seed)
+    results["build_guests"] = time.perf_counter() - started
+    started = time.perf_counter()
+    booking_sample = []
+    for i, booking in enumerate(make_bookings(inventory_rooms, guest_list, bookings, start, seed)):
+        # Reservoir sample of bookings to re-invoice.
+        if i < operations:
+            booking_sample.append(booking)
+        elif rng.randrange(i) < operations:
+            booking_sample[rng.randrange(operations)] = booking
+    results["build_bookings"] = time.perf_counter() - started
+    horizon = max(max(end for _, end, _ in room.stays) if room.stays else 0 for room in inventory_rooms)
+    started = time.perf_counter()
+    inventory = InventoryIndex(inventory_rooms)
+    pricing = PricingEngine(inventory_rooms, weekend_multiplier=1.2, occupancy_surcharges=[(0.8, 1.1)])
+    booking_service = BookingService(inventory_rooms)
+    ledger = LoyaltyLedger(guest.loyalty_account for guest in guest_list)
+    results["build_indexes"] = time.perf_counter() - started
+    started = time.perf_counter()
+    feedback_store = FeedbackStore(make_feedback(feedback, start, seed=seed))
+    results["build_feedback"] = time.perf_counter() - started
+
+    def per_call(func, args):
+        return _best_of(lambda: [func(*arg) for arg in args], 3) / len(args)
+
+    searches = []
+    for _ in range(operations):
+        check_in = date.fromordinal(rng.randint(start.toordinal(), horizon))
+        searches.append((check_in, check_in + timedelta(days=rng.randint(1, 7)),
+                         rng.choice((None, "SingleRoom", "DoubleRoom", "Suite")),
+                         rng.sample(_AMENITY_CHOICES, rng.randint(0, 2))))
+
+    def search(check_in, check_out, room_type, amenities):
+        found = inventory.find(room_type, None, None, amenities, check_in, check_out)
+        return pricing.quote_many(found, check_in, check_out)
+
+    numbers = [(rng.randint(1, rooms),) for _ in range(operations)]
+    sample_guests = [(rng.choice(guest_list),) for _ in range(operations)]
+    accounts = [(guest.loyalty_account,) for guest, in sample_guests]
+    results.update({
+        "search_rooms": per_call(search, searches),
+        "room_lookup": per_call(booking_service.get_room, numbers),
+        "generate_invoice": per_call(lambda booking: booking.generate_invoice(), [(b,) for b in booking_sample]),
+        "generate_invoice_priced": per_call(lambda booking: booking.generate_invoice(pricing),
+                                            [(b,) for b in booking_sample]),
+        "view_reservation_history": per_call(lambda guest: len(guest.view_reservation_history()), sample_guests),
+        "loyalty_earn": per_call(lambda account: account.earn_points(100, "bench"), accounts),
+        "loyalty_redeem": per_call(lambda account: account.redeem_points(50, "bench"), accounts),
+        "feedback_summary": per_call(feedback_store.summary, [()] * operations),
+        "feedback_search": per_call(lambda words: feedback_store.search(words),
+                                    [(" ".join(rng.sample(_FEEDBACK_WORDS, 2)),) for _ in range(operations)]),
+    })
+    results["ledger_rows"] = len(ledger)
+    return results
+
+
+def bench_metrics(room_count=200, calls=2000):
+    """
+    Measure the cost the metrics layer adds to a room search: never instrumented, disabled and enabled.
+    :param room_count: int, rooms in inventory
+    :param calls: int, searches per timing
+    :return: dict, seconds per search
+    """
+    from hotel.booking_service import BookingService
+    from hotel.cli import HotelCLI
+    from hotel.inventory import InventoryIndex
+    from hotel.metrics import MetricsRegistry, instrument_hotel
+    from hotel.pricing import PricingEngine
+
+    hotel = HotelCLI()
+    hotel.rooms = make_rooms(room_count)
+    fill_stays(hotel.rooms, date(2026, 1, 1), 60)
+    hotel.inventory = InventoryIndex(hotel.rooms)
+    hotel.booking_service = BookingService(hotel.rooms)
+    hotel.pricing = PricingEngine(hotel.rooms)
+    check_in, check_out = date(2026, 1, 20), date(2026, 1, 23)
+
+    def searches():
+        for _ in range(calls):
+            hotel.available_rooms(check_in, check_out, "Suite")
+
+    results = {"uninstrumented": _best_of(searches) / calls}
+    registry = MetricsRegistry()
+    instrument_hotel(hotel, registry)
+    results["disabled"] = _best_of(searches) / calls
+    registry.enable()
+    try:
+        results["enabled"] = _best_of(searches) / calls
+        registry.start_profiling(every=100)
+        results["enabled_profiling_1_in_100"] = _best_of(searches) / calls
+        registry.stop_profiling()
+    finally:
+        registry.disable()
+    return results
+
+
+def bench_assignment(room_count=3000, days=365, flexible=0.7, online_rooms=300, online_requests=5000, seed=0):
+    """
+    Re-pack a year of stays across a large inventory, and compare best-fit with first-fit assignment.
+    :param room_count: int, rooms re-packed by the night-audit pass
+    :param days: int, length of the booked window
+    :param flexible: float, share of the stays booked by room type (movable)
+    :param online_rooms: int, rooms filled one request at a time for the best-fit/first-fit comparison
+    :param online_requests: int, room-type requests offered to each assignment policy
+    :param seed: int, random seed for reproducible data
+    :return: dict, timings in seconds and stranded nights
+    """
+    from hotel.assignment import RoomAssigner
+    from hotel.inventory import InventoryIndex
+
+    rng = random.Random(seed)
+    today = date(2026, 1, 1)
+    origin = today.toordinal() + 1
+    # Rooms picked by guests: stays packed back to back with short, often unsellable gaps.
+    rooms = make_rooms(room_count)
+    movable, stays = set(), 0
+    for room in rooms:
+        cursor = origin + rng.randint(0, 3)
+        while cursor < origin + days:
+            nights = rng.randint(1, 7)
+            stays += 1
+            if rng.random() < flexible:
+                movable.add(stays)
+            room.reserve(cursor, cursor + nights, stays)
+            cursor += nights + rng.choice((0, 0, 1, 1, 2, 3, 5))
+    _, summary = RoomAssigner(InventoryIndex(rooms)).reoptimize(movable, today)
+
+    # Online: the same request stream placed by best fit and by the lowest free room number.
+    requests = [(rng.choice(ROOM_TYPES).__name__, origin + rng.randrange(90), rng.randint(1, 7))
+                for _ in range(online_requests)]
+    results = {}
+    for policy in ("best_fit", "first_fit"):
+        rooms = make_rooms(online_rooms)
+        inventory = InventoryIndex(rooms)
+        assigner = RoomAssigner(inventory)
+        booked = 0
+        started = time.perf_counter()
+        for room_type, check_in, nights in requests:
+            check_in, check_out = date.fromordinal(check_in), date.fromordinal(check_in + nights)
+            if policy == "best_fit":
+                room = assigner.best_room(room_type, check_in, check_out)
+            else:
+                room = next((room for room in inventory.rooms_of_type(room_type)
+                             if room.is_available_for(check_in, check_out)), None)
+            if room is not None:
+                room.reserve(check_in, check_out)
+                booked += 1
+        results[policy] = (time.perf_counter() - started) / len(requests), booked, assigner.fragmentation(
+            ([(start, end) for start, end, _ in room.stays] for room in rooms), origin)[0]
+    return {
+        "rooms": room_count,
+        "stays": stays,
+        "movable_stays": summary["movable"],
+        "moved_stays": summary["moved"],
+        "stranded_nights_before": summary["stranded_before"],
+        "stranded_nights_after": summary["stranded_after"],
+        "free_runs_before": summary["free_runs_before"],
+        "free_runs_after": summary["free_runs_after"],
+        "reoptimize": summary["seconds"],
+        "best_fit_per_request": results["best_fit"][0],
+        "best_fit_booked": results["best_fit"][1],
+        "best_fit_stranded_nights": results["best_fit"][2],
+        "first_fit_per_request": results["first_fit"][0],
+        "first_fit_booked": results["first_fit"][1],
+        "first_fit_stranded_nights": results["first_fit"][2],
+    }
+
+
+def bench_sharding(properties=200, rooms_per_property=100, days=120, searches=100, workers=None, seed=0):
+    """
+    Time group-wide cheapest-room searches in one process and fanned out to shard worker processes.
+    :param properties: int, properties in the group
+    :param rooms_per_property: int, rooms at each property
+    :param days: int, length of the booked window
+    :param searches: int, searches per timing
+    :param workers: int, shard processes (defaults to the CPU count)
+    :param seed: int, random seed for reproducible data
+    :return: dict, seconds per search
+    """
+    from hotel.properties import Property, PropertyGroup
+
+    start = date(2026, 1, 1)
+    group = []
+    for i in range(properties):
+        rooms = make_rooms(rooms_per_property)
+        fill_stays(rooms, start, days, seed=seed + i)
+        group.append(Property(f"P{i:04d}", rooms))
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(searches):
+        check_in = start + timedelta(days=rng.randrange(days - 7))
+        queries.append((check_in, check_in + timedelta(days=rng.randint(1, 7)), rng.choice((None, "Suite"))))
+
+    results = {"properties": properties, "rooms": properties * rooms_per_property}
+    for name, count in (("serial", 0), ("sharded", workers)):
+        with PropertyGroup(group, workers=count) as sharded:
+            sharded.availability(start, start + timedelta(days=1))  # start the workers
+            started = time.perf_counter()
+            offers = [sharded.search(check_in, check_out, room_type, limit=10)
+                      for check_in, check_out, room_type in queries]
+            results[f"{name}_per_search"] = (time.perf_counter() - started) / searches
+            results[f"{name}_offers"] = sum(len(found) for found in offers)
+    return results
+
+
+def bench_search_cache(room_count=1000, days=90, operations=20000, searches_per_booking=50, distinct_searches=200,
+                       seed=0):
+    """
+    Replay a search-heavy mix of room searches and bookings with and without the search cache.
+    :param room_count: int, rooms in inventory
+    :param days: int, length of the booked window
+    :param operations: int, searches and bookings replayed
+    :param searches_per_booking: int, searches issued per booking
+    :param distinct_searches: int, different search parameter sets in the mix
+    :param seed: int, random seed for reproducible data
+    :return: dict, seconds per operation and cache statistics
+    """
+    from hotel.cli import HotelCLI
+    from hotel.inventory import InventoryIndex
+    from hotel.pricing import PricingEngine
+    from hotel.search_cache import SearchCache, search_key
+
+    start = date(2026, 1, 1)
+    rng = random.Random(seed)
+    searches = []
+    for _ in range(distinct_searches):
+        check_in = start + timedelta(days=rng.randrange(days - 7))
+        searches.append((check_in, check_in + timedelta(days=rng.randint(1, 7)),
+                         rng.choice((None, "SingleRoom", "DoubleRoom", "Suite")),
+                         rng.choice((None, 150, 300)), rng.choice(((), ("TV",), ("Mini Bar",)))))
+    # Popular searches repeat far more often than rare ones.
+    weights = [1 / (rank + 1) for rank in range(distinct_searches)]
+    mix = []
+    for i in range(operations):
+        if i % (searches_per_booking + 1) == searches_per_booking:
+            check_in = start.toordinal() + rng.randrange(days - 7)
+            mix.append(("book", rng.randrange(room_count), check_in, check_in + rng.randint(1, 7)))
+        else:
+            mix.append(("search",) + rng.choices(searches, weights)[0])
+
+    results = {}
+    for name in ("uncached", "cached"):
+        hotel = HotelCLI()
+        hotel.rooms = make_rooms(room_count)
+        fill_stays(hotel.rooms, start, days, seed=seed)
+        hotel.inventory = InventoryIndex(hotel.rooms)
+        hotel.pricing = PricingEngine(hotel.rooms)
+        hotel.search_cache = cache = SearchCache(hotel.rooms, hotel.pricing)
+        started = time.perf_counter()
+        for operation in mix:
+            if operation[0] == "book":
+                _, index, check_in, check_out = operation
+                room = hotel.rooms[index]
+                if room.is_available_for(check_in, check_out):
+                    room.reserve(check_in, check_out)
+                continue
+            _, check_in, check_out, room_type, max_price, amenities = operation
+            listing = functools.partial(hotel._room_listing, check_in, check_out, room_type, max_price, amenities)
+            if name == "cached":
+                cache.get_or_compute("listing", search_key(check_in, check_out, room_type, None, max_price,
+                                                           amenities), listing)
+            else:
+                listing()
+        results[f"{name}_per_operation"] = (time.perf_counter() - started) / operations
+        hotel.close()
+    results.update(cache.stats())
+    return results
+
+
+def bench_holds(holds=200000, room_count=2000, ttl=600, seed=0):
+    """
+    Place many outstanding holds and time expiry ticks on the timing wheel against a full scan.
+    :param holds: int, holds placed
+    :param room_count: int, rooms the holds are spread over
+    :param ttl: int, holds expire uniformly over this many seconds
+    :param seed: int, random seed for reproducible data
+    :return: dict, timings in seconds
+    """
+    from hotel.booking_service import BookingService
+    from hotel.holds import HoldManager
+
+    rng = random.Random(seed)
+    now = [0.0]
+    rooms = make_rooms(room_count)
+    manager = HoldManager(BookingService(rooms), ttl=ttl, clock=lambda: now[0])
+    origin = date(2026, 1, 1).toordinal()
+    started = time.perf_counter()
+    placed = []
+    for i in range(holds):
+        check_in = date.fromordinal(origin + i // room_count)
+        placed.append(manager.hold(None, rooms[i % room_count], check_in, check_in + timedelta(days=1),
+                                   rng.uniform(1, ttl)))
+    hold_time = (time.perf_counter() - started) / holds
+
+    # One second passes per tick; on average holds / ttl holds fall due each tick.
+    started = time.perf_counter()
+    expired = 0
+    for second in range(1, ttl + 2):
+        now[0] = second
+        expired += manager.expire()
+    wheel_tick = (time.perf_counter() - started) / (ttl + 1)
+
+    # Baseline: a periodic scan of every outstanding hold for the ones that are due.
+    deadlines = [(held.hold_id, held.expires_at) for held in placed]
+    outstanding = dict(deadlines)
+    started = time.perf_counter()
+    for second in range(1, 11):
+        for hold_id, expires_at in list(outstanding.items()):
+            if expires_at <= second:
+                del outstanding[hold_id]
+    scan_tick = (time.perf_counter() - started) / 10
+    return {
+        "holds": holds,
+        "hold_per_call": hold_time,
+        "expired": expired,
+        "wheel_per_tick": wheel_tick,
+        "full_scan_per_tick": scan_tick,
+    }
+
+
+def bench_settlement(payments=1000, latency=0.01, per_charge=0.0002, batch_size=50):
+    """
+    Time a burst of payments through the settlement queue, one charge per gateway call against batched calls.
+    :param payments: int, payments submitted at once (a peak-load burst)
+    :param latency: float, simulated gateway round trip in seconds
+    :param per_charge: float, simulated gateway time per charge in a call
+    :param batch_size: int, batch size of the batched run
+    :return: dict, timings in seconds
+    """
+    from hotel.booking import Booking, CreditCardPayment
+    from hotel.settlement import FakeGateway, PaymentSettlement
+
+    room = make_rooms(1)[0]
+    results = {"payments": payments}
+    for label, size in (("single", 1), ("batched", batch_size)):
+        bookings = []
+        for i in range(payments):
+            booking = Booking(None, room, date(2026, 1, 1), date(2026, 1, 2), f"B{i}")
+            booking.set_payment(CreditCardPayment(100, "4111", "12/30", "2026-01-01", f"{label}-{i}"))
+            bookings.append(booking)
+        gateway = FakeGateway(latency=latency, per_charge=per_charge)
+        settlement = PaymentSettlement(gateway, batch_size=size)
+        settlement.start()
+        started = time.perf_counter()
+        for booking in bookings:
+            settlement.submit(booking)
+        submitted = time.perf_counter()
+        settlement.drain()
+        finished = time.perf_counter()
+        settlement.stop()
+        results[f"{label}_submit_per_payment"] = (submitted - started) / payments
+        results[f"{label}_settle_total"] = finished - started
+        results[f"{label}_gateway_calls"] = gateway.calls
+    # What a booking would wait for if it charged the gateway inline.
+    results["inline_charge_per_booking"] = latency + per_charge
+    return results
+
+
+def bench_history(stays=20000, page=50, pages=1000, seed=0):
+    """
+    Page through a corporate account's history via the check-in index against filtering and sorting the full list.
+    :param stays: int, bookings made by the one guest
+    :param page: int, bookings per page
+    :param pages: int, page requests timed
+    :param seed: int, random seed for reproducible data
+    :return: dict, timings in seconds
+    """
+    from hotel.booking import Booking
+    from hotel.guest import Guest
+    from hotel.history import UPCOMING
+
+    rng = random.Random(seed)
+    guest = Guest("corporate", "Acme Corp", "travel@acme.example", "555-0100")
+    rooms = make_rooms(200)
+    origin = date(2024, 1, 1).toordinal()
+    started = time.perf_counter()
+    for i in range(stays):
+        # Stays are booked out of order, as a travel desk books ahead and fills in.
+        check_in = origin + rng.randint(0, 1500)
+        guest.make_booking(Booking(guest, rooms[i % len(rooms)], date.fromordinal(check_in),
+                                   date.fromordinal(check_in + rng.randint(1, 5)), f"{i:08x}"))
+    build = (time.perf_counter() - started) / stays
+    history = guest.view_reservation_history()
+    today = date.fromordinal(origin + 750)
+    starts = [date.fromordinal(origin + rng.randint(0, 1500)) for _ in range(pages)]
+
+    started = time.perf_counter()
+    for start in starts:
+        history.page(page, start=start, when=UPCOMING, today=today)
+    indexed = (time.perf_counter() - started) / pages
+
+    # Baseline: what listing a page took with only the insertion-ordered list.
+    started = time.perf_counter()
+    for start in starts:
+        lower = max(start, today)
+        sorted((booking for booking in guest.bookings if booking.check_in_date >= lower),
+               key=lambda booking: (booking.check_in_date, booking.booking_id))[:page]
+    scanned = (time.perf_counter() - started) / pages
+
+    started = time.perf_counter()
+    streamed = sum(1 for _ in history.iterate(when=UPCOMING, today=today))
+    stream = time.perf_counter() - started
+    return {
+        "stays": stays,
+        "add_per_booking": build,
+        "indexed_page": indexed,
+        "scan_and_sort_page": scanned,
+        "upcoming_streamed": streamed,
+        "stream_upcoming": stream,
+    }
+
+
+def bench_waitlist(room_count=1000, days=60, entries=20000, cancellations=1000, batch=50, seed=0):
+    """
+    Match cancellations against a long waitlist via its check-in index against scanning every waiting entry.
+    :param room_count: int, rooms, booked solid for the whole window
+    :param days: int, nights in the sold-out window
+    :param entries: int, guests put on the waitlist
+    :param cancellations: int, stays cancelled, matched in batches
+    :param batch: int, cancellations between match() runs
+    :param seed: int, random seed for reproducible data
+    :return: dict, timings in seconds
+    """
+    from hotel.booking_service import BookingService
+    from hotel.holds import HoldManager
+    from hotel.inventory import InventoryIndex
+    from hotel.waitlist import Waitlist, WAITING
+
+    rng = random.Random(seed)
+    rooms = make_rooms(room_count)
+    origin = date(2026, 1, 1).toordinal()
+    stays = []
+    for room in rooms:
+        night = origin
+        while night < origin + days:
+            end = min(origin + days, night + rng.randint(1, 4))
+            room.reserve(date.fromordinal(night), date.fromordinal(end))
+            stays.append((room, night, end))
+            night = end
+    service = BookingService(rooms)
+    inventory = InventoryIndex(rooms)
+    waitlist = Waitlist(rooms, inventory, HoldManager(service, clock=lambda: 0.0))
+    room_types = [cls.__name__ for cls in ROOM_TYPES] + [None]
+    started = time.perf_counter()
+    for _ in range(entries):
+        check_in = origin + rng.randint(0, days - 1)
+        waitlist.join(None, rng.choice(room_types), date.fromordinal(check_in),
+                      date.fromordinal(min(origin + days, check_in + rng.randint(1, 4))))
+    join = (time.perf_counter() - started) / entries
+    cancelled = rng.sample(stays, cancellations)
+
+    indexed = scanned = 0.0
+    offered = 0
+    waiting = [entry for entry in waitlist._entries.values() if entry.status == WAITING]
+    for first in range(0, cancellations, batch):
+        freed = cancelled[first:first + batch]
+        for room, start, end in freed:
+            service.release(room, date.fromordinal(start), date.fromordinal(end))
+        # Baseline: test every waiting entry against every freed stay.
+        started = time.perf_counter()
+        for room, start, end in freed:
+            room_type = room.__class__.__name__
+            [entry for entry in waiting
+             if entry.status == WAITING and entry.room_type in (room_type, None)
+             and entry.check_in_date.toordinal() < end and entry.check_out_date.toordinal() > start]
+        scanned += time.perf_counter() - started
+        started = time.perf_counter()
+        offered += len(waitlist.match(date.fromordinal(origin)))
+        indexed += time.perf_counter() - started
+    runs = cancellations // batch
+    return {
+        "entries": entries,
+        "cancellations": cancellations,
+        "offered": offered,
+        "join_per_entry": join,
+        "indexed_match_per_batch": indexed / runs,
+        "full_scan_per_batch": scanned / runs,
+    }
+
+
+BENCHMARKS = {
+    "occupancy": bench_occupancy,
+    "concurrency": stress_concurrent_bookings,
+    "memory": bench_memory,
+    "reporting": bench_reporting,
+    "pricing": bench_pricing,
+    "loyalty": bench_loyalty,
+    "dispatch": stress_dispatch,
+    "ids": bench_ids,
+    "id_collisions": bench_id_collisions,
+    "hot_paths": bench_hot_paths,
+    "metrics": bench_metrics,
+    "assignment": bench_assignment,
+    "sharding": bench_sharding,
+    "search_cache": bench_search_cache,
+    "holds": bench_holds,
+    "settlement": bench_settlement,
+    "history": bench_history,
+    "waitlist": bench_waitlist,
+}
+# Too slow for a default run; only run when named.
+OPT_IN = {"id_collisions"}
+
+
+def _commit():
+    """
+    Git commit of the working tree, or None outside a repository.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _parse_value(text):
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+
+def compare(baseline, current):
+    """
+    Print the relative change of every numeric result present in two result files.
+    :param baseline: dict, results loaded from an earlier --json file
+    :param current: dict, results of this run
+    """
+    print(f"== compared with {baseline.get('commit')} ({baseline.get('created')}) ==")
+    for name, results in current["results"].items():
+        old = baseline.get("results", {}).get(name, {})
+        for key, value in results.items():
+            before = old.get(key)
+            if isinstance(value, (int, float)) and isinstance(before, (int, float)) and before:
+                print(f"{name}.{key}: {before:.6g} -> {value:.6g} ({(value - before) / before:+.1%})")
+
+
+def main(argv=None):
+    """
+    Run the selected benchmarks, print their results and optionally save them as JSON.
+    """
+    parser = argparse.ArgumentParser(description="Hotel booking benchmarks")
+    parser.add_argument("names", nargs="*", default=sorted(set(BENCHMARKS) - OPT_IN),
+                        help=f"benchmarks to run (default: all but {', '.join(sorted(OPT_IN))})")
+    parser.add_argument("--scale", choices=sorted(SCALES), help="data size preset for hot_paths")
+    parser.add_argument("--set", action="append", default=[], metavar="PARAM=VALUE",
+                        help="override a parameter of every selected benchmark that takes it")
+    parser.add_argument("--json", metavar="PATH", help="write the results to a JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with an earlier --json file")
+    args = parser.parse_args(argv)
+    # Holds, waitlist offers and feeds mint IDs outside a HotelCLI; lease a node ID like it would.
+    configure_ids(directory=os.path.join(tempfile.gettempdir(), "hotel-nodes"))
+    overrides = dict(SCALES[args.scale]) if args.scale else {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        overrides[key] = _parse_value(value)
+    run = {
+        "commit": _commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": {},
+    }
+    for name in args.names:
+        bench = BENCHMARKS[name]
+        params = inspect.signature(bench).parameters
+        kwargs = {key: value for key, value in overrides.items() if key in params}
+        print(f"== {name} ==")
+        results = run["results"][name] = bench(**kwargs)
+        for key, value in results.items():
+            print(f"{key}: {value:.6g}" if isinstance(value, float) else f"{key}: {value}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(run, handle, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            compare(json.load(handle), run)
+    return run
+
+
+if __name__ == "__main__":
+    main()
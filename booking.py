@@ -1,10 +1,17 @@
 from abc import ABC, abstractmethod
 from datetime import date
 
+# Settlement status of a booking's payment, as recorded on its invoice.
+PAYMENT_PENDING = "Pending"
+PAYMENT_SETTLED = "Settled"
+PAYMENT_FAILED = "Failed"
+
 class Payment:
     """
     Abstract base class for different payment methods.
     """
+    __slots__ = ("_amount", "_payment_date", "_transaction_id")
+
     def __init__(self, amount, payment_date, transaction_id):
         """
         Initialize payment with an amount.
@@ -51,6 +58,8 @@ class CreditCardPayment(Payment):
     """
     Handles credit card payment processing.
     """
+    __slots__ = ("_card_number", "_expiry_date")
+
     def __init__(self, amount, card_number, expiry_date, payment_date, transaction_id):
         """
         Initialize credit card payment.
@@ -84,6 +93,8 @@ class MobileWalletPayment(Payment):
     """
     Handles mobile wallet payment processing.
     """
+    __slots__ = ("_wallet_type", "_phone_number")
+
     def __init__(self, amount, wallet_type, phone_number, payment_date, transaction_id):
         """
         Initialize mobile wallet payment.
@@ -116,7 +127,10 @@ class Booking:
     """
     Represents a hotel room booking.
     """
-    def __init__(self, guest, room, check_in_date, check_out_date, booking_id):
+    __slots__ = ("_guest", "_room", "_check_in_date", "_check_out_date", "_booking_id", "_payment", "_invoice",
+                 "_flexible", "_cancelled")
+
+    def __init__(self, guest, room, check_in_date, check_out_date, booking_id, flexible=False):
         """
         Initialize a new booking.
         :param guest: Guest object, the guest making the booking
@@ -124,6 +138,7 @@ class Booking:
         :param check_in_date: date, check-in date
         :param check_out_date: date, check-out date
         :param booking_id: str, unique booking identifier
+        :param flexible: bool, booked by room type, so the hotel may move it to another room of that type
         """
         self._guest = guest
         self._room = room
@@ -132,11 +147,83 @@ class Booking:
         self._booking_id = booking_id  # Store booking ID
         self._payment = None
         self._invoice = None
+        self._flexible = flexible
+        self._cancelled = False
+
+    def __setstate__(self, state):
+        # Snapshots taken before bookings could be flexible or cancelled lack the flags.
+        self._flexible = False
+        self._cancelled = False
+        for name, value in state[1].items():
+            setattr(self, name, value)
+        if self._invoice is not None and "payment_status" not in self._invoice:
+            # Invoices from before settlement was tracked belong to payments charged when booked.
+            self._invoice.update(payment_status=PAYMENT_SETTLED if self._payment is not None else None,
+                                 payment_reference=None, payment_error=None)
+
+    @property
+    def guest(self):
+        return self._guest
+
+    @property
+    def room(self):
+        return self._room
+
+    @property
+    def check_in_date(self):
+        return self._check_in_date
+
+    @property
+    def check_out_date(self):
+        return self._check_out_date
 
     @property
     def booking_id(self):
         return self._booking_id
 
+    @property
+    def payment(self):
+        return self._payment
+
+    @property
+    def invoice(self):
+        return self._invoice
+
+    @property
+    def flexible(self):
+        return self._flexible
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def move_to(self, room):
+        """
+        Point the booking at another room of its type (the caller moves the stay itself).
+        :param room: Room object
+        """
+        self._room = room
+
+    def change(self, room, check_in_date, check_out_date, total=None):
+        """
+        Point the booking at new dates and room (the caller moves the stay itself).
+        :param room: Room object
+        :param check_in_date: date, new check-in date
+        :param check_out_date: date, new check-out date
+        :param total: float, new invoice total (kept if None)
+        """
+        self._room = room
+        self._check_in_date = check_in_date
+        self._check_out_date = check_out_date
+        if total is not None and self._invoice is not None:
+            self._invoice["total"] = total
+
+    def cancel(self):
+        """
+        Mark the booking cancelled (the caller releases the stay itself).
+        """
+        self._cancelled = True
+
     def set_payment(self, payment):
         """
         Assign a payment method to the booking.
@@ -144,16 +231,35 @@ class Booking:
         """
         self._payment = payment
 
-    def generate_invoice(self):
+    def generate_invoice(self, pricing=None):
         """
         Generate an invoice for the booking.
+        :param pricing: PricingEngine, optional per-night pricing (flat price_per_night otherwise)
         :return: dict, invoice details including total amount and payment method
         """
-        nights = (self._check_out_date - self._check_in_date).days
-        total = nights * self._room._price_per_night
-        self._invoice = {"total": total, "payment_method": self._payment}
+        if pricing is not None:
+            total = pricing.quote(self._room, self._check_in_date, self._check_out_date)
+        else:
+            nights = (self._check_out_date - self._check_in_date).days
+            total = nights * self._room._price_per_night
+        self._invoice = {"total": total, "payment_method": self._payment,
+                         "payment_status": PAYMENT_PENDING if self._payment is not None else None,
+                         "payment_reference": None, "payment_error": None}
         return self._invoice
 
+    def record_settlement(self, status, reference=None, error=None):
+        """
+        Record the outcome of settling the booking's payment on its invoice.
+        :param status: str, PAYMENT_SETTLED or PAYMENT_FAILED
+        :param reference: str, gateway reference of the settled charge
+        :param error: str, reason the payment failed
+        """
+        if self._invoice is None:
+            # Bookings loaded from storage carry no invoice; the payment is what was charged.
+            self._invoice = {"total": self._payment.amount if self._payment is not None else None,
+                             "payment_method": self._payment}
+        self._invoice.update(payment_status=status, payment_reference=reference, payment_error=error)
+
     def __str__(self):
         """
         String representation of the booking.
@@ -0,0 +1,162 @@
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+
+class BookingConflictError(ValueError):
+    """
+    Raised when a room is not available for the requested stay.
+    """
+
+
+class BookingService:
+    """
+    Thread-safe booking commits with optimistic per-room conflict detection.
+
+    Availability is read without locking, together with the room's version,
+    which works as a seqlock: it is odd while a stay is being written. The
+    commit then takes only that room's lock and succeeds if the version is
+    unchanged (compare-and-set); otherwise the read is retried. Bookings for
+    different rooms never contend on a shared lock.
+    """
+    def __init__(self, rooms, max_retries=16):
+        """
+        Initialize the booking service.
+        :param rooms: list, Room objects that can be booked
+        :param max_retries: int, optimistic attempts before giving up on a busy room
+        """
+        self._rooms = {room.room_number: room for room in rooms}
+        self._room_locks = {room.room_number: threading.Lock() for room in rooms}
+        self._guest_locks = {}
+        self._max_retries = max_retries
+        self.retries = 0
+
+    def add_room(self, room):
+        """
+        Register a room added to the inventory after start-up.
+        """
+        self._room_locks.setdefault(room.room_number, threading.Lock())
+        self._rooms[room.room_number] = room
+
+    def get_room(self, room_number):
+        """
+        Look up a bookable room by number.
+        :return: Room object, or None if unknown
+        """
+        return self._rooms.get(room_number)
+
+    @contextmanager
+    def locked(self, rooms):
+        """
+        Hold the locks of several rooms, so no booking commits in them meanwhile.
+        Locks are taken in room-number order, so two callers never deadlock.
+        :param rooms: iterable, Room objects registered with the service
+        """
+        with ExitStack() as stack:
+            for room_number in sorted({room.room_number for room in rooms}):
+                stack.enter_context(self._room_locks[room_number])
+            yield
+
+    def _compare_and_reserve(self, room, version, check_in, check_out, booking_id):
+        """
+        Reserve the stay if the room has not changed since it was read.
+        :return: bool, True if the reservation was committed
+        """
+        with self._room_locks[room.room_number]:
+            if room.version != version:
+                return False
+            room.reserve(check_in, check_out, booking_id)
+            return True
+
+    def reserve(self, room, check_in, check_out, booking_id):
+        """
+        Reserve a stay in a room without booking it (e.g. for a hold).
+        :raises BookingConflictError: if the room is not free for the dates
+        """
+        for _ in range(self._max_retries):
+            version = room.version
+            if version & 1:
+                # A writer is mid-update; the stay index may be torn. Let it finish before reading again.
+                self.retries += 1
+                time.sleep(0)
+                continue
+            available = room.is_available_for(check_in, check_out)
+            # An unavailable answer only counts if no writer touched the room meanwhile.
+            if not available and room.version == version:
+                raise BookingConflictError(
+                    f"Room {room.room_number} is not available from {check_in} to {check_out}")
+            if available and self._compare_and_reserve(room, version, check_in, check_out, booking_id):
+                return
+            self.retries += 1
+        raise BookingConflictError(f"Room {room.room_number} is too busy, please retry")
+
+    def release(self, room, check_in, check_out):
+        """
+        Free a reserved stay.
+        """
+        with self._room_locks[room.room_number]:
+            room.release(check_in, check_out)
+
+    def book(self, booking):
+        """
+        Commit a prepared booking: reserve its stay and add it to the guest's history.
+        :param booking: Booking object
+        :return: Booking object, the committed booking
+        """
+        self.reserve(booking.room, booking.check_in_date, booking.check_out_date, booking.booking_id)
+        return self.record(booking)
+
+    def record(self, booking):
+        """
+        Add a booking whose stay is already reserved (under a hold) to the guest's history.
+        :return: Booking object
+        """
+        guest = booking.guest
+        with self._guest_locks.setdefault(guest.guest_id, threading.Lock()):
+            guest.make_booking(booking)
+        return booking
+
+    def cancel(self, booking):
+        """
+        Cancel a booking: free its stay and take it out of the guest's history.
+        :param booking: Booking object
+        :return: Booking object, the cancelled booking
+        :raises ValueError: if the booking is already cancelled
+        """
+        guest = booking.guest
+        with self._guest_locks.setdefault(guest.guest_id, threading.Lock()):
+            if booking.cancelled or not guest.cancel_booking(booking):
+                raise ValueError(f"Booking {booking.booking_id} is not active")
+        self.release(booking.room, booking.check_in_date, booking.check_out_date)
+        return booking
+
+    def modify(self, booking, room, check_in, check_out, total=None):
+        """
+        Move a booking to new dates and/or another room, keeping the old stay if the new one is taken.
+        :param booking: Booking object
+        :param room: Room object, the booking's own room to only change dates
+        :param check_in: date, new check-in date
+        :param check_out: date, new check-out date (exclusive)
+        :param total: float, new invoice total
+        :return: Booking object, the changed booking
+        :raises BookingConflictError: if the room is not free for the new dates
+        """
+        if check_out <= check_in:
+            raise ValueError("Check-out date must be after check-in date")
+        old_room, old_check_in, old_check_out = booking.room, booking.check_in_date, booking.check_out_date
+        if room is old_room:
+            # The new stay may overlap the old one, so swap them under the room's lock.
+            with self._room_locks[room.room_number]:
+                room.release(old_check_in, old_check_out)
+                if not room.is_available_for(check_in, check_out):
+                    room.reserve(old_check_in, old_check_out, booking.booking_id)
+                    raise BookingConflictError(
+                        f"Room {room.room_number} is not available from {check_in} to {check_out}")
+                room.reserve(check_in, check_out, booking.booking_id)
+        else:
+            self.reserve(room, check_in, check_out, booking.booking_id)
+            self.release(old_room, old_check_in, old_check_out)
+        guest = booking.guest
+        with self._guest_locks.setdefault(guest.guest_id, threading.Lock()):
+            guest.change_booking(booking, room, check_in, check_out, total)
+        return booking
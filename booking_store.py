@@ -0,0 +1,180 @@
+from array import array
+from collections import namedtuple
+from datetime import date
+
+
+PAYMENT_TYPES = ("", "CreditCardPayment", "MobileWalletPayment")
+
+BookingRecord = namedtuple("BookingRecord", [
+    "booking_id", "guest_id", "room_number", "room_type", "check_in_date", "check_out_date",
+    "price_per_night", "total", "payment_type",
+])
+
+_OPAQUE_ID = 1 << 63
+
+
+class BookingStore:
+    """
+    Struct-of-arrays archive of historical bookings.
+
+    Each booking is one row across typed arrays: integer booking and guest
+    IDs, room number, room type code, check-in/check-out date ordinals,
+    nightly rate and payment type code. A row costs a few dozen bytes instead
+    of a Booking object with its guest, room, date and payment references,
+    and the columns can be handed to NumPy without copying.
+    """
+    def __init__(self):
+        """
+        Initialize an empty store.
+        """
+        self.booking_ids = array("Q")
+        self.guest_numbers = array("l")
+        self.room_numbers = array("l")
+        self.room_types = array("b")
+        self.check_ins = array("l")
+        self.check_outs = array("l")
+        self.rates = array("d")
+        self.payment_types = array("b")
+        self._guest_numbers = {}
+        self._guest_ids = []
+        self._room_type_codes = {}
+        self._room_type_names = []
+        self._opaque_ids = []
+        # Lazily built: booking ID code (or opaque ID string) -> row.
+        self._rows_by_id = None
+
+    def __len__(self):
+        return len(self.booking_ids)
+
+    @property
+    def room_type_names(self):
+        return self._room_type_names
+
+    @property
+    def payment_type_names(self):
+        return PAYMENT_TYPES
+
+    def _encode_booking_id(self, booking_id):
+        """
+        Pack a booking ID into 64 bits: hex IDs are stored as their value, anything else by reference.
+        """
+        code = self._hex_code(booking_id)
+        if code is not None:
+            return code
+        self._opaque_ids.append(booking_id)
+        return _OPAQUE_ID | (len(self._opaque_ids) - 1)
+
+    @staticmethod
+    def _hex_code(booking_id):
+        """
+        Value of a lowercase hex ID, or None if it does not round-trip.
+
+        Allocated IDs (16 digits, see hotel.ids) are 63-bit values of at least
+        2**32; legacy 8-digit IDs are below 2**32, so the width is implied by the value.
+        """
+        if len(booking_id) not in (8, 16):
+            return None
+        try:
+            code = int(booking_id, 16)
+        except ValueError:
+            return None
+        return code if code < _OPAQUE_ID and BookingStore._format_code(code) == booking_id else None
+
+    @staticmethod
+    def _format_code(code):
+        return format(code, "08x" if code < 1 << 32 else "016x")
+
+    def _decode_booking_id(self, code):
+        if code & _OPAQUE_ID:
+            return self._opaque_ids[code & ~_OPAQUE_ID]
+        return self._format_code(code)
+
+    def _code(self, codes, names, name):
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def append(self, booking):
+        """
+        Archive a Booking as one row.
+        :param booking: Booking object
+        :return: int, row number of the booking
+        """
+        room = booking.room
+        payment = booking.payment
+        self.booking_ids.append(self._encode_booking_id(booking.booking_id))
+        self.guest_numbers.append(self._code(self._guest_numbers, self._guest_ids, booking.guest.guest_id))
+        self.room_numbers.append(room.room_number)
+        self.room_types.append(self._code(self._room_type_codes, self._room_type_names, room.__class__.__name__))
+        self.check_ins.append(booking.check_in_date.toordinal())
+        self.check_outs.append(booking.check_out_date.toordinal())
+        # The rate actually invoiced (dynamic pricing may differ from the list price), as reporting uses.
+        invoice = booking.invoice
+        nights = (booking.check_out_date - booking.check_in_date).days
+        self.rates.append(invoice["total"] / nights if invoice else room.price_per_night)
+        self.payment_types.append(PAYMENT_TYPES.index(payment.__class__.__name__) if payment is not None else 0)
+        self._rows_by_id = None
+        return len(self.booking_ids) - 1
+
+    def extend(self, bookings):
+        """
+        Archive many bookings.
+        :param bookings: iterable, Booking objects
+        """
+        for booking in bookings:
+            self.append(booking)
+
+    def record(self, row):
+        """
+        Rebuild the fields of one archived booking.
+        :param row: int, row number
+        :return: BookingRecord
+        """
+        nights = self.check_outs[row] - self.check_ins[row]
+        return BookingRecord(
+            self._decode_booking_id(self.booking_ids[row]),
+            self._guest_ids[self.guest_numbers[row]],
+            self.room_numbers[row],
+            self._room_type_names[self.room_types[row]],
+            date.fromordinal(self.check_ins[row]),
+            date.fromordinal(self.check_outs[row]),
+            self.rates[row],
+            nights * self.rates[row],
+            PAYMENT_TYPES[self.payment_types[row]] or None,
+        )
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.record(row)
+
+    def find(self, booking_id):
+        """
+        Look up an archived booking by ID; the ID index is built on first use.
+        :return: BookingRecord, or None if unknown
+        """
+        if self._rows_by_id is None:
+            self._rows_by_id = {code: row for row, code in enumerate(self.booking_ids)}
+            self._rows_by_id.update((opaque, self._rows_by_id[_OPAQUE_ID | i])
+                                    for i, opaque in enumerate(self._opaque_ids))
+        code = self._hex_code(booking_id)
+        row = self._rows_by_id.get(booking_id if code is None else code)
+        return None if row is None else self.record(row)
+
+    def rows_for_guest(self, guest_id):
+        """
+        List the row numbers of a guest's archived bookings.
+        """
+        number = self._guest_numbers.get(guest_id)
+        if number is None:
+            return []
+        return [row for row, guest in enumerate(self.guest_numbers) if guest == number]
+
+    def nbytes(self):
+        """
+        Bytes held by the column arrays.
+        """
+        columns = (self.booking_ids, self.guest_numbers, self.room_numbers, self.room_types,
+                   self.check_ins, self.check_outs, self.rates, self.payment_types)
+        return sum(column.itemsize * len(column) for column in columns)
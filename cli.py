@@ -1,25 +1,150 @@
-from datetime import datetime
+import os
+import tempfile
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
 from hotel.guest import Guest
+from hotel.directory import GuestDirectory
+from hotel.loyalty import LoyaltyLedger
+from hotel.dispatch import ServiceDispatcher, DONE, FAILED
+from hotel.feedback_store import FeedbackStore
+from hotel.ids import new_id, configure as configure_ids
 from hotel.room import SingleRoom, DoubleRoom, Suite
-from hotel.booking import Booking, CreditCardPayment, MobileWalletPayment
+from hotel.booking import Booking, CreditCardPayment, MobileWalletPayment, PAYMENT_PENDING
 from hotel.services import ServiceRequest, Feedback
-import uuid
+from hotel.booking_service import BookingService, BookingConflictError
+from hotel.inventory import InventoryIndex
+from hotel.assignment import RoomAssigner
+from hotel.holds import HoldManager
+from hotel.history import UPCOMING, PAST
+from hotel.waitlist import Waitlist, OFFERED
+from hotel.settlement import PaymentSettlement, FakeGateway
+from hotel.pricing import PricingEngine
+from hotel.search_cache import SearchCache, search_key, normalize_amenities
+import argparse
+
+# Bookings shown per page of the interactive reservation history.
+HISTORY_PAGE_SIZE = 10
 
 class HotelCLI:
     """
     Command Line Interface (CLI) for the hotel management system.
     """
-    def __init__(self):
+    def __init__(self, repository=None, journal=None, gateway=None, node_id=None):
         """
         Initialize the hotel CLI with available rooms and guest list.
+        :param repository: HotelRepository, optional persistent storage
+        :param journal: HotelJournal, optional event journal restored on startup
+        :param gateway: PaymentGateway, settles booking payments (a local FakeGateway if None)
+        :param node_id: int, ID minting node of this process; defaults to $HOTEL_NODE_ID, else one is leased
+            next to the journal or database (see hotel.ids.claim_node_id)
         """
-        self.guests = []
-        self.rooms = [
-            SingleRoom(101),
-            DoubleRoom(201),
-            Suite(301)
-        ]
+        self.repository = repository
+        self.journal = journal
+        configure_ids(node_id, self._node_directory())
+        # A repository is read on demand: guests are loaded when first looked up and
+        # rooms keep only the stays not yet over, so start-up does not grow with history.
+        self.guests = list(journal.guests.values()) if journal else []
+        self.directory = GuestDirectory(self.guests)
+        self.loyalty = LoyaltyLedger((guest.loyalty_account for guest in self.guests),
+                                     entries=journal.ledger_entries if journal else (),
+                                     on_entries=self._ledger_entries_added)
+        if journal:
+            self.rooms = sorted(journal.rooms.values(), key=lambda room: room.room_number)
+        else:
+            self.rooms = repository.load_rooms(stays_after=date.today()) if repository else []
+        if not self.rooms:
+            self.rooms = [
+                SingleRoom(101),
+                DoubleRoom(201),
+                Suite(301)
+            ]
+            if repository:
+                repository.save_rooms(self.rooms)
+            if journal:
+                for room in self.rooms:
+                    journal.log_room_added(room)
+        for room in self.rooms:
+            room.add_listener(self._room_changed)
+        for guest in self.guests:
+            guest.loyalty_account.add_listener(self._points_changed)
+        self.booking_service = BookingService(self.rooms)
+        self.holds = HoldManager(self.booking_service, on_expired=self._hold_expired, guard=self._recording)
+        self.inventory = InventoryIndex(self.rooms)
+        self.waitlist = Waitlist(self.rooms, self.inventory, self.holds)
+        self.assigner = RoomAssigner(self.inventory, booking_service=self.booking_service)
+        self.pricing = PricingEngine(self.rooms)
+        self.search_cache = SearchCache(self.rooms, self.pricing)
         self.current_guest = None
+        self.feedback = FeedbackStore(journal.feedback if journal else ())
+        self.dispatcher = ServiceDispatcher(on_status=self._service_status_changed)
+        if journal:
+            open_requests = [request for request in journal.service_requests
+                             if request.request_id and request.status not in (DONE, FAILED)]
+        else:
+            open_requests = repository.open_service_requests() if repository else []
+        for service_request in open_requests:
+            self._dispatch(service_request)
+        self.settlement = PaymentSettlement(gateway or FakeGateway(), on_settled=self._payments_settled)
+        # Payments still unsettled at shutdown go again; their idempotency keys stop double charges.
+        if journal or not repository:
+            unsettled = (booking for guest in self.guests for booking in guest.bookings
+                         if booking.invoice and booking.invoice.get("payment_status") == PAYMENT_PENDING)
+        else:
+            unsettled = repository.unsettled_bookings()
+        for booking in unsettled:
+            self.settlement.submit(booking)
+
+    def _node_directory(self):
+        """
+        Directory shared by every process writing the same data, where node IDs are leased.
+        """
+        if self.journal:
+            return self.journal.directory
+        if self.repository and self.repository.path not in ("", ":memory:"):
+            return os.path.dirname(os.path.abspath(self.repository.path))
+        # Nothing minted here outlives the process; leasing still keeps local processes apart.
+        return os.path.join(tempfile.gettempdir(), "hotel-nodes")
+
+    def close(self):
+        """
+        Finish the queued service requests and payments and stop the dispatcher, hold expiry and settlement.
+        """
+        self.dispatcher.stop()
+        self.holds.stop()
+        self.settlement.stop()
+
+    def _recording(self):
+        """
+        Context wrapping a state change and the journal event recording it, so no snapshot falls in between.
+        """
+        return self.journal.recording() if self.journal else nullcontext()
+
+    def _payments_settled(self, bookings):
+        """
+        Persist the settlement outcome of a batch of payments (called from the settlement thread).
+        """
+        # A booking cancelled while its payment was in flight is already archived without it.
+        bookings = [booking for booking in bookings if not booking.cancelled]
+        if not bookings:
+            return
+        if self.repository:
+            self.repository.save_settlements(bookings)
+        if self.journal:
+            self.journal.log_payments_settled(bookings)
+
+    def enable_metrics(self, port=None):
+        """
+        Turn on hot-path metrics and gauges for this hotel.
+        :param port: int, also serve them (and the profiling toggles) over HTTP on this port
+        :return: MetricsRegistry
+        """
+        from hotel.metrics import REGISTRY, instrument_hotel
+
+        instrument_hotel(self, REGISTRY)
+        REGISTRY.enable()
+        if port:
+            REGISTRY.serve(port=port)
+        return REGISTRY
 
     def start(self):
         """
@@ -33,9 +158,12 @@ class HotelCLI:
             print("4. View Reservation History")
             print("5. Request Service")
             print("6. Submit Feedback")
-            print("7. Exit")
+            print("7. Login as Returning Guest")
+            print("8. Cancel or Change Booking")
+            print("9. Join Waitlist")
+            print("10. Exit")
             
-            choice = input("Enter your choice (1-7): ")
+            choice = input("Enter your choice (1-10): ")
             
             if choice == '1':
                 self.create_guest_account()
@@ -50,34 +178,538 @@ class HotelCLI:
             elif choice == '6':
                 self.submit_feedback()
             elif choice == '7':
+                self.login()
+            elif choice == '8':
+                self.manage_booking()
+            elif choice == '9':
+                self.waitlist_menu()
+            elif choice == '10':
                 print("Thank you for using Royal Stay Hotel System!")
                 break
             else:
                 print("Invalid choice. Please try again.")
 
+    # Non-interactive operations shared by the menu and the API server
+
+    def register_guest(self, name, email, contact):
+        """
+        Create and store a new guest account.
+        :return: Guest object
+        """
+        guest_id = new_id()
+        new_guest = Guest(guest_id, name, email, contact)
+        self._track_guest(new_guest)
+        if self.repository:
+            self.repository.save_guest(new_guest)
+        if self.journal:
+            self.journal.log_guest_created(new_guest)
+        return new_guest
+
+    def find_guest(self, guest_id):
+        """
+        Look up a guest by ID.
+        :return: Guest object, or None if unknown
+        """
+        guest = self.directory.get(guest_id)
+        if guest is None and self.repository:
+            guest = self.repository.get_guest(guest_id)
+            if guest is not None:
+                self._track_guest(guest, self.repository.ledger_entries(guest_id))
+        return guest
+
+    def _track_guest(self, guest, history=()):
+        """
+        Add a guest to the in-memory list, directory and loyalty ledger.
+        :param history: iterable, the account's stored ledger rows, so the ledger resumes from them
+        """
+        self.guests.append(guest)
+        self.directory.add(guest)
+        self.loyalty.register(guest.loyalty_account, history)
+        guest.loyalty_account.add_listener(self._points_changed)
+
+    def _ledger_entries_added(self, rows):
+        """
+        Persist new loyalty ledger rows, and in the journal the tier they left each account on.
+        """
+        if self.repository:
+            self.repository.save_ledger_entries(rows)
+        if self.journal:
+            accounts = {row[0]: self.directory.get(row[0]).loyalty_account for row in rows}
+            self.journal.log_ledger_entries(rows, accounts.values())
+
+    def _room_changed(self, room, field, old_value):
+        """
+        Persist a room taken out of or put back into service.
+        """
+        if field != "is_available" or room.is_available == old_value:
+            return
+        if self.repository:
+            self.repository.save_room(room)
+        if self.journal:
+            self.journal.log_availability_changed(room)
+
+    def _points_changed(self, account, field, old_value):
+        """
+        Journal point changes that no booking event replays, i.e. redemptions.
+        """
+        delta, kind, reference = old_value
+        if field == "points" and kind != "earn" and self.journal:
+            self.journal.log_points_earned(self.directory.get(account.account_id), delta, kind, reference)
+
+    def set_room_availability(self, room, available):
+        """
+        Take a room out of service or put it back; its listeners save and journal the change.
+        """
+        with self._recording():
+            room.update_availability(available)
+        if available:
+            self.fill_waitlist()
+
+    def redeem_points(self, guest, amount, reference=None):
+        """
+        Spend loyalty points from a guest's balance and save it.
+        :param reference: str, what the points were redeemed for
+        :raises ValueError: if the balance is too low
+        """
+        with self._recording():
+            guest.loyalty_account.redeem_points(amount, reference)
+        if self.repository:
+            self.repository.save_guest(guest)
+
+    def lookup_guest(self, key):
+        """
+        Find a returning guest by guest ID, email address or phone number.
+        :param key: str, identifier given by the guest
+        :return: Guest object, or None if unknown
+        """
+        guest = self.directory.lookup(key)
+        if guest is None and self.repository:
+            # Guests this process has not used yet are only indexed on disk.
+            guest_id = self.repository.lookup_guest_id(key)
+            guest = self.find_guest(guest_id) if guest_id else None
+        return guest or self.find_guest(key.strip())
+
+    def search_guests(self, prefix, limit=10):
+        """
+        Type-ahead search of guests by the beginning of their name.
+        :return: list, Guest objects ordered by name
+        """
+        if self.repository and not self.journal:
+            return [guest for guest in map(self.find_guest, self.repository.search_guest_ids(prefix, limit)) if guest]
+        return self.directory.search_name(prefix, limit)
+
+    def _check_stored_stays(self, room, check_in, check_out):
+        """
+        Check a stay starting before today against the stored bookings; only stays not yet over are in memory.
+        :raises BookingConflictError: if a stored booking overlaps the stay
+        """
+        if (self.repository and not self.journal and check_in < date.today()
+                and self.repository.has_conflict(room.room_number, check_in, check_out)):
+            raise BookingConflictError(f"Room {room.room_number} is not available from {check_in} to {check_out}")
+
+    def available_rooms(self, check_in, check_out, room_type=None, min_price=None, max_price=None, amenities=()):
+        """
+        List the rooms free for every night of a date range, cheapest first.
+        :param room_type: str, optional room class name filter
+        :param min_price: float, optional lower price bound
+        :param max_price: float, optional upper price bound
+        :param amenities: iterable, amenities every room must have
+        :return: list, Room objects
+        """
+        return self.inventory.find(room_type, min_price, max_price, amenities, check_in, check_out)
+
+    def _hold_expired(self, hold):
+        """
+        Offer the dates of a lapsed hold to the waitlist (called from the hold expiry thread).
+        A lapsed waitlist offer waits again, for other rooms.
+        """
+        self.waitlist.lapsed(hold.hold_id)
+        self.fill_waitlist()
+
+    def fill_waitlist(self):
+        """
+        Hold the rooms freed since the last call for the guests waiting for them.
+        :return: list, WaitlistEntry objects offered a room
+        """
+        offers = self.waitlist.match()
+        if offers:
+            self.holds.start()
+        return offers
+
+    def join_waitlist(self, guest, room_type, check_in, check_out):
+        """
+        Wait for a room of a class to free up; one already free is held for the guest at once.
+        :param room_type: str, room class name, or None for any class
+        :return: WaitlistEntry object, Offered with a hold to book, or Waiting
+        """
+        entry = self.waitlist.join(guest, room_type, check_in, check_out)
+        if entry.status == OFFERED:
+            self.holds.start()
+        return entry
+
+    def release_hold(self, hold_id):
+        """
+        Give a held room's dates back and offer them to the waitlist; a waitlist offer given back leaves it.
+        :return: bool, True if the hold was outstanding
+        """
+        released = self.holds.release(hold_id)
+        if released:
+            self.waitlist.declined(hold_id)
+            self.fill_waitlist()
+        return released
+
+    def find_booking(self, guest, booking_id):
+        """
+        Look up one of a guest's active bookings.
+        :return: Booking object, or None if the guest has no such booking
+        """
+        return next((booking for booking in guest.bookings if booking.booking_id == booking_id), None)
+
+    def _check_not_started(self, booking):
+        """
+        Refuse to change a booking whose stay has begun or ended.
+        """
+        if booking.check_in_date <= date.today():
+            raise ValueError(f"Booking {booking.booking_id} has already started")
+
+    def cancel_booking(self, guest, booking_id):
+        """
+        Cancel a guest's booking, take back its loyalty points and offer its nights to the waitlist.
+        :return: Booking object, the cancelled booking
+        :raises ValueError: if the guest has no such booking or its stay has started
+        """
+        booking = self.find_booking(guest, booking_id)
+        if booking is None:
+            raise ValueError(f"Unknown booking: {booking_id}")
+        self._check_not_started(booking)
+        with self._recording():
+            self.booking_service.cancel(booking)
+            if self.repository:
+                self.repository.cancel_booking(booking, date.today())
+            if self.journal:
+                self.journal.log_booking_cancelled(booking)
+        self.fill_waitlist()
+        return booking
+
+    def modify_booking(self, guest, booking_id, check_in=None, check_out=None, room=None):
+        """
+        Change a booking's dates and/or room, re-pricing it and adjusting its loyalty points.
+
+        A booking made by room type whose room is taken for the new dates
+        moves to the best free room of its type instead.
+        :param check_in: date, new check-in date (unchanged if None)
+        :param check_out: date, new check-out date (unchanged if None)
+        :param room: Room object, room to move to (the booking's own if None)
+        :return: Booking object, the changed booking
+        :raises ValueError: if the guest has no such booking, its stay has started or the new check-in has passed
+        :raises BookingConflictError: if no suitable room is free for the new dates
+        """
+        booking = self.find_booking(guest, booking_id)
+        if booking is None:
+            raise ValueError(f"Unknown booking: {booking_id}")
+        self._check_not_started(booking)
+        check_in = check_in or booking.check_in_date
+        check_out = check_out or booking.check_out_date
+        if check_in <= date.today():
+            raise ValueError("Check-in date must be after today")
+        target = room or booking.room
+        with self._recording():
+            try:
+                self.booking_service.modify(booking, target, check_in, check_out,
+                                            self.pricing.quote(target, check_in, check_out))
+            except BookingConflictError:
+                if room is not None or not booking.flexible:
+                    raise
+                target = self.assigner.best_room(booking.room.__class__.__name__, check_in, check_out,
+                                                exclude=(booking.room.room_number,))
+                if target is None:
+                    raise
+                self.booking_service.modify(booking, target, check_in, check_out,
+                                            self.pricing.quote(target, check_in, check_out))
+            if self.repository:
+                self.repository.change_booking(booking)
+            if self.journal:
+                self.journal.log_booking_changed(booking)
+        self.fill_waitlist()
+        return booking
+
+    def hold_room(self, guest, room, check_in, check_out, ttl=None):
+        """
+        Hold a room's dates for a guest while they pay; pass the hold to book_room to confirm it.
+        :param ttl: float, seconds before the hold is released (HoldManager's default if None)
+        :return: Hold object
+        """
+        self._check_stored_stays(room, check_in, check_out)
+        self.holds.start()
+        return self.holds.hold(guest, room, check_in, check_out, ttl)
+
+    def book_room(self, guest, room, check_in, check_out, payment_method, flexible=False, hold=None,
+                  **payment_details):
+        """
+        Book a room for a guest, persist the booking and queue its payment for settlement.
+        :param guest: Guest object
+        :param room: Room object
+        :param check_in: date, check-in date
+        :param check_out: date, check-out date
+        :param payment_method: str, "credit_card" or "mobile_wallet"
+        :param flexible: bool, the hotel chose the room and may move the stay before arrival
+        :param hold: Hold object from hold_room covering this stay; the booking takes over its reservation
+        :param payment_details: card_number/expiry_date or wallet_type/phone_number
+        :return: Booking object
+        """
+        if check_out <= check_in:
+            raise ValueError("Check-out date must be after check-in date")
+        if hold is not None and (hold.guest.guest_id != guest.guest_id or hold.room is not room
+                                 or (hold.check_in_date, hold.check_out_date) != (check_in, check_out)):
+            raise ValueError("The hold does not match this booking")
+        if hold is None:
+            self._check_stored_stays(room, check_in, check_out)
+        booking_id = hold.hold_id if hold is not None else new_id()
+        booking = Booking(guest, room, check_in, check_out, booking_id, flexible)
+
+        amount = self.pricing.quote(room, check_in, check_out)
+        payment_date = str(datetime.today().date())
+        transaction_id = new_id()
+        if payment_method == "credit_card":
+            payment = CreditCardPayment(amount, payment_details.get("card_number"),
+                                        payment_details.get("expiry_date"), payment_date, transaction_id)
+        elif payment_method == "mobile_wallet":
+            payment = MobileWalletPayment(amount, payment_details.get("wallet_type"),
+                                          payment_details.get("phone_number"), payment_date, transaction_id)
+        else:
+            raise ValueError("Invalid payment choice")
+
+        # Process booking and payment
+        booking.set_payment(payment)
+        booking.generate_invoice(self.pricing)
+        with self._recording():
+            if hold is None:
+                self.booking_service.book(booking)
+            else:
+                self.holds.confirm(hold.hold_id)
+                self.booking_service.record(booking)
+            if self.repository:
+                self.repository.save_booking(booking)
+            if self.journal:
+                self.journal.log_booking_made(booking)
+        if hold is not None:
+            self.waitlist.confirmed(hold.hold_id)
+        # The gateway charge happens in the background; its outcome lands on the invoice.
+        self.settlement.submit(booking)
+        return booking
+
+    def book_room_type(self, guest, room_type, check_in, check_out, payment_method, **payment_details):
+        """
+        Book whichever room of a class the stay fragments least (see RoomAssigner.best_room).
+        :param room_type: str, room class name, e.g. "Suite"
+        :return: Booking object, flexible so the night audit may move it
+        """
+        if check_out <= check_in:
+            raise ValueError("Check-out date must be after check-in date")
+        tried = set()
+        while True:
+            room = self.assigner.best_room(room_type, check_in, check_out, exclude=tried)
+            if room is None:
+                raise BookingConflictError(f"No {room_type} is available from {check_in} to {check_out}")
+            try:
+                return self.book_room(guest, room, check_in, check_out, payment_method, True, **payment_details)
+            except BookingConflictError:
+                # Taken by a concurrent booking since it was chosen; try the next best room.
+                tried.add(room.room_number)
+
+    def reoptimize_rooms(self, today=None):
+        """
+        Night-audit pass: re-pack the room-type bookings arriving after today to lengthen free runs.
+        :param today: date, business date of the run
+        :return: dict, run statistics
+        """
+        today = today or date.today()
+        bookings = {booking.booking_id: booking for guest in self.guests for booking in guest.bookings
+                    if booking.flexible and booking.check_in_date > today}
+        movable = set(bookings)
+        if self.repository:
+            movable.update(self.repository.flexible_booking_ids(today + timedelta(days=1)))
+        with self._recording():
+            moves, summary = self.assigner.reoptimize(movable, today)
+            moved = []
+            for move in moves:
+                booking = bookings.get(move.booking_id)
+                if booking is not None:
+                    booking.move_to(self.booking_service.get_room(move.to_room))
+                    moved.append(booking)
+            if self.repository and moves:
+                self.repository.move_bookings((move.booking_id, move.to_room) for move in moves)
+            if self.journal and moved:
+                self.journal.log_bookings_moved(moved)
+        self.fill_waitlist()
+        print(f"Room re-optimization: {summary['moved']} of {summary['movable']} flexible stays moved, "
+              f"stranded nights {summary['stranded_before']} -> {summary['stranded_after']}, "
+              f"free runs {summary['free_runs_before']} -> {summary['free_runs_after']} "
+              f"in {summary['seconds']:.3f}s")
+        return summary
+
+    def file_service_request(self, guest, request_type, details, room_number=None):
+        """
+        Create a service request on behalf of a guest and queue it for staff.
+        :param room_number: int, room the request is for (defaults to the guest's current stay)
+        :return: ServiceRequest object
+        """
+        if not isinstance(request_type, str) or not request_type.strip():
+            raise ValueError("Service type is required")
+        if details is not None and not isinstance(details, str):
+            raise ValueError("Request details must be text")
+        if room_number is not None and self.booking_service.get_room(room_number) is None:
+            raise ValueError(f"Unknown room {room_number}")
+        if room_number is None:
+            today = date.today()
+            room_number = next((booking.room.room_number for booking in reversed(guest.bookings)
+                                if booking.check_in_date <= today < booking.check_out_date), None)
+        service_request = ServiceRequest(request_type, details,
+                                         request_date=datetime.now().isoformat(timespec="seconds"),
+                                         request_id=new_id(), guest_id=guest.guest_id,
+                                         room_number=room_number)
+        if self.repository:
+            self.repository.save_service_request(service_request)
+        if self.journal:
+            self.journal.log_service_request(guest, service_request)
+        self._dispatch(service_request, guest)
+        return service_request
+
+    def _dispatch(self, service_request, guest=None):
+        """
+        Queue a service request, ranked by the requesting guest's loyalty tier and aged from its request time.
+        """
+        guest = guest or self.find_guest(service_request.guest_id)
+        try:
+            age = max(0.0, (datetime.now() - datetime.fromisoformat(service_request.request_date)).total_seconds())
+        except (TypeError, ValueError):
+            age = 0.0
+        self.dispatcher.start()
+        self.dispatcher.submit(service_request, guest.loyalty_account.tier if guest else "Basic", age)
+
+    def complete_service_request(self, request_id):
+        """
+        Close a service request once staff have carried it out.
+        :return: ServiceRequest object, or None if no open request has that ID
+        """
+        return self.dispatcher.complete(request_id)
+
+    def _service_status_changed(self, service_request):
+        """
+        Persist a status change reported by the dispatcher.
+        """
+        if self.repository:
+            self.repository.save_service_request(service_request)
+        if self.journal:
+            self.journal.log_service_status(service_request)
+
+    def record_feedback(self, guest, rating, comments, booking_id=None):
+        """
+        Store feedback from a guest.
+        :param booking_id: str, the guest's booking the feedback is about (defaults to their most recent past stay)
+        :return: Feedback object
+        """
+        if not 1 <= rating <= 5:
+            raise ValueError("Rating must be between 1 and 5")
+        if comments is not None and not isinstance(comments, str):
+            raise ValueError("Comments must be text")
+        if booking_id is None:
+            booking = next(guest.history.iterate(when=PAST, descending=True), None)
+        else:
+            booking = next((b for b in guest.bookings if b.booking_id == booking_id), None)
+            if booking is None:
+                raise ValueError(f"Guest {guest.guest_id} has no booking {booking_id}")
+        feedback = Feedback(rating, comments, guest.name, str(datetime.today().date()),
+                            booking.booking_id if booking else None,
+                            booking.room.__class__.__name__ if booking else None)
+        # Index it first: whatever the store cannot take must not reach the journal and fail every restart.
+        self.feedback.add(feedback)
+        if self.journal:
+            self.journal.log_feedback(guest, feedback)
+        return feedback
+
+    # Interactive menu actions
+
     def create_guest_account(self):
         """
         Create a new guest account by collecting user details.
         """
-        guest_id = str(uuid.uuid4())[:8]  # Generate unique guest ID
         name = input("Enter your full name: ")
         email = input("Enter your email: ")
         contact = input("Enter your contact number: ")
-        new_guest = Guest(guest_id, name, email, contact)
-        self.guests.append(new_guest)
-        self.current_guest = new_guest
-        print(f"\nAccount created successfully! Welcome, {name}! Your Guest ID: {guest_id}")
+        self.current_guest = self.register_guest(name, email, contact)
+        print(f"\nAccount created successfully! Welcome, {name}! Your Guest ID: {self.current_guest.guest_id}")
     
+    def login(self):
+        """
+        Log in a returning guest by ID, email, phone number or name.
+        """
+        key = input("Enter your Guest ID, email, phone number or name: ").strip()
+        guest = self.lookup_guest(key) if key else None
+        if guest is None and key:
+            matches = self.search_guests(key)
+            if len(matches) == 1:
+                guest = matches[0]
+            elif matches:
+                for i, match in enumerate(matches, 1):
+                    print(f"{i}. {match.name} ({match.email})")
+                pick = input(f"Select guest (1-{len(matches)}): ").strip()
+                if pick.isdigit() and 1 <= int(pick) <= len(matches):
+                    guest = matches[int(pick) - 1]
+        if guest is None:
+            print("No matching guest found.")
+            return
+        self.current_guest = guest
+        print(f"\nWelcome back, {guest.name}! Your Guest ID: {guest.guest_id}")
+
+    def _prompt_date_range(self):
+        """
+        Ask for a check-in/check-out range.
+        :return: tuple, (check_in, check_out) dates
+        """
+        check_in = datetime.strptime(input("Enter check-in date (YYYY-MM-DD): "), "%Y-%m-%d").date()
+        check_out = datetime.strptime(input("Enter check-out date (YYYY-MM-DD): "), "%Y-%m-%d").date()
+        if check_out <= check_in:
+            raise ValueError("Check-out date must be after check-in date")
+        return check_in, check_out
+
     def search_rooms(self):
         """
-        Display available rooms and their details.
+        Display rooms available for a date range and their details.
         """
-        print("\nAvailable Rooms:")
-        for room in self.rooms:
-            if room.is_available:
-                print(f"{room.__class__.__name__} Room {room.room_number} - ${room.price_per_night}/night")
-                print(f"Amenities: {', '.join(room.amenities)}")
-                print("-" * 40)
+        try:
+            check_in, check_out = self._prompt_date_range()
+            room_type = input("Room type (SingleRoom, DoubleRoom, Suite; blank for any): ").strip() or None
+            max_price = input("Maximum price per night (blank for any): ").strip()
+            max_price = float(max_price) if max_price else None
+            amenities = input("Required amenities, comma separated (blank for none): ")
+            amenities = normalize_amenities(amenities.split(","))
+        except ValueError as e:
+            print(f"Error: {str(e)}")
+            return
+
+        print(f"\nAvailable Rooms from {check_in} to {check_out}:")
+        key = search_key(check_in, check_out, room_type, max_price=max_price, amenities=amenities)
+        listing = self.search_cache.get_or_compute(
+            "listing", key, lambda: self._room_listing(check_in, check_out, room_type, max_price, amenities))
+        if listing:
+            print(listing)
+
+    def _room_listing(self, check_in, check_out, room_type, max_price, amenities):
+        """
+        Format the available rooms for a search as the text search_rooms prints.
+        :return: str, one block per room
+        """
+        rooms = self.available_rooms(check_in, check_out, room_type, max_price=max_price, amenities=amenities)
+        quotes = self.pricing.quote_many(rooms, check_in, check_out)
+        lines = []
+        for room in rooms:
+            lines.append(f"{room.__class__.__name__} Room {room.room_number} - ${room.price_per_night}/night")
+            lines.append(f"Total for your stay: ${quotes[room.room_number]:.2f}")
+            lines.append(f"Amenities: {', '.join(room.amenities)}")
+            lines.append("-" * 40)
+        return "\n".join(lines)
+
     def view_reservation_history(self):
         """
         Display the current guest's booking history.
@@ -89,11 +721,21 @@ class HotelCLI:
         history = self.current_guest.view_reservation_history()
         if not history:
             print("You have no previous reservations.")
-        else:
-            print("\n=== Your Reservation History ===")
-            for booking in history:
-                print(booking)
-                print("-" * 40)
+            return
+        print("\n=== Your Reservation History ===")
+        # Upcoming stays soonest first, then past stays most recent first, a page at a time.
+        for title, when, descending in (("Upcoming stays", UPCOMING, False), ("Past stays", PAST, True)):
+            print(f"\n--- {title} ---")
+            bookings, cursor = history.page(HISTORY_PAGE_SIZE, when=when, descending=descending)
+            if not bookings:
+                print("None")
+            while bookings:
+                for booking in bookings:
+                    print(booking)
+                    print("-" * 40)
+                if cursor is None or input("Show more? (y/n): ").strip().lower() != "y":
+                    break
+                bookings, cursor = history.page(HISTORY_PAGE_SIZE, cursor, when=when, descending=descending)
 
 
     def make_booking(self):
@@ -105,59 +747,189 @@ class HotelCLI:
             return
 
         try:
-            room_number = int(input("Enter room number to book: "))
-            selected_room = next((r for r in self.rooms if r.room_number == room_number), None)
-            
-            if not selected_room or not selected_room.is_available:
-                print("Invalid room number or room not available")
-                return
+            check_in, check_out = self._prompt_date_range()
+            choice = input("Enter room number to book (or SingleRoom/DoubleRoom/Suite for the best available): ")
+            flexible = not choice.strip().isdigit()
+            if not flexible:
+                selected_room = self.booking_service.get_room(int(choice))
+                if not selected_room or not selected_room.is_available_for(check_in, check_out):
+                    print("Invalid room number or room not available for the selected dates")
+                    return
+            else:
+                room_type = choice.strip()
+                selected_room = self.assigner.best_room(room_type, check_in, check_out)
+                if selected_room is None:
+                    print(f"No {room_type} available for the selected dates")
+                    return
+                print(f"Assigned room {selected_room.room_number}")
+            # Hold the room while the guest enters payment details, so nobody else can take it meanwhile.
+            hold = self.hold_room(self.current_guest, selected_room, check_in, check_out)
+            self._pay_for_hold(hold, flexible)
 
-            check_in = datetime.strptime(input("Enter check-in date (YYYY-MM-DD): "), "%Y-%m-%d").date()
-            check_out = datetime.strptime(input("Enter check-out date (YYYY-MM-DD): "), "%Y-%m-%d").date()
-            
-            if check_out <= check_in:
-                print("Check-out date must be after check-in date")
-                return
-            
-            booking_id = str(uuid.uuid4())[:8]  # Generate unique booking ID
-            booking = Booking(self.current_guest, selected_room, check_in, check_out, booking_id)
-            
+        except ValueError as e:
+            print(f"Error: {str(e)}")
+
+    def _pay_for_hold(self, hold, flexible):
+        """
+        Take the current guest's payment details and book a held room; the hold is given back if they don't.
+        """
+        try:
             # Choose payment method
             print("\nPayment Options:")
             print("1. Credit Card")
             print("2. Mobile Wallet")
             pay_choice = input("Select payment method (1-2): ")
-            
-            amount = selected_room.price_per_night * (check_out - check_in).days
-            payment_date = str(datetime.today().date())
-            transaction_id = str(uuid.uuid4())[:8]
-            
+
             if pay_choice == '1':
                 card = input("Enter card number: ")
                 expiry = input("Enter expiry (MM/YY): ")
-                payment = CreditCardPayment(amount, card, expiry, payment_date, transaction_id)
+                booking = self.book_room(self.current_guest, hold.room, hold.check_in_date, hold.check_out_date,
+                                         "credit_card", flexible, hold, card_number=card, expiry_date=expiry)
             elif pay_choice == '2':
                 wallet = input("Enter wallet type (e.g., PayPal, Google Pay): ")
                 number = input("Enter mobile number: ")
-                payment = MobileWalletPayment(amount, wallet, number, payment_date, transaction_id)
+                booking = self.book_room(self.current_guest, hold.room, hold.check_in_date, hold.check_out_date,
+                                         "mobile_wallet", flexible, hold, wallet_type=wallet, phone_number=number)
             else:
                 print("Invalid payment choice")
                 return
+        finally:
+            # A confirmed hold is already gone; anything else gives the dates back.
+            self.release_hold(hold.hold_id)
+        invoice, payment = booking.invoice, booking.payment
 
-            # Process booking and payment
-            booking.set_payment(payment)
-            invoice = booking.generate_invoice()
-            selected_room.update_availability(False)
-            self.current_guest.make_booking(booking)
-            
-            # Display booking confirmation
-            print("\nBooking Successful!")
-            print(f"Invoice Total: ${invoice['total']}")
-            print(payment.process_payment())
+        # Display booking confirmation
+        print("\nBooking Successful!")
+        print(f"Invoice Total: ${invoice['total']}")
+        print(payment.process_payment())
+        print(f"Payment status: {invoice['payment_status']}")
+
+    def manage_booking(self):
+        """
+        Let the current guest cancel an upcoming booking or change its dates.
+        """
+        if not self.current_guest:
+            print("Please create an account or login first!")
+            return
+
+        bookings, _ = self.current_guest.view_reservation_history().page(HISTORY_PAGE_SIZE, when=UPCOMING)
+        if not bookings:
+            print("You have no upcoming reservations.")
+            return
+        print("\n=== Your Upcoming Stays ===")
+        for number, booking in enumerate(bookings, 1):
+            print(f"{number}. {booking}")
+        try:
+            booking = bookings[int(input(f"Select a booking (1-{len(bookings)}): ")) - 1]
+            print("1. Cancel Booking")
+            print("2. Change Dates")
+            action = input("Select an option (1-2): ")
+            if action == '1':
+                self.cancel_booking(self.current_guest, booking.booking_id)
+                print("Booking cancelled.")
+            elif action == '2':
+                check_in, check_out = self._prompt_date_range()
+                self.modify_booking(self.current_guest, booking.booking_id, check_in, check_out)
+                print(f"Booking changed: {booking}")
+                print(f"Invoice Total: ${booking.invoice['total']}")
+            else:
+                print("Invalid choice")
+        except (IndexError, ValueError) as e:
+            print(f"Error: {str(e) or 'invalid selection'}")
+
+    def waitlist_menu(self):
+        """
+        Offer the current guest the rooms the waitlist has held for them, or put them on it.
+        """
+        if not self.current_guest:
+            print("Please create an account or login first!")
+            return
 
+        try:
+            for entry in self.waitlist.entries_for(self.current_guest.guest_id):
+                if entry.status == OFFERED and self.holds.get(entry.hold.hold_id) is not None:
+                    print(f"Room {entry.hold.room.room_number} is held for you from {entry.check_in_date} "
+                          f"to {entry.check_out_date}.")
+                    if input("Book it now? (y/n): ").strip().lower() == "y":
+                        self._pay_for_hold(entry.hold, entry.room_type is not None)
+                        return
+            check_in, check_out = self._prompt_date_range()
+            room_type = input("Enter room type (SingleRoom/DoubleRoom/Suite, blank for any): ").strip() or None
+            entry = self.join_waitlist(self.current_guest, room_type, check_in, check_out)
+            if entry.status == OFFERED:
+                print(f"Room {entry.hold.room.room_number} is free for those dates and is held for you.")
+                self._pay_for_hold(entry.hold, room_type is not None)
+            else:
+                print("You are on the waitlist; a room will be held for you as soon as one frees up.")
         except ValueError as e:
             print(f"Error: {str(e)}")
     
+    def ingest_bookings(self, path, rejects_path=None):
+        """
+        Import bookings non-interactively from a CSV or JSONL reservation feed.
+        :param path: str, feed file path
+        :param rejects_path: str, file receiving rejected records
+        :return: dict, ingestion summary
+        """
+        from hotel.ingest import BookingIngestor
+
+        ingestor = BookingIngestor(self.rooms, self.guests, self.repository, self.journal, pricing=self.pricing,
+                                   on_new_guest=self._track_guest)
+        summary = ingestor.ingest(path, rejects_path)
+        print(f"Read {summary['read']} records: {summary['accepted']} booked, {summary['rejected']} rejected "
+              f"({summary['per_second']:.0f} records/sec). Rejects written to {summary['rejects_path']}")
+        return summary
+
+    def revenue_report(self, start_date, end_date):
+        """
+        Print occupancy, ADR, RevPAR and revenue breakdowns for a date range.
+        :return: dict, report figures
+        """
+        from hotel.reporting import BookingColumns, revenue_summary
+
+        if self.repository:
+            columns = BookingColumns.from_rows(self.repository.report_rows(start_date, end_date))
+        else:
+            columns = BookingColumns.from_bookings(booking for guest in self.guests for booking in guest.bookings)
+        report = revenue_summary(columns, start_date, end_date, len(self.rooms))
+        print(f"\n=== Revenue Report {report['start']} to {report['end']} ===")
+        print(f"Occupancy: {report['occupancy']:.1%} ({report['room_nights_sold']} of "
+              f"{report['room_nights_available']} room-nights)")
+        print(f"Revenue: ${report['revenue']:.2f}  ADR: ${report['adr']:.2f}  RevPAR: ${report['revpar']:.2f}")
+        for name, revenue in report["revenue_by_room_type"].items():
+            print(f"  {name}: ${revenue:.2f}")
+        for name, revenue in report["revenue_by_payment_method"].items():
+            print(f"  {name}: ${revenue:.2f}")
+        return report
+
+    def run_loyalty_nightly(self, today=None):
+        """
+        Run the nightly loyalty job (points expiry and re-tiering) and save the accounts.
+        :param today: date, business date of the run
+        :return: dict, run statistics
+        """
+        if self.repository and not self.journal:
+            # The nightly pass covers every account, not only the guests this process has looked up.
+            history = {}
+            for entry in self.repository.load_ledger_entries():
+                history.setdefault(entry[0], []).append(entry)
+            for guest in self.repository.load_guests():
+                if guest.guest_id not in self.directory:
+                    self._track_guest(guest, history.get(guest.guest_id, ()))
+        with self._recording():
+            before = [(guest.loyalty_account, guest.loyalty_account.points, guest.loyalty_account.tier)
+                      for guest in self.guests]
+            summary = self.loyalty.run_nightly(today)
+            changed = [account for account, points, tier in before if (account.points, account.tier) != (points, tier)]
+            if self.journal and changed:
+                self.journal.log_loyalty_updated(changed)
+        if self.repository:
+            self.repository.save_guests(self.guests)
+        print(f"Loyalty run: {summary['accounts']} accounts, {summary['ledger_rows']} ledger rows, "
+              f"{summary['expired_points']} points expired on {summary['expired_accounts']} accounts, "
+              f"{summary['promoted']} promoted, {summary['demoted']} demoted in {summary['seconds']:.3f}s")
+        return summary
+
     def request_service(self):
         """
         Allows a guest to request a hotel service.
@@ -170,7 +942,7 @@ class HotelCLI:
         request_type = input("Enter service type (e.g., Housekeeping, Room Service): ")
         details = input("Enter request details: ")
 
-        service_request = ServiceRequest(request_type, details)
+        service_request = self.file_service_request(self.current_guest, request_type, details)
         print("\nService request submitted successfully!")
         print(service_request)
     
@@ -183,13 +955,62 @@ class HotelCLI:
             return
 
         print("\n=== Submit Feedback ===")
-        rating = int(input("Enter your rating (1-5): "))
-        comments = input("Enter your feedback comments: ")
-
-        feedback = Feedback(rating, comments, self.current_guest.name, str(datetime.today().date()))
+        try:
+            rating = int(input("Enter your rating (1-5): "))
+            comments = input("Enter your feedback comments: ")
+            feedback = self.record_feedback(self.current_guest, rating, comments)
+        except ValueError as e:
+            print(f"Error: {str(e)}")
+            return
         print("\nThank you for your feedback!")
         print(feedback)
 
 if __name__ == "__main__":
-    cli = HotelCLI()
-    cli.start()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Royal Stay Hotel Management System")
+    parser.add_argument("--db", help="SQLite database file for persistent storage")
+    parser.add_argument("--journal", help="directory for the event journal and snapshots")
+    parser.add_argument("--compact", action="store_true", help="compact the journal and exit")
+    parser.add_argument("--ingest", metavar="FEED", help="bulk import bookings from a CSV/JSONL feed and exit")
+    parser.add_argument("--rejects", help="file receiving records rejected by --ingest")
+    parser.add_argument("--report", nargs=2, metavar=("START", "END"),
+                        help="print a revenue report for [START, END) (YYYY-MM-DD) and exit")
+    parser.add_argument("--loyalty-run", action="store_true",
+                        help="expire inactive points balances and re-tier loyalty accounts, then exit")
+    parser.add_argument("--reoptimize-rooms", action="store_true",
+                        help="re-pack future room-type bookings to reduce stranded nights, then exit")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics and profiling toggles on this port")
+    parser.add_argument("--metrics-file", help="write Prometheus metrics to this file on exit")
+    parser.add_argument("--node-id", type=int, help="ID minting node of this process (default: $HOTEL_NODE_ID, "
+                                                    "else a free one leased next to the journal or database)")
+    args = parser.parse_args()
+
+    repository = journal = None
+    if args.db:
+        from hotel.storage import HotelRepository
+        repository = HotelRepository(args.db)
+    if args.journal:
+        from hotel.journal import HotelJournal
+        journal = HotelJournal(args.journal)
+    if args.compact:
+        if not journal:
+            parser.error("--compact requires --journal")
+        journal.compact()
+    else:
+        hotel = HotelCLI(repository, journal, node_id=args.node_id)
+        registry = hotel.enable_metrics(args.metrics_port) if args.metrics_port or args.metrics_file else None
+        if args.ingest:
+            hotel.ingest_bookings(args.ingest, args.rejects)
+        elif args.report:
+            start, end = (datetime.strptime(value, "%Y-%m-%d").date() for value in args.report)
+            hotel.revenue_report(start, end)
+        elif args.loyalty_run:
+            hotel.run_loyalty_nightly()
+        elif args.reoptimize_rooms:
+            hotel.reoptimize_rooms()
+        else:
+            hotel.start()
+        hotel.close()
+        if args.metrics_file:
+            registry.write(args.metrics_file)
+    if journal:
+        journal.close()
@@ -0,0 +1,151 @@
+import re
+from bisect import bisect_left, insort
+
+
+def normalize_email(email):
+    """
+    Normalize an email address for lookup (trimmed, lower-case).
+    """
+    return (email or "").strip().lower()
+
+
+def normalize_contact(contact):
+    """
+    Normalize a phone number for lookup (digits only).
+    """
+    return re.sub(r"\D", "", contact or "")
+
+
+def normalize_name(name):
+    """
+    Normalize a name for prefix search (lower-case, single-spaced).
+    """
+    return " ".join((name or "").lower().split())
+
+
+class GuestDirectory:
+    """
+    Indexed directory of guests for front-desk lookup.
+
+    guest_id, normalized email and normalized phone number are hash indexes
+    (O(1) exact lookup). Names live in a sorted key list, so type-ahead
+    prefix search is a bisect to the first match followed by a short walk.
+    The directory listens to each guest and re-indexes on detail changes.
+    """
+    def __init__(self, guests=()):
+        """
+        Initialize the directory.
+        :param guests: iterable, Guest objects to index
+        """
+        self._by_id = {}
+        self._by_email = {}
+        self._by_contact = {}
+        self._names = []
+        for guest in guests:
+            self.add(guest)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, guest_id):
+        return guest_id in self._by_id
+
+    def add(self, guest):
+        """
+        Index a guest and follow later changes to their details.
+        :param guest: Guest object
+        """
+        if guest.guest_id in self._by_id:
+            raise ValueError(f"Guest {guest.guest_id} is already in the directory")
+        self._by_id[guest.guest_id] = guest
+        self._index_field(guest, "email", guest.email)
+        self._index_field(guest, "contact", guest.contact)
+        self._index_field(guest, "name", guest.name)
+        guest.add_listener(self._on_guest_changed)
+
+    def remove(self, guest):
+        """
+        Drop a guest from the directory.
+        """
+        guest.remove_listener(self._on_guest_changed)
+        del self._by_id[guest.guest_id]
+        for field in ("email", "contact", "name"):
+            self._unindex_field(guest, field, getattr(guest, field))
+
+    def _index_field(self, guest, field, value):
+        if field == "email" and normalize_email(value):
+            self._by_email[normalize_email(value)] = guest
+        elif field == "contact" and normalize_contact(value):
+            self._by_contact[normalize_contact(value)] = guest
+        elif field == "name":
+            insort(self._names, (normalize_name(value), guest.guest_id))
+
+    def _unindex_field(self, guest, field, value):
+        if field == "email":
+            if self._by_email.get(normalize_email(value)) is guest:
+                del self._by_email[normalize_email(value)]
+        elif field == "contact":
+            if self._by_contact.get(normalize_contact(value)) is guest:
+                del self._by_contact[normalize_contact(value)]
+        elif field == "name":
+            key = (normalize_name(value), guest.guest_id)
+            i = bisect_left(self._names, key)
+            if i < len(self._names) and self._names[i] == key:
+                del self._names[i]
+
+    def _on_guest_changed(self, guest, field, old_value):
+        self._unindex_field(guest, field, old_value)
+        self._index_field(guest, field, getattr(guest, field))
+
+    def get(self, guest_id):
+        """
+        Look up a guest by ID.
+        :return: Guest object, or None
+        """
+        return self._by_id.get(guest_id)
+
+    def by_email(self, email):
+        """
+        Look up a guest by email address (case and whitespace insensitive).
+        :return: Guest object, or None
+        """
+        return self._by_email.get(normalize_email(email))
+
+    def by_contact(self, contact):
+        """
+        Look up a guest by phone number (formatting insensitive).
+        :return: Guest object, or None
+        """
+        return self._by_contact.get(normalize_contact(contact))
+
+    def lookup(self, key):
+        """
+        Resolve a guest ID, email address or phone number to a guest.
+        :param key: str, whatever the guest gave at the front desk
+        :return: Guest object, or None
+        """
+        key = (key or "").strip()
+        guest = self._by_id.get(key)
+        if guest is None and "@" in key:
+            guest = self.by_email(key)
+        if guest is None and normalize_contact(key):
+            guest = self.by_contact(key)
+        return guest
+
+    def search_name(self, prefix, limit=10):
+        """
+        Type-ahead search of guests whose name starts with a prefix.
+        :param prefix: str, beginning of the name
+        :param limit: int, maximum number of matches
+        :return: list, Guest objects ordered by name
+        """
+        prefix = normalize_name(prefix)
+        matches = []
+        i = bisect_left(self._names, (prefix,))
+        while i < len(self._names) and len(matches) < limit:
+            name, guest_id = self._names[i]
+            if not name.startswith(prefix):
+                break
+            matches.append(self._by_id[guest_id])
+            i += 1
+        return matches
@@ -0,0 +1,216 @@
+import heapq
+import threading
+import time
+from collections import deque
+
+
+PENDING = "Pending"
+IN_PROGRESS = "In Progress"
+DONE = "Done"
+FAILED = "Failed"
+
+# Seconds a request of each type may wait before newer work of any type is served ahead of it.
+TYPE_DEADLINES = {"emergency": 0, "maintenance": 300, "room service": 600, "housekeeping": 1800}
+DEFAULT_DEADLINE = 900
+# Seconds of deadline credit by loyalty tier.
+TIER_CREDITS = {"Basic": 0, "Silver": 60, "Gold": 180, "Platinum": 300}
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ServiceDispatcher:
+    """
+    Priority dispatch of service requests to a pool of staff workers.
+
+    Requests are ordered on a heap by a virtual deadline: submission time
+    plus the allowance for their type, minus a credit for the guest's tier.
+    Urgent types and top-tier guests go first, yet a request's key never
+    changes, so aging comes for free: an old housekeeping request eventually
+    outranks fresh room-service calls. Workers claim the head of the heap and
+    move the request through Pending, In Progress and Done, reporting every
+    status change to ``on_status``. Without a handler a claimed request is
+    assigned to staff and stays In Progress until complete() is called.
+    """
+    def __init__(self, workers=4, handler=None, on_status=None, max_attempts=3, clock=time.monotonic,
+                 sample_size=4096):
+        """
+        Initialize the dispatcher.
+        :param workers: int, number of staff worker threads
+        :param handler: callable, performs a request (called with the ServiceRequest); None leaves it
+            In Progress until complete()
+        :param on_status: callable, called with the ServiceRequest after every status change
+        :param max_attempts: int, attempts before a request whose handler keeps raising is marked Failed
+        :param clock: callable, monotonic time source in seconds
+        :param sample_size: int, recent wait/latency samples kept for percentiles
+        """
+        self._workers = workers
+        self._handler = handler
+        self._on_status = on_status
+        self._max_attempts = max_attempts
+        self._clock = clock
+        self._heap = []
+        self._sequence = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        self._in_progress = 0
+        self._assigned = {}
+        self._submitted = self._completed = self._failed = self._retried = 0
+        self._max_depth = 0
+        self._wait_total = self._latency_total = 0.0
+        self._wait_max = self._latency_max = 0.0
+        self._waits = deque(maxlen=sample_size)
+        self._latencies = deque(maxlen=sample_size)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def start(self):
+        """
+        Start the worker threads (once).
+        """
+        with self._cond:
+            if self._threads:
+                return
+            self._stopping = False
+            self._threads = [threading.Thread(target=self._work, name=f"staff-{i}", daemon=True)
+                             for i in range(self._workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, drain=True):
+        """
+        Stop the workers.
+        :param drain: bool, finish every queued request first
+        """
+        with self._cond:
+            if drain:
+                while self._heap or self._in_progress:
+                    self._cond.wait()
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def priority(self, service_request, tier="Basic", submitted=None):
+        """
+        Virtual deadline of a request; lower is served first.
+        """
+        submitted = self._clock() if submitted is None else submitted
+        allowance = TYPE_DEADLINES.get((service_request.request_type or "").strip().lower(), DEFAULT_DEADLINE)
+        return submitted + allowance - TIER_CREDITS.get(tier, 0)
+
+    def submit(self, service_request, tier="Basic", age=0.0):
+        """
+        Queue a request for the next free worker.
+        :param service_request: ServiceRequest object
+        :param tier: str, loyalty tier of the requesting guest
+        :param age: float, seconds the request has already waited (e.g. before a restart)
+        """
+        submitted = self._clock() - age
+        service_request.status = PENDING
+        with self._cond:
+            self._push(self.priority(service_request, tier, submitted), submitted, service_request, 1)
+            self._submitted += 1
+            self._cond.notify()
+
+    def _push(self, key, submitted, service_request, attempt):
+        self._sequence += 1
+        heapq.heappush(self._heap, (key, self._sequence, submitted, service_request, attempt))
+        self._max_depth = max(self._max_depth, len(self._heap))
+
+    def _set_status(self, service_request, status):
+        service_request.status = status
+        if self._on_status:
+            self._on_status(service_request)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._heap and not self._stopping:
+                    self._cond.wait()
+                if self._stopping and not self._heap:
+                    return
+                key, _, submitted, service_request, attempt = heapq.heappop(self._heap)
+                self._in_progress += 1
+                wait = self._clock() - submitted
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+                self._waits.append(wait)
+            try:
+                self._set_status(service_request, IN_PROGRESS)
+                if self._handler:
+                    self._handler(service_request)
+                    status = DONE
+                else:
+                    status = IN_PROGRESS
+            except Exception:
+                status = PENDING if attempt < self._max_attempts else FAILED
+            # Report the outcome before a retry is queued, so no other worker can claim it first.
+            try:
+                if status != IN_PROGRESS:
+                    self._set_status(service_request, status)
+            finally:
+                with self._cond:
+                    self._in_progress -= 1
+                    if status == PENDING:
+                        self._retried += 1
+                        self._push(key, submitted, service_request, attempt + 1)
+                    elif status == FAILED:
+                        self._failed += 1
+                    elif status == IN_PROGRESS:
+                        self._assigned[service_request.request_id] = (submitted, service_request)
+                    else:
+                        self._record_completion(submitted)
+                    self._cond.notify_all()
+
+    def _record_completion(self, submitted):
+        latency = self._clock() - submitted
+        self._completed += 1
+        self._latency_total += latency
+        self._latency_max = max(self._latency_max, latency)
+        self._latencies.append(latency)
+
+    def complete(self, request_id):
+        """
+        Mark a request assigned to staff as Done.
+        :param request_id: str, ID of a request left In Progress for staff
+        :return: ServiceRequest object, or None if no such request is assigned
+        """
+        with self._cond:
+            submitted, service_request = self._assigned.pop(request_id, (None, None))
+            if service_request is None:
+                return None
+            self._record_completion(submitted)
+        self._set_status(service_request, DONE)
+        return service_request
+
+    def stats(self):
+        """
+        Snapshot of queue depth, wait time and completion latency metrics (times in seconds).
+        :return: dict, dispatcher metrics
+        """
+        with self._cond:
+            claimed = self._submitted - len(self._heap) + self._retried
+            return {
+                "depth": len(self._heap),
+                "max_depth": self._max_depth,
+                "in_progress": self._in_progress,
+                "assigned": len(self._assigned),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "retried": self._retried,
+                "wait_avg": self._wait_total / claimed if claimed else 0.0,
+                "wait_p95": _percentile(self._waits, 0.95),
+                "wait_max": self._wait_max,
+                "latency_avg": self._latency_total / self._completed if self._completed else 0.0,
+                "latency_p95": _percentile(self._latencies, 0.95),
+                "latency_max": self._latency_max,
+            }
@@ -0,0 +1,202 @@
+import re
+import threading
+from datetime import date
+
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+WINDOWS = (7, 30)
+
+
+def tokenize(text):
+    """
+    Split a comment or query into lower-case search terms.
+    """
+    # Journals written before comments were checked may hold a non-string; it must not stop a restart.
+    return _WORD.findall(str(text).lower() if text is not None else "")
+
+
+class RatingStats:
+    """
+    Count, sum and 1-5 distribution of a set of ratings.
+    """
+    __slots__ = ("count", "total", "distribution")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.distribution = [0] * 5
+
+    def add(self, rating, sign=1):
+        self.count += sign
+        self.total += sign * rating
+        self.distribution[rating - 1] += sign
+
+    def merge(self, other, sign=1):
+        self.count += sign * other.count
+        self.total += sign * other.total
+        for i, n in enumerate(other.distribution):
+            self.distribution[i] += sign * n
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean,
+                "distribution": {rating: n for rating, n in enumerate(self.distribution, 1)}}
+
+
+class FeedbackStore:
+    """
+    Feedback history with incrementally maintained rating aggregates and comment search.
+
+    Every add updates the overall, per-day and per-room-type statistics and
+    the rolling windows, so dashboard reads are O(1). The windows end on the
+    business date given to the read (or the latest feedback day, if later);
+    when they move forward, each window subtracts only the days that slid
+    out of it. Comments feed an inverted index from term to entry
+    positions, and keyword queries intersect posting lists instead of
+    rescanning every comment.
+    """
+    def __init__(self, feedback=(), windows=WINDOWS, today=date.today):
+        """
+        Initialize the store.
+        :param feedback: iterable, Feedback objects to load
+        :param windows: tuple, lengths in days of the rolling windows
+        :param today: callable, returns the business date windows end on when a read gives none
+        """
+        self._lock = threading.Lock()
+        self._today = today
+        self._entries = []
+        self._overall = RatingStats()
+        self._days = {}
+        self._room_types = {}
+        self._postings = {}
+        self._latest = None
+        self._window_end = None
+        self._windows = {days: RatingStats() for days in windows}
+        for entry in feedback:
+            self.add(entry)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, feedback):
+        """
+        Record a feedback entry and update every aggregate.
+        :param feedback: Feedback object
+        """
+        day = date.fromisoformat(feedback.feedback_date).toordinal() if feedback.feedback_date else None
+        with self._lock:
+            position = len(self._entries)
+            self._entries.append(feedback)
+            self._overall.add(feedback.rating)
+            if feedback.room_type:
+                self._room_types.setdefault(feedback.room_type, RatingStats()).add(feedback.rating)
+            for term in set(tokenize(feedback.comments)):
+                self._postings.setdefault(term, []).append(position)
+            if day is None:
+                return
+            self._days.setdefault(day, RatingStats()).add(feedback.rating)
+            if self._latest is None or day > self._latest:
+                self._latest = day
+            if self._window_end is None or day > self._window_end:
+                self._advance(day)
+            for days, stats in self._windows.items():
+                if day > self._window_end - days:
+                    stats.add(feedback.rating)
+
+    def _advance(self, day):
+        """
+        Move the rolling windows forward to end on a later day.
+        """
+        for days, stats in self._windows.items():
+            if self._window_end is None or day - self._window_end >= days:
+                self._windows[days] = RatingStats()
+                continue
+            for leaving in range(self._window_end - days + 1, day - days + 1):
+                left = self._days.get(leaving)
+                if left is not None:
+                    stats.merge(left, -1)
+        self._window_end = day
+
+    def _advance_to(self, today):
+        """
+        Bring the windows up to a business date; they never move back.
+        """
+        day = (today or self._today()).toordinal()
+        if self._window_end is None or day > self._window_end:
+            self._advance(day)
+
+    # Reads
+
+    def overall(self):
+        """
+        Rating statistics over all feedback.
+        :return: dict, count, mean and distribution
+        """
+        return self._overall.to_dict()
+
+    def day(self, feedback_date):
+        """
+        Rating statistics of a single day.
+        :return: dict, count, mean and distribution
+        """
+        stats = self._days.get(feedback_date.toordinal())
+        return (stats or RatingStats()).to_dict()
+
+    def window(self, days, today=None):
+        """
+        Rating statistics of a rolling window ending on a business date.
+        :param days: int, one of the window lengths the store was created with
+        :param today: date, last day of the window (defaults to the store's clock)
+        :return: dict, count, mean and distribution
+        """
+        with self._lock:
+            self._advance_to(today)
+            return self._windows[days].to_dict()
+
+    def room_type(self, room_type):
+        """
+        Rating statistics of the feedback linked to stays in a room class.
+        :return: dict, count, mean and distribution
+        """
+        return self._room_types.get(room_type, RatingStats()).to_dict()
+
+    def summary(self, today=None):
+        """
+        Every dashboard figure in one read.
+        :param today: date, last day of the rolling windows (defaults to the store's clock)
+        :return: dict, overall, latest day, rolling window and per-room-type statistics
+        """
+        with self._lock:
+            self._advance_to(today)
+            latest = date.fromordinal(self._latest) if self._latest is not None else None
+            return {
+                "overall": self._overall.to_dict(),
+                "latest_day": latest.isoformat() if latest else None,
+                "latest_day_stats": self._days[self._latest].to_dict() if latest else RatingStats().to_dict(),
+                "windows_end": date.fromordinal(self._window_end).isoformat(),
+                "windows": {f"{days}d": stats.to_dict() for days, stats in self._windows.items()},
+                "room_types": {name: stats.to_dict() for name, stats in self._room_types.items()},
+            }
+
+    def search(self, query, limit=20):
+        """
+        Find feedback whose comments contain every term of a query, newest first.
+        :param query: str, keywords
+        :param limit: int, maximum number of results
+        :return: list, Feedback objects
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            postings = sorted((self._postings.get(term, []) for term in terms), key=len)
+            matches = set(postings[0])
+            for positions in postings[1:]:
+                matches.intersection_update(positions)
+                if not matches:
+                    break
+            return [self._entries[position] for position in sorted(matches, reverse=True)[:limit]]
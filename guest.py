@@ -1,7 +1,13 @@
+from hotel.history import BookingHistory
+from hotel.loyalty import stay_points
+
+
 class LoyaltyAccount:
     """
     Represents a guest's loyalty account for earning and redeeming points.
     """
+    __slots__ = ("_account_id", "_points", "_tier", "_last_updated", "_listeners")
+
     def __init__(self, account_id, points=0, tier='Basic', last_updated=None):
         """
         Initialize a loyalty account.
@@ -14,6 +20,35 @@ class LoyaltyAccount:
         self._points = points
         self._tier = tier
         self._last_updated = last_updated
+        self._listeners = ()
+
+    def __getstate__(self):
+        # Listeners belong to in-process ledgers; they are not part of the account.
+        state = {name: getattr(self, name) for name in LoyaltyAccount.__slots__}
+        state["_listeners"] = ()
+        return state
+
+    def __setstate__(self, state):
+        self._listeners = ()
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def add_listener(self, listener):
+        """
+        Register a callback run after points are earned or redeemed.
+        :param listener: callable, called as listener(account, "points", (delta, kind, reference))
+        """
+        self._listeners += (listener,)
+
+    def remove_listener(self, listener):
+        """
+        Unregister a callback added with add_listener.
+        """
+        self._listeners = tuple(l for l in self._listeners if l != listener)
+
+    def _notify(self, field, old_value):
+        for listener in self._listeners:
+            listener(self, field, old_value)
 
     @property
     def account_id(self):
@@ -43,20 +78,24 @@ class LoyaltyAccount:
     def last_updated(self, value):
         self._last_updated = value
 
-    def earn_points(self, amount):
+    def earn_points(self, amount, reference=None):
         """
         Add points to the account.
+        :param reference: str, what the points were earned for (e.g. a booking ID)
         """
         self._points += amount
+        self._notify("points", (amount, "earn", reference))
 
-    def redeem_points(self, amount):
+    def redeem_points(self, amount, reference=None):
         """
         Redeem points from the account.
+        :param reference: str, what the points were redeemed for
         """
         if self._points >= amount:
             self._points -= amount
         else:
             raise ValueError("Insufficient points")
+        self._notify("points", (-amount, "redeem", reference))
 
     def __str__(self):
         """
@@ -69,6 +108,9 @@ class Guest:
     """
     Represents a hotel guest with personal details and booking history.
     """
+    __slots__ = ("_guest_id", "_name", "_email", "_contact", "_loyalty_account", "_bookings", "_history",
+                 "_listeners")
+
     def __init__(self, guest_id, name, email, contact, loyalty_account=None):
         """
         Initialize a guest.
@@ -84,6 +126,37 @@ class Guest:
         self._contact = contact
         self._loyalty_account = loyalty_account if loyalty_account else LoyaltyAccount(guest_id)
         self._bookings = []
+        self._history = BookingHistory()
+        self._listeners = ()
+
+    def __getstate__(self):
+        # Listeners belong to in-process indexes and the history index is rebuilt on load.
+        state = {name: getattr(self, name) for name in Guest.__slots__ if name != "_history"}
+        state["_listeners"] = ()
+        return state
+
+    def __setstate__(self, state):
+        self._listeners = ()
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._history = BookingHistory(self._bookings)
+
+    def add_listener(self, listener):
+        """
+        Register a callback run after the guest's details change.
+        :param listener: callable, called as listener(guest, field, old_value)
+        """
+        self._listeners += (listener,)
+
+    def remove_listener(self, listener):
+        """
+        Unregister a callback added with add_listener.
+        """
+        self._listeners = tuple(l for l in self._listeners if l != listener)
+
+    def _notify(self, field, old_value):
+        for listener in self._listeners:
+            listener(self, field, old_value)
 
     @property
     def guest_id(self):
@@ -95,7 +168,8 @@ class Guest:
 
     @name.setter
     def name(self, value):
-        self._name = value
+        old_value, self._name = self._name, value
+        self._notify("name", old_value)
 
     @property
     def email(self):
@@ -103,7 +177,8 @@ class Guest:
 
     @email.setter
     def email(self, value):
-        self._email = value
+        old_value, self._email = self._email, value
+        self._notify("email", old_value)
 
     @property
     def contact(self):
@@ -111,7 +186,8 @@ class Guest:
 
     @contact.setter
     def contact(self, value):
-        self._contact = value
+        old_value, self._contact = self._contact, value
+        self._notify("contact", old_value)
 
     @property
     def loyalty_account(self):
@@ -119,20 +195,68 @@ class Guest:
 
     @property
     def bookings(self):
+        """
+        The guest's bookings in the order they were made.
+        """
         return self._bookings
 
+    @property
+    def history(self):
+        """
+        The guest's bookings indexed by check-in date.
+        """
+        return self._history
+
+    def add_booking(self, booking):
+        """
+        Add an existing booking (e.g. one loaded from storage) to the guest's history without earning points.
+        """
+        self._bookings.append(booking)
+        self._history.add(booking)
+
     def make_booking(self, booking):
         """
         Add a booking to the guest's history and earn loyalty points.
         """
-        self._bookings.append(booking)
-        self._loyalty_account.earn_points(100)  # Example: 100 points per booking
+        self.add_booking(booking)
+        self._loyalty_account.earn_points(stay_points(booking), booking.booking_id)
+
+    def cancel_booking(self, booking):
+        """
+        Remove a cancelled booking from the guest's history and take back the points it earned.
+        :return: bool, False if the booking was not in the history
+        """
+        if not self._history.remove(booking):
+            return False
+        self._bookings.remove(booking)
+        booking.cancel()
+        # A negative earn, so the stay also stops counting towards the guest's tier. Points already
+        # redeemed cannot be taken back; the reversal stops at the remaining balance.
+        points = min(stay_points(booking), max(self._loyalty_account.points, 0))
+        if points:
+            self._loyalty_account.earn_points(-points, booking.booking_id)
+        return True
+
+    def change_booking(self, booking, room, check_in, check_out, total=None):
+        """
+        Re-date or move a booking in the guest's history and adjust its points by the difference.
+        :param total: float, new invoice total
+        """
+        points = stay_points(booking)
+        self._history.remove(booking)
+        booking.change(room, check_in, check_out, total)
+        self._history.add(booking)
+        # As on cancellation, a cut in points never takes the balance below zero.
+        delta = max(stay_points(booking) - points, -max(self._loyalty_account.points, 0))
+        if delta:
+            self._loyalty_account.earn_points(delta, booking.booking_id)
 
     def view_reservation_history(self):
         """
-        Retrieve the guest's booking history.
+        Retrieve the guest's booking history, ordered by check-in date.
+        :return: BookingHistory, sized and iterable; use its iterate() and page() to filter and paginate
         """
-        return self._bookings
+        return self._history
 
     def __str__(self):
         """
@@ -0,0 +1,141 @@
+from bisect import bisect_left, bisect_right
+from datetime import date
+from itertools import islice
+
+from hotel.room import _ordinal
+
+
+UPCOMING = "upcoming"
+PAST = "past"
+
+
+def _key(booking):
+    return booking.check_in_date.toordinal(), booking.booking_id
+
+
+def encode_cursor(booking):
+    """
+    Opaque position just past a booking, for resuming a paginated listing.
+    :return: str, "<check-in ordinal>:<booking ID>"
+    """
+    return "%d:%s" % _key(booking)
+
+
+def decode_cursor(cursor):
+    """
+    Parse a cursor from encode_cursor().
+    :return: tuple, (check-in ordinal, booking ID)
+    :raises ValueError: if the cursor is malformed
+    """
+    ordinal, _, booking_id = cursor.partition(":")
+    try:
+        return int(ordinal), booking_id
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+class BookingHistory:
+    """
+    One guest's bookings kept sorted by check-in date (ties by booking ID).
+
+    Bookings are held in a list ordered by key with a parallel list of keys,
+    so a date range is two bisections and a page is a slice of the range.
+    Cursors name the key of the last booking returned rather than an offset,
+    so pages stay consistent while bookings are added or removed between
+    requests. iterate() walks the range in place and never copies the list.
+    """
+    __slots__ = ("_keys", "_bookings")
+
+    def __init__(self, bookings=()):
+        """
+        Build the index.
+        :param bookings: iterable, Booking objects in any order
+        """
+        pairs = sorted(((_key(booking), booking) for booking in bookings), key=lambda pair: pair[0])
+        self._keys = [key for key, _ in pairs]
+        self._bookings = [booking for _, booking in pairs]
+
+    def __len__(self):
+        return len(self._bookings)
+
+    def __iter__(self):
+        return iter(self._bookings)
+
+    def __getitem__(self, index):
+        return self._bookings[index]
+
+    def add(self, booking):
+        """
+        Insert a booking at its place in check-in order.
+        """
+        key = _key(booking)
+        index = bisect_right(self._keys, key)
+        self._keys.insert(index, key)
+        self._bookings.insert(index, booking)
+
+    def remove(self, booking):
+        """
+        Drop a booking; call before its check-in date changes, as its key is looked up by date.
+        :return: bool, True if the booking was indexed
+        """
+        key = _key(booking)
+        index = bisect_left(self._keys, key)
+        while index < len(self._keys) and self._keys[index] == key:
+            if self._bookings[index] is booking:
+                del self._keys[index]
+                del self._bookings[index]
+                return True
+            index += 1
+        return False
+
+    def _range(self, start=None, end=None, when=None, today=None):
+        """
+        Index range of the bookings checking in on or after start and before end.
+        """
+        if when is not None:
+            if when not in (UPCOMING, PAST):
+                raise ValueError(f"when must be {UPCOMING!r} or {PAST!r}")
+            today = _ordinal(today or date.today())
+            if when == UPCOMING:
+                start = today if start is None else max(_ordinal(start), today)
+            else:
+                end = today if end is None else min(_ordinal(end), today)
+        low = 0 if start is None else bisect_left(self._keys, (_ordinal(start),))
+        high = len(self._keys) if end is None else bisect_left(self._keys, (_ordinal(end),))
+        return low, max(low, high)
+
+    def iterate(self, start=None, end=None, when=None, today=None, descending=False, cursor=None):
+        """
+        Stream bookings in check-in order without copying the index.
+        :param start: date, first check-in date included
+        :param end: date, check-in dates from this one on are excluded
+        :param when: str, UPCOMING (checking in today or later) or PAST (checked in before today)
+        :param today: date, business date for ``when`` (defaults to today)
+        :param descending: bool, latest check-in first
+        :param cursor: str, from encode_cursor(); resume after that booking
+        :return: generator of Booking objects
+        """
+        low, high = self._range(start, end, when, today)
+        if cursor is not None:
+            key = decode_cursor(cursor)
+            if descending:
+                high = min(high, bisect_left(self._keys, key))
+            else:
+                low = max(low, bisect_right(self._keys, key))
+        bookings = self._bookings
+        return (bookings[index] for index in (range(high - 1, low - 1, -1) if descending else range(low, high)))
+
+    def page(self, limit=20, cursor=None, start=None, end=None, when=None, today=None, descending=False):
+        """
+        One page of bookings (see iterate() for the filters).
+        :param limit: int, most bookings returned
+        :param cursor: str, next_cursor of the previous page
+        :return: tuple, (list of Booking objects, cursor of the next page or None after the last)
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        bookings = list(islice(self.iterate(start, end, when, today, descending, cursor), limit + 1))
+        if len(bookings) > limit:
+            del bookings[limit:]
+            return bookings, encode_cursor(bookings[-1])
+        return bookings, None
@@ -0,0 +1,293 @@
+import threading
+import time
+from contextlib import nullcontext
+
+from hotel.ids import new_id
+
+
+DEFAULT_TTL = 600
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel of deadlines counted in integer ticks.
+
+    Level 0 has one slot per tick; each higher level has one slot per full
+    turn of the level below. A key is filed in the lowest level whose span
+    covers its deadline and, when the wheel's hand reaches that slot, is
+    re-filed one level down until it reaches level 0 and expires. Scheduling,
+    cancelling and each tick are O(1) whatever the number of keys; only keys
+    actually due (or cascading) are touched.
+    """
+    def __init__(self, slots=64, levels=4, start=0):
+        """
+        Initialize an empty wheel.
+        :param slots: int, slots per level
+        :param levels: int, number of levels; deadlines beyond slots ** levels ticks are re-filed on the way
+        :param start: int, current tick
+        """
+        self._slots = slots
+        self._levels = levels
+        self._wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+        self._now = start
+        self._where = {}
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key):
+        return key in self._where
+
+    @property
+    def now(self):
+        return self._now
+
+    def schedule(self, key, deadline):
+        """
+        File a key to expire at a tick (replacing any earlier schedule of it).
+        :param key: hashable, identifies the timer
+        :param deadline: int, tick at which the key expires; past ticks expire on the next tick
+        """
+        self.cancel(key)
+        self._file(key, max(deadline, self._now + 1))
+
+    def _file(self, key, deadline):
+        delta = deadline - self._now
+        level, span = 0, self._slots
+        while delta >= span and level < self._levels - 1:
+            level, span = level + 1, span * self._slots
+        index = (deadline // (span // self._slots)) % self._slots
+        self._wheels[level][index].add(key)
+        self._where[key] = (level, index, deadline)
+
+    def cancel(self, key):
+        """
+        Remove a key's timer.
+        :return: bool, True if the key was scheduled
+        """
+        where = self._where.pop(key, None)
+        if where is None:
+            return False
+        self._wheels[where[0]][where[1]].discard(key)
+        return True
+
+    def advance(self, tick):
+        """
+        Move the hand forward to a tick.
+        :param tick: int, new current tick
+        :return: list, keys whose deadline has been reached, earliest tick first
+        """
+        expired = []
+        while self._now < tick:
+            self._now += 1
+            # Cascade the higher-level slots this tick opens, from the top down, then fire level 0.
+            span = self._slots ** (self._levels - 1)
+            for level in range(self._levels - 1, 0, -1):
+                if self._now % span == 0:
+                    bucket = self._wheels[level][(self._now // span) % self._slots]
+                    keys = list(bucket)
+                    bucket.clear()
+                    for key in keys:
+                        self._file(key, self._where[key][2])
+                span //= self._slots
+            bucket = self._wheels[0][self._now % self._slots]
+            for key in list(bucket):
+                if self._where[key][2] <= self._now:
+                    bucket.discard(key)
+                    del self._where[key]
+                    expired.append(key)
+        return expired
+
+
+class Hold:
+    """
+    A room held for a guest's stay until payment completes or the hold expires.
+    """
+    __slots__ = ("_hold_id", "_guest", "_room", "_check_in_date", "_check_out_date", "_expires_at")
+
+    def __init__(self, hold_id, guest, room, check_in_date, check_out_date, expires_at):
+        self._hold_id = hold_id
+        self._guest = guest
+        self._room = room
+        self._check_in_date = check_in_date
+        self._check_out_date = check_out_date
+        self._expires_at = expires_at
+
+    @property
+    def hold_id(self):
+        return self._hold_id
+
+    @property
+    def guest(self):
+        return self._guest
+
+    @property
+    def room(self):
+        return self._room
+
+    @property
+    def check_in_date(self):
+        return self._check_in_date
+
+    @property
+    def check_out_date(self):
+        return self._check_out_date
+
+    @property
+    def expires_at(self):
+        return self._expires_at
+
+    def __str__(self):
+        return f"Hold {self._hold_id}: {self._room} from {self._check_in_date} to {self._check_out_date}"
+
+
+class HoldManager:
+    """
+    Tentative reservations that block a room's dates while payment is in flight.
+
+    A hold reserves the stay in the room at once, under the hold's ID, so
+    every availability check sees it. confirm() keeps that reservation and
+    turns it into the booking (which takes the hold's ID as its booking ID);
+    release() or expiry gives the dates back. Expiry deadlines live in a
+    TimingWheel advanced once per tick by a background thread, so
+    outstanding holds cost nothing until they are due. Holds are not
+    persisted: after a restart their rooms are simply free again.
+    """
+    def __init__(self, booking_service, ttl=DEFAULT_TTL, tick=1.0, clock=time.monotonic, on_expired=None,
+                 guard=nullcontext):
+        """
+        Initialize the hold manager.
+        :param booking_service: BookingService, commits reservations with conflict detection
+        :param ttl: float, default seconds a hold lasts
+        :param tick: float, seconds per timing wheel tick (expiry resolution)
+        :param clock: callable, monotonic time source in seconds
+        :param on_expired: callable, called with each Hold released by expiry
+        :param guard: callable, returns the context each room change runs in (e.g. HotelJournal.recording,
+            so a snapshot never catches one half done)
+        """
+        self._booking_service = booking_service
+        self._ttl = ttl
+        self._tick = tick
+        self._clock = clock
+        self._on_expired = on_expired
+        self._guard = guard
+        self._lock = threading.Lock()
+        self._holds = {}
+        self._wheel = TimingWheel(start=self._ticks())
+        self._thread = None
+        self._stopping = threading.Event()
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._holds)
+
+    def _ticks(self):
+        return int(self._clock() / self._tick)
+
+    def start(self):
+        """
+        Start the expiry thread (once).
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="hold-expiry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the expiry thread; outstanding holds stay in place.
+        """
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.wait(self._tick):
+            self.expire()
+
+    def hold(self, guest, room, check_in, check_out, ttl=None):
+        """
+        Reserve a room's dates for a guest for a limited time.
+        :param guest: Guest object
+        :param room: Room object
+        :param check_in: date, check-in date
+        :param check_out: date, check-out date (exclusive)
+        :param ttl: float, seconds the hold lasts (defaults to the manager's TTL)
+        :return: Hold object
+        :raises BookingConflictError: if the room is not free for the dates
+        """
+        if check_out <= check_in:
+            raise ValueError("Check-out date must be after check-in date")
+        ttl = self._ttl if ttl is None else ttl
+        hold_id = new_id()
+        with self._guard():
+            self._booking_service.reserve(room, check_in, check_out, hold_id)
+        now = self._clock()
+        held = Hold(hold_id, guest, room, check_in, check_out, now + ttl)
+        with self._lock:
+            self._holds[hold_id] = held
+            self._wheel.schedule(hold_id, int((now + ttl) / self._tick) + 1)
+        return held
+
+    def get(self, hold_id):
+        """
+        Look up an outstanding hold.
+        :return: Hold object, or None if unknown, confirmed, released or expired
+        """
+        return self._holds.get(hold_id)
+
+    def time_left(self, hold):
+        """
+        Seconds until a hold expires.
+        :return: float, 0 once it is due
+        """
+        return max(0.0, hold.expires_at - self._clock())
+
+    def _take(self, hold_id):
+        with self._lock:
+            held = self._holds.pop(hold_id, None)
+            if held is not None:
+                self._wheel.cancel(hold_id)
+        return held
+
+    def confirm(self, hold_id):
+        """
+        End a hold because its booking went through; the reserved stay now belongs to the booking.
+        :param hold_id: str, hold to confirm
+        :return: Hold object
+        :raises ValueError: if the hold is unknown or has already expired or been released
+        """
+        held = self._take(hold_id)
+        if held is None:
+            raise ValueError(f"Hold {hold_id} has expired or does not exist")
+        return held
+
+    def release(self, hold_id):
+        """
+        Give a held room's dates back.
+        :return: bool, True if the hold was outstanding
+        """
+        held = self._take(hold_id)
+        if held is None:
+            return False
+        with self._guard():
+            self._booking_service.release(held.room, held.check_in_date, held.check_out_date)
+        return True
+
+    def expire(self):
+        """
+        Release every hold whose time is up.
+        :return: int, holds released
+        """
+        with self._lock:
+            expired = [self._holds.pop(hold_id) for hold_id in self._wheel.advance(self._ticks())]
+        for held in expired:
+            with self._guard():
+                self._booking_service.release(held.room, held.check_in_date, held.check_out_date)
+            if self._on_expired:
+                self._on_expired(held)
+        self.expired += len(expired)
+        return len(expired)
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# 2025-01-01T00:00:00Z; 41 bits of milliseconds from here last until 2094.
+EPOCH_MS = 1735689600000
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+_MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+_TIMESTAMP_SHIFT = NODE_BITS + SEQUENCE_BITS
+
+ID_LENGTH = 16
+NODE_LOCK_PATTERN = "node-%04d.lock"
+
+
+class IdAllocator:
+    """
+    Snowflake-style allocator of unique, time-ordered 63-bit IDs.
+
+    An ID packs milliseconds since EPOCH_MS, a node ID and a per-millisecond
+    sequence number. Every process (or property) minting IDs uses its own
+    node ID, so allocators never need to talk to each other. Within a node,
+    the allocator keeps its own logical clock: if 4096 IDs are minted in one
+    millisecond, or the wall clock steps backwards, it keeps counting from
+    its last timestamp instead of repeating one. IDs are rendered as 16
+    lower-case hex digits, so string order is creation order.
+    """
+    def __init__(self, node_id, epoch_ms=EPOCH_MS, clock=time.time_ns):
+        """
+        Initialize an allocator.
+        :param node_id: int, 0-1023, unique per minting process (see claim_node_id)
+        :param epoch_ms: int, Unix time in milliseconds that timestamps count from
+        :param clock: callable, returns Unix time in nanoseconds
+        """
+        if not isinstance(node_id, int) or not 0 <= node_id <= MAX_NODE_ID:
+            raise ValueError(f"Node ID must be an integer between 0 and {MAX_NODE_ID}")
+        self._node_bits = node_id << SEQUENCE_BITS
+        self._epoch_ms = epoch_ms
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last = -1
+        self._sequence = 0
+
+    @property
+    def node_id(self):
+        return self._node_bits >> SEQUENCE_BITS
+
+    def next_int(self):
+        """
+        Mint an ID as an integer.
+        :return: int, 63-bit ID
+        """
+        now = self._clock() // 1000000 - self._epoch_ms
+        with self._lock:
+            if now > self._last:
+                self._last, self._sequence = now, 0
+            elif self._sequence < _MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                # Sequence exhausted (or the clock went back): borrow the next millisecond.
+                self._last, self._sequence = self._last + 1, 0
+            return (self._last << _TIMESTAMP_SHIFT) | self._node_bits | self._sequence
+
+    def next_id(self):
+        """
+        Mint an ID as a fixed-width hex string.
+        :return: str, 16 hex digits
+        """
+        return format(self.next_int(), "016x")
+
+    def __call__(self):
+        return self.next_id()
+
+
+def parse_id(value):
+    """
+    Split an allocated ID into its parts.
+    :param value: str or int, ID from an IdAllocator with the default epoch
+    :return: tuple, (creation datetime in UTC, node ID, sequence)
+    """
+    if isinstance(value, str):
+        value = int(value, 16)
+    millis = (value >> _TIMESTAMP_SHIFT) + EPOCH_MS
+    return (datetime.fromtimestamp(millis / 1000, timezone.utc),
+            (value >> SEQUENCE_BITS) & MAX_NODE_ID, value & _MAX_SEQUENCE)
+
+
+_default = None
+_default_lock = threading.Lock()
+# Open lock files of the node IDs this process has claimed; closing one frees its ID.
+_leases = []
+
+
+def claim_node_id(directory):
+    """
+    Derive a node ID that no other live process sharing a directory holds.
+
+    Each node ID is leased by locking its own file in the directory. The lock
+    lasts as long as the process, so the ID of a crashed process is free
+    again at once.
+    :param directory: str, directory shared by every process minting IDs for the same data
+    :return: int, the lowest free node ID
+    :raises RuntimeError: if every node ID is taken
+    """
+    os.makedirs(directory, exist_ok=True)
+    for node_id in range(MAX_NODE_ID + 1):
+        handle = open(os.path.join(directory, NODE_LOCK_PATTERN % node_id), "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            handle.close()
+            continue
+        _leases.append(handle)
+        return node_id
+    raise RuntimeError(f"All {MAX_NODE_ID + 1} node IDs leased in {directory} are in use")
+
+
+def configure(node_id=None, directory=None):
+    """
+    Set up the process-wide allocator used by new_id(); a no-op if it is set up and no node ID is given.
+    :param node_id: int, explicit node ID; defaults to $HOTEL_NODE_ID
+    :param directory: str, lease a free node ID here (see claim_node_id) when neither is given
+    :return: IdAllocator, the process-wide allocator
+    :raises RuntimeError: if there is no node ID to use
+    """
+    global _default
+    with _default_lock:
+        if _default is not None and node_id is None:
+            return _default
+        if node_id is None and os.environ.get("HOTEL_NODE_ID"):
+            node_id = int(os.environ["HOTEL_NODE_ID"])
+        if node_id is None and directory is not None:
+            node_id = claim_node_id(directory)
+        if node_id is None:
+            raise RuntimeError("No node ID for minting IDs: set $HOTEL_NODE_ID or call hotel.ids.configure()")
+        _default = IdAllocator(node_id)
+        return _default
+
+
+def new_id():
+    """
+    Mint an ID from the process-wide allocator (see configure()).
+    :return: str, 16 hex digits
+    :raises RuntimeError: if no node ID has been configured or set in $HOTEL_NODE_ID
+    """
+    allocator = _default or configure()
+    return allocator.next_id()
@@ -0,0 +1,229 @@
+import csv
+import json
+import time
+from contextlib import nullcontext
+from datetime import date, datetime
+from itertools import islice
+
+from hotel.guest import Guest
+from hotel.booking import Booking, CreditCardPayment, MobileWalletPayment
+from hotel.ids import new_id
+
+
+def read_records(path):
+    """
+    Stream reservation records from a CSV or JSONL feed.
+    :param path: str, feed file path; ``.csv`` files are read as CSV, anything else as JSONL
+    :return: generator, (record dict, parse error or None) pairs
+    """
+    with open(path, newline="", encoding="utf-8") as handle:
+        if path.lower().endswith(".csv"):
+            for record in csv.DictReader(handle):
+                yield record, None
+        else:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line), None
+                except ValueError as e:
+                    yield {"raw": line}, f"Malformed JSON: {e}"
+
+
+def _parse_date(value):
+    return value if hasattr(value, "toordinal") else datetime.strptime(value, "%Y-%m-%d").date()
+
+
+class BookingIngestor:
+    """
+    Non-interactive bulk booking pipeline for channel-manager feeds.
+
+    Records stream through validate -> resolve -> check-and-reserve stages as
+    generators, accepted bookings are written out in batches, and rejected
+    records go to a rejects file with the reason, so memory use does not
+    depend on the size of the feed.
+    """
+    def __init__(self, rooms, guests=None, repository=None, journal=None, batch_size=1000, pricing=None,
+                 on_new_guest=None):
+        """
+        Initialize the ingestor.
+        :param rooms: list, Room objects bookings may target
+        :param guests: list, known Guest objects; unknown guests are created from the record
+        :param repository: HotelRepository, optional store receiving each batch
+        :param journal: HotelJournal, optional journal receiving each booking
+        :param batch_size: int, number of bookings written per batch
+        :param pricing: PricingEngine, prices records that carry no amount (flat price otherwise)
+        :param on_new_guest: callable, called with each Guest created from the feed once its batch is written
+        """
+        self._rooms = {room.room_number: room for room in rooms}
+        self._guests = {guest.guest_id: guest for guest in guests or []}
+        self._repository = repository
+        self._journal = journal
+        self._batch_size = batch_size
+        self._pricing = pricing
+        self._on_new_guest = on_new_guest
+        self._pending_guests = []
+        # IDs already taken, so a feed cannot reuse one and fail a whole batch on a primary key.
+        self._booking_ids = {booking_id for room in rooms for _, _, booking_id in room.stays}
+        self._transaction_ids = set()
+        for guest in self._guests.values():
+            for booking in guest.bookings:
+                self._booking_ids.add(booking.booking_id)
+                if booking.payment is not None:
+                    self._transaction_ids.add(booking.payment.transaction_id)
+
+    def _validate(self, records):
+        """
+        Check field presence and types, parsing dates and amounts.
+        """
+        for line_number, (record, error) in enumerate(records, 1):
+            if error is None and not isinstance(record, dict):
+                error = "Record is not an object"
+            elif error is None:
+                try:
+                    record["room_number"] = int(record["room_number"])
+                    record["check_in"] = _parse_date(record["check_in"])
+                    record["check_out"] = _parse_date(record["check_out"])
+                    if record["check_out"] <= record["check_in"]:
+                        raise ValueError("Check-out date must be after check-in date")
+                    if not record.get("guest_id"):
+                        raise ValueError("Missing guest_id")
+                    if record.get("payment_method") not in ("credit_card", "mobile_wallet"):
+                        raise ValueError("payment_method must be credit_card or mobile_wallet")
+                    amount = record.get("amount")
+                    record["amount"] = None if amount in (None, "") else float(amount)
+                except KeyError as e:
+                    error = f"Missing field: {e.args[0]}"
+                except TypeError:
+                    # A null value, a short CSV row or a nested structure where a scalar belongs.
+                    error = "Invalid field type"
+                except ValueError as e:
+                    error = str(e)
+            yield line_number, record, error
+
+    def _resolve(self, records):
+        """
+        Attach the Room and Guest objects each record refers to.
+        """
+        for line_number, record, error in records:
+            room = guest = None
+            if error is None:
+                room = self._rooms.get(record["room_number"])
+                guest = self._guests.get(record["guest_id"])
+                if guest is None and self._repository:
+                    guest = self._repository.get_guest(record["guest_id"], with_bookings=False)
+                    if guest is not None:
+                        self._guests[guest.guest_id] = guest
+                if room is None:
+                    error = f"Unknown room: {record['room_number']}"
+                elif guest is None:
+                    if record.get("name"):
+                        guest = Guest(record["guest_id"], record["name"], record.get("email"), record.get("contact"))
+                        self._guests[guest.guest_id] = guest
+                        self._pending_guests.append(guest)
+                    else:
+                        error = f"Unknown guest: {record['guest_id']}"
+            yield line_number, record, error, room, guest
+
+    def _reserve(self, records):
+        """
+        Check each stay against existing ones and build the Booking and payment.
+        """
+        for line_number, record, error, room, guest in records:
+            booking = None
+            if error is None:
+                check_in, check_out = record["check_in"], record["check_out"]
+                booking_id = str(record.get("booking_id") or new_id())
+                transaction_id = str(record.get("transaction_id") or new_id())
+                if booking_id in self._booking_ids or (self._repository and self._repository.has_booking_id(booking_id)):
+                    error = f"Duplicate booking_id: {booking_id}"
+                elif transaction_id in self._transaction_ids or (
+                        self._repository and self._repository.has_transaction_id(transaction_id)):
+                    error = f"Duplicate transaction_id: {transaction_id}"
+                elif not room.is_available_for(check_in, check_out) or (
+                        # Rooms loaded from a repository only hold the stays not yet over.
+                        self._repository and check_in < date.today()
+                        and self._repository.has_conflict(room.room_number, check_in, check_out)):
+                    error = f"Room {room.room_number} not available from {check_in} to {check_out}"
+                else:
+                    booking = Booking(guest, room, check_in, check_out, booking_id)
+                    amount = record["amount"]
+                    if amount is None and self._pricing is not None:
+                        amount = self._pricing.quote(room, check_in, check_out)
+                    elif amount is None:
+                        amount = room.price_per_night * (check_out - check_in).days
+                    payment_date = record.get("payment_date") or str(datetime.today().date())
+                    if record["payment_method"] == "credit_card":
+                        payment = CreditCardPayment(amount, record.get("card_number"), record.get("expiry_date"),
+                                                    payment_date, transaction_id)
+                    else:
+                        payment = MobileWalletPayment(amount, record.get("wallet_type"), record.get("phone_number"),
+                                                      payment_date, transaction_id)
+                    booking.set_payment(payment)
+                    booking.generate_invoice()
+                    # The invoice always matches what the channel charged.
+                    booking.invoice["total"] = amount
+                    room.reserve(check_in, check_out, booking_id)
+                    guest.make_booking(booking)
+                    self._booking_ids.add(booking_id)
+                    self._transaction_ids.add(transaction_id)
+            yield line_number, record, error, booking
+
+    def _write_batch(self, bookings):
+        """
+        Hand a batch of accepted bookings, and the guests first seen in it, to the configured stores.
+        """
+        guests, self._pending_guests = self._pending_guests, []
+        if self._repository:
+            self._repository.save_guests(guests)
+            self._repository.save_bookings(bookings)
+        if self._journal:
+            for guest in guests:
+                self._journal.log_guest_created(guest)
+            for booking in bookings:
+                self._journal.log_booking_made(booking)
+        if self._on_new_guest is not None:
+            for guest in guests:
+                self._on_new_guest(guest)
+        return len(guests)
+
+    def ingest(self, path, rejects_path=None):
+        """
+        Ingest a reservation feed.
+        :param path: str, CSV or JSONL feed file
+        :param rejects_path: str, JSONL file receiving rejected records (default: ``<path>.rejects.jsonl``)
+        :return: dict, summary with read/accepted/rejected counts, seconds and records per second
+        """
+        rejects_path = rejects_path or path + ".rejects.jsonl"
+        started = time.perf_counter()
+        read = accepted = rejected = new_guests = 0
+        pipeline = self._reserve(self._resolve(self._validate(read_records(path))))
+        with open(rejects_path, "w", encoding="utf-8") as rejects:
+            while True:
+                # A batch reserves its stays before journaling them; no snapshot may fall in between.
+                with self._journal.recording() if self._journal else nullcontext():
+                    chunk = list(islice(pipeline, self._batch_size))
+                    if not chunk:
+                        break
+                    read += len(chunk)
+                    batch = []
+                    for line_number, record, error, booking in chunk:
+                        if error is None:
+                            batch.append(booking)
+                        else:
+                            rejects.write(json.dumps({"line": line_number, "error": error, "record": record},
+                                                     default=str) + "\n")
+                    rejected += len(chunk) - len(batch)
+                    accepted += len(batch)
+                    new_guests += self._write_batch(batch)
+        seconds = time.perf_counter() - started
+        return {
+            "read": read,
+            "accepted": accepted,
+            "rejected": rejected,
+            "new_guests": new_guests,
+            "seconds": seconds,
+            "per_second": read / seconds if seconds else 0.0,
+            "rejects_path": rejects_path,
+        }
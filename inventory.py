@@ -0,0 +1,192 @@
+import sys
+from bisect import bisect_left, bisect_right, insort
+
+
+class AmenityRegistry:
+    """
+    Interns amenity names and assigns each one a bit in an integer mask.
+    """
+    def __init__(self):
+        """
+        Initialize an empty registry.
+        """
+        self._bits = {}
+        self._names = []
+
+    def bit(self, amenity):
+        """
+        Get (allocating if new) the bit assigned to an amenity.
+        :param amenity: str, amenity name
+        :return: int, single-bit mask
+        """
+        bit = self._bits.get(amenity)
+        if bit is None:
+            bit = self._bits[sys.intern(amenity)] = 1 << len(self._names)
+            self._names.append(amenity)
+        return bit
+
+    def mask(self, amenities):
+        """
+        Encode a collection of amenities as a bitmask.
+        :param amenities: iterable, amenity names
+        :return: int, OR of the amenity bits
+        """
+        mask = 0
+        for amenity in amenities:
+            mask |= self.bit(amenity)
+        return mask
+
+    def known_mask(self, amenities):
+        """
+        Encode amenities without registering new names.
+        :return: int, bitmask, or None if any amenity is unknown
+        """
+        mask = 0
+        for amenity in amenities:
+            bit = self._bits.get(amenity)
+            if bit is None:
+                return None
+            mask |= bit
+        return mask
+
+    def names(self, mask):
+        """
+        Decode a bitmask back to amenity names.
+        :return: list, amenity names in registration order
+        """
+        return [name for i, name in enumerate(self._names) if mask >> i & 1]
+
+
+class InventoryIndex:
+    """
+    Multi-key index over the room inventory.
+
+    Rooms are indexed by number, bucketed by room class, kept in sorted
+    price indexes (one overall and one per class) for range queries and
+    tagged with an amenity bitmask, so a filter such as "Suites with a
+    Jacuzzi under $250" is a bisect plus integer ANDs over that class only. The index listens to each room and follows changes made
+    through the price_per_night and amenities setters.
+    """
+    def __init__(self, rooms=(), amenities=None):
+        """
+        Initialize the index.
+        :param rooms: iterable, Room objects to index
+        :param amenities: AmenityRegistry, shared registry (a new one by default)
+        """
+        self.amenities = amenities or AmenityRegistry()
+        self._by_number = {}
+        self._by_type = {}
+        self._masks = {}
+        self._prices = []
+        self._type_prices = {}
+        for room in rooms:
+            self.add(room)
+
+    def __len__(self):
+        return len(self._by_number)
+
+    def __contains__(self, room_number):
+        return room_number in self._by_number
+
+    def add(self, room):
+        """
+        Add a room to the index and start following its changes.
+        :param room: Room object
+        """
+        if room.room_number in self._by_number:
+            raise ValueError(f"Room {room.room_number} is already indexed")
+        self._by_number[room.room_number] = room
+        self._by_type.setdefault(room.__class__.__name__, {})[room.room_number] = room
+        self._masks[room.room_number] = self.amenities.mask(room.amenities)
+        insort(self._prices, (room.price_per_night, room.room_number))
+        insort(self._type_prices.setdefault(room.__class__.__name__, []), (room.price_per_night, room.room_number))
+        room.add_listener(self._on_room_changed)
+
+    def remove(self, room):
+        """
+        Drop a room from the index.
+        :param room: Room object
+        """
+        room.remove_listener(self._on_room_changed)
+        del self._by_number[room.room_number]
+        del self._by_type[room.__class__.__name__][room.room_number]
+        del self._masks[room.room_number]
+        self._prices.remove((room.price_per_night, room.room_number))
+        self._type_prices[room.__class__.__name__].remove((room.price_per_night, room.room_number))
+
+    def _on_room_changed(self, room, field, old_value):
+        """
+        Keep the price and amenity indexes in sync with a room's setters.
+        """
+        if field == "price_per_night":
+            key = (old_value, room.room_number)
+            for prices in (self._prices, self._type_prices[room.__class__.__name__]):
+                del prices[bisect_left(prices, key)]
+                insort(prices, (room.price_per_night, room.room_number))
+        elif field == "amenities":
+            self._masks[room.room_number] = self.amenities.mask(room.amenities)
+
+    def get(self, room_number):
+        """
+        Look up a room by number.
+        :return: Room object, or None if unknown
+        """
+        return self._by_number.get(room_number)
+
+    def room_types(self):
+        """
+        List the room classes in the inventory.
+        :return: list, class names in sorted order
+        """
+        return sorted(name for name, rooms in self._by_type.items() if rooms)
+
+    def rooms_of_type(self, room_type):
+        """
+        List the rooms of one class.
+        :param room_type: class or str, e.g. Suite or "Suite"
+        :return: list, Room objects
+        """
+        name = room_type if isinstance(room_type, str) else room_type.__name__
+        return list(self._by_type.get(name, {}).values())
+
+    def in_price_range(self, min_price=None, max_price=None):
+        """
+        List rooms priced within a range, cheapest first.
+        :param min_price: float, inclusive lower bound (None for no bound)
+        :param max_price: float, inclusive upper bound (None for no bound)
+        :return: list, Room objects
+        """
+        return [self._by_number[number] for _, number in self._price_slice(self._prices, min_price, max_price)]
+
+    @staticmethod
+    def _price_slice(prices, min_price, max_price):
+        low = 0 if min_price is None else bisect_left(prices, (min_price,))
+        high = len(prices) if max_price is None else bisect_right(prices, (max_price, float("inf")))
+        return prices[low:high]
+
+    def find(self, room_type=None, min_price=None, max_price=None, amenities=(), check_in=None, check_out=None):
+        """
+        Find rooms matching every given filter, cheapest first.
+        :param room_type: class or str, restrict to one room class
+        :param min_price: float, inclusive lower price bound
+        :param max_price: float, inclusive upper price bound
+        :param amenities: iterable, amenities every match must have
+        :param check_in: date, with check_out, only rooms free for that stay
+        :param check_out: date, check-out date (exclusive)
+        :return: list, Room objects
+        """
+        required = self.amenities.known_mask(amenities)
+        if required is None:
+            return []
+        prices = self._prices
+        if room_type is not None:
+            prices = self._type_prices.get(room_type if isinstance(room_type, str) else room_type.__name__, [])
+        matches = []
+        for _, number in self._price_slice(prices, min_price, max_price):
+            room = self._by_number[number]
+            if self._masks[number] & required != required:
+                continue
+            if check_in is not None and not room.is_available_for(check_in, check_out):
+                continue
+            matches.append(room)
+        return matches
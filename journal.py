@@ -0,0 +1,582 @@
+import glob
+import json
+import os
+import pickle
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+from hotel.guest import Guest
+from hotel.room import SingleRoom, DoubleRoom, Suite
+from hotel.booking import Booking, CreditCardPayment, MobileWalletPayment
+from hotel.services import ServiceRequest, Feedback
+
+
+ROOM_CLASSES = {cls.__name__: cls for cls in (SingleRoom, DoubleRoom, Suite)}
+
+# One-letter event codes keep journal lines compact.
+GUEST_CREATED = "G"
+ROOM_ADDED = "R"
+BOOKING_MADE = "B"
+AVAILABILITY_CHANGED = "A"
+POINTS_EARNED = "P"
+SERVICE_REQUESTED = "S"
+FEEDBACK_SUBMITTED = "F"
+SERVICE_STATUS_CHANGED = "T"
+BOOKING_MOVED = "M"
+PAYMENTS_SETTLED = "C"
+BOOKING_CANCELLED = "X"
+BOOKING_CHANGED = "D"
+LEDGER_ENTRIES = "L"
+LOYALTY_UPDATED = "Y"
+
+SEGMENT_PATTERN = "journal-%020d.log"
+SNAPSHOT_PATTERN = "snapshot-%020d.pickle"
+
+
+def _sequence_of(path):
+    """
+    Extract the sequence number embedded in a segment or snapshot file name.
+    """
+    return int(os.path.basename(path).split("-")[1].split(".")[0])
+
+
+class EventJournal:
+    """
+    Append-only, segmented event log with group-commit fsync.
+
+    Events are appended to the active segment under a lock and a background
+    flusher thread fsyncs whatever has accumulated, so concurrent writers
+    waiting for durability share a single fsync. Each segment is named after
+    the sequence number of its first event.
+    """
+    def __init__(self, directory, next_sequence=1):
+        """
+        Open the journal for appending.
+        :param directory: str, directory holding journal segments
+        :param next_sequence: int, sequence number of the next event
+        """
+        self._directory = directory
+        self._next_sequence = next_sequence
+        self._written = next_sequence - 1
+        self._durable = next_sequence - 1
+        self._cond = threading.Condition()
+        self._closed = False
+        self._file = self._open_segment(next_sequence)
+        self._flusher = threading.Thread(target=self._flush_loop, name="journal-flusher", daemon=True)
+        self._flusher.start()
+
+    @property
+    def next_sequence(self):
+        return self._next_sequence
+
+    def _open_segment(self, first_sequence):
+        return open(os.path.join(self._directory, SEGMENT_PATTERN % first_sequence), "ab")
+
+    def append(self, event, sync=True):
+        """
+        Append an event to the journal.
+        :param event: list, event code followed by its JSON-serializable fields
+        :param sync: bool, wait until the event is fsynced to disk
+        :return: int, sequence number assigned to the event
+        """
+        with self._cond:
+            if self._closed:
+                raise ValueError("Journal is closed")
+            sequence = self._next_sequence
+            self._next_sequence += 1
+            line = json.dumps([sequence] + list(event), separators=(",", ":"))
+            self._file.write(line.encode("utf-8") + b"\n")
+            self._written = sequence
+            self._cond.notify_all()
+            if sync:
+                while self._durable < sequence and not self._closed:
+                    self._cond.wait()
+        return sequence
+
+    def _flush_loop(self):
+        """
+        Fsync batches of appended events until the journal is closed.
+        """
+        while True:
+            with self._cond:
+                while self._written == self._durable and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                target = self._written
+                self._file.flush()
+                descriptor = self._file.fileno()
+            # Appends made while we fsync are picked up by the next round.
+            os.fsync(descriptor)
+            with self._cond:
+                self._durable = max(self._durable, target)
+                self._cond.notify_all()
+
+    def _sync_locked(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._durable = self._written
+        self._cond.notify_all()
+
+    def rotate(self):
+        """
+        Seal the active segment and start a new one at the next sequence number.
+        :return: int, last sequence number contained in the sealed segments
+        """
+        with self._cond:
+            self._sync_locked()
+            self._file.close()
+            self._file = self._open_segment(self._next_sequence)
+            return self._next_sequence - 1
+
+    def close(self):
+        """
+        Flush outstanding events and stop the flusher thread.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._sync_locked()
+            self._closed = True
+            self._file.close()
+            self._cond.notify_all()
+        self._flusher.join()
+
+    @staticmethod
+    def replay(directory, after_sequence=0):
+        """
+        Read the events recorded after a sequence number, oldest first.
+        :param directory: str, directory holding journal segments
+        :param after_sequence: int, skip events up to and including this number
+        :return: generator, decoded events as lists starting with their sequence
+        """
+        segments = sorted(glob.glob(os.path.join(directory, "journal-*.log")), key=_sequence_of)
+        # Skip every segment that is wholly covered by the snapshot.
+        start = 0
+        for i, path in enumerate(segments):
+            if _sequence_of(path) <= after_sequence + 1:
+                start = i
+        for path in segments[start:]:
+            with open(path, "rb") as handle:
+                for line in handle:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # A torn final write from a crash; nothing after it was acknowledged.
+                        break
+                    if event[0] > after_sequence:
+                        yield event
+
+
+class _StateLock:
+    """
+    Shared/exclusive lock between changes to the journaled state and snapshots.
+
+    Any number of threads may change state at once (each change still takes
+    its own finer locks), but a snapshot waits for the changes in progress
+    and holds off new ones. Changes held off by one snapshot go before the
+    next one. Changes nest within a thread.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._changes = 0
+        self._waiting = 0
+        self._snapshotting = False
+        self._local = threading.local()
+
+    @property
+    def depth(self):
+        """
+        Number of changes the calling thread is inside.
+        """
+        return getattr(self._local, "depth", 0)
+
+    @contextmanager
+    def change(self):
+        depth = self.depth
+        if not depth:
+            with self._cond:
+                if self._snapshotting:
+                    self._waiting += 1
+                    while self._snapshotting:
+                        self._cond.wait()
+                    self._waiting -= 1
+                    if not self._waiting:
+                        self._cond.notify_all()
+                self._changes += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if not depth:
+                with self._cond:
+                    self._changes -= 1
+                    if not self._changes:
+                        self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self._cond:
+            while self._snapshotting or self._waiting:
+                self._cond.wait()
+            self._snapshotting = True
+            while self._changes:
+                self._cond.wait()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._snapshotting = False
+                self._cond.notify_all()
+
+
+class HotelJournal:
+    """
+    Journaled hotel state: guests, rooms, service requests, feedback and the loyalty ledger rows.
+
+    Every state change is logged as a compact event. A pickled snapshot of the
+    object graph is written every ``snapshot_every`` events, so a restart
+    loads the latest snapshot and replays only the journal tail behind it.
+    Callers wrap each change to the journaled objects and the log_* call
+    recording it in recording(); a snapshot waits for those in progress, so
+    it never holds a change whose event went to the next segment, and never
+    pickles objects while they are being modified.
+    """
+    def __init__(self, directory, snapshot_every=100000):
+        """
+        Open the journal directory, restoring the state it records.
+        :param directory: str, directory for journal segments and snapshots
+        :param snapshot_every: int, number of events between automatic snapshots
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._snapshot_every = snapshot_every
+        self.guests = {}
+        self.rooms = {}
+        self.service_requests = []
+        self.feedback = []
+        self.ledger_entries = []
+        last_sequence = self._load_snapshot()
+        for event in EventJournal.replay(directory, last_sequence):
+            self._apply(event)
+            last_sequence = event[0]
+        self._state = _StateLock()
+        self._snapshot_sequence = last_sequence
+        self._journal = EventJournal(directory, last_sequence + 1)
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def _snapshot_paths(self):
+        return sorted(glob.glob(os.path.join(self._directory, "snapshot-*.pickle")), key=_sequence_of)
+
+    def _load_snapshot(self):
+        """
+        Restore the newest snapshot, if any.
+        :return: int, last sequence number covered by the snapshot
+        """
+        snapshots = self._snapshot_paths()
+        if not snapshots:
+            return 0
+        with open(snapshots[-1], "rb") as handle:
+            state = pickle.load(handle)
+        # Snapshots taken before the loyalty ledger was journaled hold four parts.
+        self.guests, self.rooms, self.service_requests, self.feedback = state[:4]
+        self.ledger_entries = state[4] if len(state) > 4 else []
+        # Holds reserve stays without a booking and are never journaled; they must not outlive the process.
+        booked = {(booking.room.room_number, booking.check_in_date.toordinal(), booking.check_out_date.toordinal())
+                  for guest in self.guests.values() for booking in guest.bookings if not booking.cancelled}
+        for room in self.rooms.values():
+            for start, end, _ in list(room.stays):
+                if (room.room_number, start, end) not in booked:
+                    room.release(start, end)
+        return _sequence_of(snapshots[-1])
+
+    @contextmanager
+    def recording(self):
+        """
+        Hold off snapshots while a state change and the events recording it are made.
+
+        Changes made inside run concurrently with each other; an automatic
+        snapshot that falls due inside is taken once the outermost one exits.
+        """
+        with self._state.change():
+            yield
+        if not self._state.depth and self._journal.next_sequence - 1 - self._snapshot_sequence >= \
+                self._snapshot_every:
+            self.snapshot()
+
+    def snapshot(self):
+        """
+        Write a snapshot of the current object graph and start a new segment.
+        :return: str, path of the written snapshot
+        :raises RuntimeError: if called inside recording(), which the snapshot would wait for
+        """
+        if self._state.depth:
+            raise RuntimeError("Cannot snapshot inside a recorded change")
+        with self._state.exclusive():
+            last_sequence = self._journal.rotate()
+            path = os.path.join(self._directory, SNAPSHOT_PATTERN % last_sequence)
+            temporary = path + ".tmp"
+            with open(temporary, "wb") as handle:
+                pickle.dump((self.guests, self.rooms, self.service_requests, self.feedback, self.ledger_entries),
+                            handle, protocol=pickle.HIGHEST_PROTOCOL)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temporary, path)
+            self._snapshot_sequence = last_sequence
+        return path
+
+    def compact(self):
+        """
+        Snapshot the current state and delete the segments and snapshots it supersedes.
+        """
+        path = self.snapshot()
+        last_sequence = _sequence_of(path)
+        for old in self._snapshot_paths():
+            if old != path:
+                os.remove(old)
+        for segment in glob.glob(os.path.join(self._directory, "journal-*.log")):
+            if _sequence_of(segment) <= last_sequence:
+                os.remove(segment)
+
+    def close(self):
+        """
+        Flush the journal and release its files.
+        """
+        self._journal.close()
+
+    def _record(self, *event):
+        with self.recording():
+            self._journal.append(event)
+
+    # Logging of state changes
+
+    def log_room_added(self, room):
+        """
+        Record a room added to the inventory.
+        """
+        with self.recording():
+            self.rooms[room.room_number] = room
+            self._record(ROOM_ADDED, room.room_number, room.__class__.__name__,
+                         room.price_per_night, room.amenities, room.is_available)
+
+    def log_guest_created(self, guest):
+        """
+        Record a newly created guest account.
+        """
+        with self.recording():
+            self.guests[guest.guest_id] = guest
+            self._record(GUEST_CREATED, guest.guest_id, guest.name, guest.email, guest.contact)
+
+    def log_booking_made(self, booking):
+        """
+        Record a booking, its payment and the stay it reserves.
+        """
+        payment = booking.payment
+        payment_fields = None
+        if payment is not None:
+            payment_fields = [payment.__class__.__name__, payment.amount, payment.payment_date,
+                              payment.transaction_id,
+                              getattr(payment, "card_number", None) or getattr(payment, "wallet_type", None),
+                              getattr(payment, "expiry_date", None) or getattr(payment, "phone_number", None)]
+        self._record(BOOKING_MADE, booking.booking_id, booking.guest.guest_id, booking.room.room_number,
+                     booking.check_in_date.toordinal(), booking.check_out_date.toordinal(), payment_fields,
+                     booking.flexible)
+
+    def log_bookings_moved(self, bookings):
+        """
+        Record bookings moved to other rooms in one batch (moves may swap rooms, so they replay together).
+        """
+        self._record(BOOKING_MOVED, [[booking.booking_id, booking.guest.guest_id, booking.room.room_number]
+                                     for booking in bookings])
+
+    def log_booking_cancelled(self, booking):
+        """
+        Record a cancelled booking; replay frees its stay and takes back its points.
+        """
+        self._record(BOOKING_CANCELLED, booking.booking_id, booking.guest.guest_id)
+
+    def log_booking_changed(self, booking):
+        """
+        Record a booking's new room, dates and invoice total.
+        """
+        self._record(BOOKING_CHANGED, booking.booking_id, booking.guest.guest_id, booking.room.room_number,
+                     booking.check_in_date.toordinal(), booking.check_out_date.toordinal(),
+                     booking.invoice["total"] if booking.invoice else None)
+
+    def log_payments_settled(self, bookings):
+        """
+        Record the settlement outcome of a batch of bookings' payments.
+        """
+        self._record(PAYMENTS_SETTLED, [[booking.booking_id, booking.guest.guest_id, booking.invoice["payment_status"],
+                                         booking.invoice["payment_reference"], booking.invoice["payment_error"]]
+                                        for booking in bookings])
+
+    def log_availability_changed(self, room):
+        """
+        Record a change of a room's in-service flag.
+        """
+        self._record(AVAILABILITY_CHANGED, room.room_number, room.is_available)
+
+    def log_points_earned(self, guest, amount, kind="earn", reference=None):
+        """
+        Record loyalty points earned or redeemed outside of a booking.
+        :param amount: int, signed change to the balance
+        :param kind: str, "earn" or "redeem"
+        """
+        self._record(POINTS_EARNED, guest.guest_id, amount, kind, reference)
+
+    def log_ledger_entries(self, rows, accounts):
+        """
+        Record loyalty ledger rows and the tier of the accounts they changed.
+        :param rows: list, (account_id, day ordinal, points, kind, reference) rows
+        :param accounts: iterable, LoyaltyAccount objects the rows belong to
+        """
+        with self.recording():
+            self.ledger_entries.extend(tuple(row) for row in rows)
+            self._record(LEDGER_ENTRIES, [list(row) for row in rows],
+                         [[account.account_id, account.tier, account.last_updated] for account in accounts])
+
+    def log_loyalty_updated(self, accounts):
+        """
+        Record the balance and tier the nightly loyalty run left on accounts.
+        :param accounts: iterable, LoyaltyAccount objects it changed
+        """
+        self._record(LOYALTY_UPDATED, [[account.account_id, account.points, account.tier, account.last_updated]
+                                       for account in accounts])
+
+    def log_service_request(self, guest, service_request):
+        """
+        Record a submitted service request.
+        """
+        with self.recording():
+            self.service_requests.append(service_request)
+            self._record(SERVICE_REQUESTED, guest.guest_id, service_request.request_type,
+                         service_request.details, service_request.status, service_request.request_date,
+                         service_request.request_id, service_request.room_number)
+
+    def log_service_status(self, service_request):
+        """
+        Record a service request moving to a new status.
+        """
+        self._record(SERVICE_STATUS_CHANGED, service_request.request_id, service_request.status)
+
+    def log_feedback(self, guest, feedback):
+        """
+        Record submitted guest feedback.
+        """
+        with self.recording():
+            self.feedback.append(feedback)
+            self._record(FEEDBACK_SUBMITTED, guest.guest_id, feedback.rating, feedback.comments,
+                         feedback.guest_name, feedback.feedback_date, feedback.booking_id, feedback.room_type)
+
+    # Replay
+
+    def _apply(self, event):
+        """
+        Re-apply one journaled event to the in-memory state.
+        """
+        code, fields = event[1], event[2:]
+        if code == ROOM_ADDED:
+            room_number, room_type, price, amenities, is_available = fields
+            room = ROOM_CLASSES[room_type](room_number)
+            room.price_per_night = price
+            room.amenities = amenities
+            room.is_available = is_available
+            self.rooms[room_number] = room
+        elif code == GUEST_CREATED:
+            guest_id, name, email, contact = fields
+            self.guests[guest_id] = Guest(guest_id, name, email, contact)
+        elif code == BOOKING_MADE:
+            # Bookings journaled before room-type booking carry no flexible flag.
+            booking_id, guest_id, room_number, check_in, check_out, payment_fields, flexible = (fields + [False])[:7]
+            guest, room = self.guests[guest_id], self.rooms[room_number]
+            booking = Booking(guest, room, date.fromordinal(check_in), date.fromordinal(check_out), booking_id,
+                              flexible)
+            if payment_fields is not None:
+                method, amount, payment_date, transaction_id, first, second = payment_fields
+                payment_class = CreditCardPayment if method == "CreditCardPayment" else MobileWalletPayment
+                booking.set_payment(payment_class(amount, first, second, payment_date, transaction_id))
+                booking.generate_invoice()
+                # Prices may have changed since; the invoice is what was charged.
+                booking.invoice["total"] = amount
+            room.reserve(check_in, check_out, booking_id)
+            guest.make_booking(booking)
+        elif code == BOOKING_MOVED:
+            moved = []
+            for booking_id, guest_id, room_number in fields[0]:
+                booking = next(booking for booking in self.guests[guest_id].bookings
+                               if booking.booking_id == booking_id)
+                booking.room.release(booking.check_in_date, booking.check_out_date)
+                moved.append((booking, self.rooms[room_number]))
+            for booking, room in moved:
+                booking.move_to(room)
+                room.reserve(booking.check_in_date, booking.check_out_date, booking.booking_id)
+        elif code == BOOKING_CANCELLED:
+            booking_id, guest_id = fields
+            guest = self.guests[guest_id]
+            booking = next(booking for booking in guest.bookings if booking.booking_id == booking_id)
+            booking.room.release(booking.check_in_date, booking.check_out_date)
+            guest.cancel_booking(booking)
+        elif code == BOOKING_CHANGED:
+            booking_id, guest_id, room_number, check_in, check_out, total = fields
+            guest, room = self.guests[guest_id], self.rooms[room_number]
+            booking = next(booking for booking in guest.bookings if booking.booking_id == booking_id)
+            booking.room.release(booking.check_in_date, booking.check_out_date)
+            room.reserve(check_in, check_out, booking_id)
+            guest.change_booking(booking, room, date.fromordinal(check_in), date.fromordinal(check_out), total)
+        elif code == PAYMENTS_SETTLED:
+            for booking_id, guest_id, status, reference, error in fields[0]:
+                booking = next((booking for booking in self.guests[guest_id].bookings
+                                if booking.booking_id == booking_id), None)
+                # A booking may be cancelled before its payment settles.
+                if booking is not None:
+                    booking.record_settlement(status, reference, error)
+        elif code == AVAILABILITY_CHANGED:
+            room_number, is_available = fields
+            self.rooms[room_number].update_availability(is_available)
+        elif code == POINTS_EARNED:
+            # Points journaled before redemptions were carry no kind or reference.
+            guest_id, amount, kind, reference = (fields + ["earn", None])[:4]
+            account = self.guests[guest_id].loyalty_account
+            if kind == "redeem":
+                account.redeem_points(-amount, reference)
+            else:
+                account.earn_points(amount, reference)
+        elif code == LEDGER_ENTRIES:
+            # Balances replay from the booking and points events; the rows are the audit trail.
+            rows, accounts = fields
+            self.ledger_entries.extend(tuple(row) for row in rows)
+            for account_id, tier, last_updated in accounts:
+                account = self.guests[account_id].loyalty_account
+                account.tier = tier
+                account.last_updated = last_updated
+        elif code == LOYALTY_UPDATED:
+            for account_id, points, tier, last_updated in fields[0]:
+                account = self.guests[account_id].loyalty_account
+                account.points = points
+                account.tier = tier
+                account.last_updated = last_updated
+        elif code == SERVICE_REQUESTED:
+            # Requests journaled before they were keyed carry no ID or room.
+            guest_id, request_type, details, status, request_date, request_id, room_number = \
+                (fields + [None, None])[:7]
+            self.service_requests.append(ServiceRequest(request_type, details, status, request_date, request_id,
+                                                        guest_id, room_number))
+        elif code == SERVICE_STATUS_CHANGED:
+            request_id, status = fields
+            # Status changes follow their request closely, so search from the newest.
+            for service_request in reversed(self.service_requests):
+                if service_request.request_id == request_id:
+                    service_request.status = status
+                    break
+        elif code == FEEDBACK_SUBMITTED:
+            # Feedback journaled before it was linked to bookings carries no booking or room type.
+            rating, comments, guest_name, feedback_date, booking_id, room_type = (fields[1:] + [None, None])[:6]
+            self.feedback.append(Feedback(rating, comments, guest_name, feedback_date, booking_id, room_type))
+        else:
+            raise ValueError(f"Unknown journal event: {code}")
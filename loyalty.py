@@ -0,0 +1,239 @@
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+
+
+POINTS_PER_DOLLAR = 1
+POINTS_PER_NIGHT = 50
+
+# Tier name and the qualifying points (earned over QUALIFYING_DAYS) needed to reach it.
+TIERS = (("Basic", 0), ("Silver", 2000), ("Gold", 7500), ("Platinum", 20000))
+QUALIFYING_DAYS = 365
+EXPIRY_DAYS = 730
+
+# "status" rows carry the qualifying points of a tier an account already held when it
+# joined the ledger; they count towards the tier but never move the balance.
+ENTRY_KINDS = ("open", "earn", "redeem", "expire", "status")
+OPEN, EARN, REDEEM, EXPIRE, STATUS = range(len(ENTRY_KINDS))
+_TIER_RANKS = {name: rank for rank, (name, _) in enumerate(TIERS)}
+_THRESHOLDS = [threshold for _, threshold in TIERS]
+
+LedgerEntry = namedtuple("LedgerEntry", ["account_id", "date", "points", "kind", "reference", "balance"])
+
+
+def stay_points(booking):
+    """
+    Points earned by a stay: a rate per dollar charged plus a rate per night.
+    :param booking: Booking object; the invoice total is used when there is one
+    :return: int, points to award
+    """
+    nights = (booking.check_out_date - booking.check_in_date).days
+    invoice = booking.invoice
+    total = invoice["total"] if invoice else booking.room.price_per_night * nights
+    return int(total * POINTS_PER_DOLLAR) + nights * POINTS_PER_NIGHT
+
+
+def tier_for(points):
+    """
+    Tier reached with a number of qualifying points.
+    """
+    return TIERS[bisect_right(_THRESHOLDS, points) - 1][0]
+
+
+class LoyaltyLedger:
+    """
+    Append-only points ledger for every loyalty account.
+
+    Entries are rows across typed arrays (account number, date ordinal,
+    signed points, entry kind) plus a reference for the audit trail. Each
+    point change on a registered account is appended through the account's
+    listener, and the account's tier is recomputed from a running count of
+    qualifying points. run_nightly() recomputes qualifying points, expires
+    the balances of inactive accounts and re-tiers every account in one
+    NumPy pass over the whole ledger. Entries loaded from storage restore
+    the audit trail, and every new entry is handed to the on_entries sink.
+    """
+    def __init__(self, accounts=(), today=date.today, entries=(), on_entries=None):
+        """
+        Initialize the ledger.
+        :param accounts: iterable, LoyaltyAccount objects to register
+        :param today: callable, returns the date recorded on new entries
+        :param entries: iterable, stored (account_id, day ordinal, points, kind, reference) rows, oldest first
+        :param on_entries: callable, receives each list of new rows in the same form, e.g. to persist them
+        """
+        self._lock = threading.Lock()
+        self._today = today
+        self._on_entries = on_entries
+        self._numbers = {}
+        self._accounts = []
+        self._qualifying = array("q")
+        self._tier_ranks = array("b")
+        self.account_numbers = array("l")
+        self.days = array("l")
+        self.points = array("q")
+        self.kinds = array("b")
+        self.references = []
+        history = {}
+        for entry in entries:
+            history.setdefault(entry[0], []).append(entry)
+        for account in accounts:
+            self.register(account, history.get(account.account_id, ()))
+
+    def __len__(self):
+        return len(self.account_numbers)
+
+    def register(self, account, history=()):
+        """
+        Start recording an account's point changes.
+
+        An account with stored history resumes from it. Otherwise its balance
+        is entered as an opening entry and its current tier as a status entry,
+        so the tier is kept until it lapses like points earned today would.
+        :param account: LoyaltyAccount object
+        :param history: iterable, the account's stored (account_id, day ordinal, points, kind, reference) rows
+        """
+        today = self._today().toordinal()
+        new_rows = []
+        with self._lock:
+            if account.account_id in self._numbers:
+                raise ValueError(f"Loyalty account {account.account_id} is already registered")
+            number = self._numbers[account.account_id] = len(self._accounts)
+            self._accounts.append(account)
+            qualifying = 0
+            for _, day, points, kind, reference in history:
+                kind = ENTRY_KINDS.index(kind)
+                self._append(number, day, points, kind, reference)
+                if kind in (EARN, STATUS) and day > today - QUALIFYING_DAYS:
+                    qualifying += points
+            if not history:
+                status = TIERS[_TIER_RANKS.get(account.tier, 0)][1]
+                if account.points:
+                    new_rows.append((account.account_id, today, account.points, "open", None))
+                if status:
+                    new_rows.append((account.account_id, today, status, "status", account.tier))
+                for _, day, points, kind, reference in new_rows:
+                    self._append(number, day, points, ENTRY_KINDS.index(kind), reference)
+                qualifying = status
+            self._qualifying.append(qualifying)
+            self._tier_ranks.append(_TIER_RANKS.get(account.tier, 0))
+        account.add_listener(self._on_points_changed)
+        self._emit(new_rows)
+
+    def _emit(self, rows):
+        if rows and self._on_entries is not None:
+            self._on_entries(rows)
+
+    def _append(self, number, day, points, kind, reference):
+        self.account_numbers.append(number)
+        self.days.append(day)
+        self.points.append(points)
+        self.kinds.append(kind)
+        self.references.append(reference)
+
+    def _on_points_changed(self, account, field, old_value):
+        """
+        Record a point change and recompute the account's tier.
+        """
+        if field != "points":
+            return
+        delta, kind, reference = old_value
+        today = self._today()
+        with self._lock:
+            number = self._numbers[account.account_id]
+            self._append(number, today.toordinal(), delta, ENTRY_KINDS.index(kind), reference)
+            if kind == "earn":
+                self._qualifying[number] += delta
+            account.tier = tier_for(self._qualifying[number])
+            self._tier_ranks[number] = _TIER_RANKS[account.tier]
+        account.last_updated = today.isoformat()
+        self._emit([(account.account_id, today.toordinal(), delta, kind, reference)])
+
+    def entries(self, account_id):
+        """
+        Audit trail of one account, oldest first, with the running balance.
+        :return: list, LedgerEntry tuples
+        """
+        number = self._numbers.get(account_id)
+        if number is None:
+            return []
+        with self._lock:
+            rows = np.nonzero(self._column(self.account_numbers, np.dtype("l")) == number)[0].tolist()
+            entries, balance = [], 0
+            for row in rows:
+                if self.kinds[row] != STATUS:
+                    balance += self.points[row]
+                entries.append(LedgerEntry(account_id, date.fromordinal(self.days[row]), self.points[row],
+                                           ENTRY_KINDS[self.kinds[row]], self.references[row], balance))
+        return entries
+
+    @staticmethod
+    def _column(column, dtype):
+        return np.frombuffer(column, dtype=dtype) if len(column) else np.empty(0, dtype=dtype)
+
+    def run_nightly(self, today=None):
+        """
+        Expire the points of inactive accounts and re-tier every account from the ledger.
+
+        An account is inactive when it has had no entry other than an expiry
+        for EXPIRY_DAYS; its whole balance expires. Tiers are recomputed from
+        the points earned over the last QUALIFYING_DAYS, so they can go down.
+        :param today: date, business date of the run (defaults to the ledger's clock)
+        :return: dict, run statistics
+        """
+        started = time.perf_counter()
+        today = (today or self._today()).toordinal()
+        with self._lock:
+            count = len(self._accounts)
+            accounts = self._column(self.account_numbers, np.dtype("l"))
+            days = self._column(self.days, np.dtype("l"))
+            points = self._column(self.points, np.int64)
+            kinds = self._column(self.kinds, np.int8)
+            rows = len(accounts)
+
+            balances = np.zeros(count, dtype=np.int64)
+            moves = kinds != STATUS
+            np.add.at(balances, accounts[moves], points[moves])
+            activity = kinds != EXPIRE
+            last_active = np.full(count, -1, dtype=np.int64)
+            np.maximum.at(last_active, accounts[activity], days[activity])
+            recent = ((kinds == EARN) | (kinds == STATUS)) & (days > today - QUALIFYING_DAYS)
+            qualifying = np.zeros(count, dtype=np.int64)
+            np.add.at(qualifying, accounts[recent], points[recent])
+
+            expiring = np.nonzero((balances > 0) & (last_active <= today - EXPIRY_DAYS))[0]
+            expired = balances[expiring]
+            # Grow the columns only after the NumPy views over them are no longer needed.
+            del accounts, days, points, kinds
+            self.account_numbers.extend(expiring.tolist())
+            self.days.extend([today] * len(expiring))
+            self.points.extend((-expired).tolist())
+            self.kinds.extend([EXPIRE] * len(expiring))
+            self.references.extend([None] * len(expiring))
+
+            tiers = np.searchsorted(np.array(_THRESHOLDS, dtype=np.int64), qualifying, side="right") - 1
+            current = np.array(self._tier_ranks, dtype=np.int64)
+            self._qualifying = array("q", qualifying.tobytes())
+            self._tier_ranks = array("b", tiers.astype(np.int8).tobytes())
+            for number in expiring.tolist():
+                self._accounts[number].points = 0
+                self._accounts[number].last_updated = date.fromordinal(today).isoformat()
+            changed = np.nonzero(tiers != current)[0]
+            for number in changed.tolist():
+                self._accounts[number].tier = TIERS[tiers[number]][0]
+            expiry_rows = [(self._accounts[number].account_id, today, -points, "expire", None)
+                           for number, points in zip(expiring.tolist(), expired.tolist())]
+        self._emit(expiry_rows)
+        return {
+            "accounts": count,
+            "ledger_rows": rows,
+            "expired_accounts": len(expiring),
+            "expired_points": int(expired.sum()),
+            "promoted": int((tiers[changed] > current[changed]).sum()),
+            "demoted": int((tiers[changed] < current[changed]).sum()),
+            "seconds": time.perf_counter() - started,
+        }
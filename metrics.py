@@ -0,0 +1,387 @@
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Counter:
+    """
+    Monotonically increasing count.
+    """
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        yield self.name, self.labels, self.value
+
+
+class Gauge:
+    """
+    Current value, read from a callable when metrics are exported.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help_text, func, labels=()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._func = func
+
+    def samples(self):
+        yield self.name, self.labels, self._func()
+
+
+class Histogram:
+    """
+    Distribution of observed values (latencies in seconds) over fixed buckets.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self._buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def samples(self):
+        with self._lock:
+            counts, total, count = list(self._counts), self.sum, self.count
+        cumulative = 0
+        for bound, n in zip(self._buckets + ("+Inf",), counts):
+            cumulative += n
+            yield self.name + "_bucket", self.labels + (("le", str(bound)),), cumulative
+        yield self.name + "_sum", self.labels, total
+        yield self.name + "_count", self.labels, count
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and latency histograms with Prometheus text export.
+
+    Hot-path functions are registered with instrument() but are only wrapped
+    while the registry is enabled: enable() swaps timing wrappers onto the
+    owning classes and disable() puts the original functions back, so a
+    disabled registry adds no overhead at all. While profiling is on, one in
+    every ``profile_every`` instrumented calls runs under cProfile.
+    """
+    def __init__(self, namespace="hotel"):
+        """
+        Initialize an empty, disabled registry.
+        :param namespace: str, prefix of every metric name
+        """
+        self._namespace = namespace
+        self._lock = threading.RLock()
+        self._metrics = {}
+        self._targets = []
+        self._enabled = False
+        self._profile = None
+        self._profile_every = 0
+        self._profile_calls = 0
+        self._profile_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    def _get(self, cls, name, help_text, labels, *args):
+        key = (self._namespace + "_" + name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = cls(key[0], help_text, key[1], *args)
+            return metric
+
+    def counter(self, name, help_text, labels=None):
+        """
+        Get or create a counter.
+        :param labels: dict, label names and values
+        :return: Counter
+        """
+        return self._get(Counter, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=None, buckets=DEFAULT_BUCKETS):
+        """
+        Get or create a histogram.
+        :return: Histogram
+        """
+        return self._get(Histogram, name, help_text, labels, buckets)
+
+    def gauge(self, name, help_text, func, labels=None):
+        """
+        Register a gauge read from func() at export time (replacing one with the same name and labels).
+        :return: Gauge
+        """
+        key = (self._namespace + "_" + name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            gauge = self._metrics[key] = Gauge(key[0], help_text, func, key[1])
+        return gauge
+
+    # Instrumentation
+
+    def instrument(self, owner, attribute, operation):
+        """
+        Time every call of owner.attribute as one operation while the registry is enabled.
+        :param owner: class (or module) defining the function
+        :param attribute: str, function name
+        :param operation: str, value of the "operation" label
+        """
+        labels = {"operation": operation}
+        calls = self.counter("operations_total", "Instrumented calls", labels)
+        errors = self.counter("operation_errors_total", "Instrumented calls that raised", labels)
+        latency = self.histogram("operation_seconds", "Latency of instrumented calls", labels)
+        original = owner.__dict__[attribute]
+        with self._lock:
+            self._targets.append((owner, attribute, original, self._wrap(original, calls, errors, latency)))
+            if self._enabled:
+                setattr(owner, attribute, self._targets[-1][3])
+
+    def instrumented(self, owner, attribute):
+        """
+        Check whether owner.attribute is already registered with instrument().
+        """
+        return any(target[0] is owner and target[1] == attribute for target in self._targets)
+
+    def _wrap(self, func, calls, errors, latency):
+        registry = self
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                if registry._profile_every:
+                    return registry._maybe_profile(func, args, kwargs)
+                return func(*args, **kwargs)
+            except BaseException:
+                errors.inc()
+                raise
+            finally:
+                calls.inc()
+                latency.observe(time.perf_counter() - started)
+        return timed
+
+    def enable(self):
+        """
+        Start collecting: install the timing wrappers.
+        """
+        with self._lock:
+            for owner, attribute, _, wrapper in self._targets:
+                setattr(owner, attribute, wrapper)
+            self._enabled = True
+
+    def disable(self):
+        """
+        Stop collecting: restore the original functions.
+        """
+        with self._lock:
+            for owner, attribute, original, _ in self._targets:
+                setattr(owner, attribute, original)
+            self._enabled = False
+
+    # Profiling
+
+    def _maybe_profile(self, func, args, kwargs):
+        every = self._profile_every
+        self._profile_calls += 1
+        if not every or self._profile_calls % every or not self._profile_lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+        try:
+            profile = self._profile
+            if profile is None:
+                return func(*args, **kwargs)
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            self._profile_lock.release()
+
+    def start_profiling(self, every=100):
+        """
+        Profile one in every ``every`` instrumented calls (the registry must be enabled).
+        """
+        with self._profile_lock:
+            self._profile = cProfile.Profile()
+            self._profile_calls = 0
+            self._profile_every = every
+
+    def stop_profiling(self, limit=30):
+        """
+        Stop profiling and report where the sampled calls spent their time.
+        :param limit: int, number of functions listed
+        :return: str, pstats report sorted by cumulative time
+        """
+        with self._profile_lock:
+            profile, self._profile, self._profile_every = self._profile, None, 0
+        if profile is None:
+            return ""
+        out = io.StringIO()
+        try:
+            pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(limit)
+        except TypeError:
+            return "No calls were sampled.\n"
+        return out.getvalue()
+
+    @staticmethod
+    def start_tracemalloc(frames=10):
+        """
+        Start tracing memory allocations.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    @staticmethod
+    def tracemalloc_top(limit=20, stop=False):
+        """
+        Report the source lines holding the most traced memory.
+        :param stop: bool, stop tracing afterwards
+        :return: str, one line per allocation site
+        """
+        if not tracemalloc.is_tracing():
+            return "tracemalloc is not running\n"
+        stats = tracemalloc.take_snapshot().statistics("lineno")[:limit]
+        if stop:
+            tracemalloc.stop()
+        return "".join(f"{stat}\n" for stat in stats)
+
+    # Export
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+        :return: str, exposition text
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: (metric.name, metric.labels))
+        lines, described = [], set()
+        for metric in metrics:
+            if metric.name not in described:
+                described.add(metric.name)
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Write the exposition text to a file atomically (e.g. for node_exporter's textfile collector).
+        """
+        temporary = path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            handle.write(self.render())
+        os.replace(temporary, path)
+
+    def serve(self, host="127.0.0.1", port=9100):
+        """
+        Serve the metrics and profiling toggles over HTTP on a background thread.
+
+        GET /metrics returns the exposition text; /profile/start?every=N,
+        /profile/stop, /tracemalloc/start and /tracemalloc/top?stop=1 drive
+        the profiling hooks.
+        :return: ThreadingHTTPServer, call shutdown() to stop it
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path, _, query = self.path.partition("?")
+                params = dict(item.partition("=")[::2] for item in query.split("&") if item)
+                status, body = 200, ""
+                if path == "/metrics":
+                    body = registry.render()
+                elif path == "/profile/start":
+                    registry.start_profiling(int(params.get("every", 100)))
+                    body = "profiling\n"
+                elif path == "/profile/stop":
+                    body = registry.stop_profiling()
+                elif path == "/tracemalloc/start":
+                    registry.start_tracemalloc()
+                    body = "tracing\n"
+                elif path == "/tracemalloc/top":
+                    body = registry.tracemalloc_top(stop=params.get("stop") == "1")
+                else:
+                    status, body = 404, "not found\n"
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+
+REGISTRY = MetricsRegistry()
+
+
+def instrument_hotel(hotel, registry=REGISTRY):
+    """
+    Register the booking hot paths and the hotel's gauges with a registry.
+    :param hotel: HotelCLI, source of the inventory, booking and queue gauges
+    :param registry: MetricsRegistry to use
+    """
+    from datetime import date
+    from hotel.booking import Booking, CreditCardPayment, MobileWalletPayment
+
+    # Instrument the hotel's own class: under ``python -m hotel.cli`` it is __main__.HotelCLI.
+    hotel_class = next(cls for cls in type(hotel).__mro__ if "book_room" in cls.__dict__)
+    if not registry.instrumented(hotel_class, "book_room"):
+        registry.instrument(hotel_class, "book_room", "make_booking")
+        registry.instrument(hotel_class, "available_rooms", "search_rooms")
+        registry.instrument(hotel_class, "file_service_request", "service_request")
+    if not registry.instrumented(Booking, "generate_invoice"):
+        registry.instrument(Booking, "generate_invoice", "generate_invoice")
+        registry.instrument(CreditCardPayment, "process_payment", "process_payment")
+        registry.instrument(MobileWalletPayment, "process_payment", "process_payment")
+
+    def active_bookings():
+        today = date.today().toordinal()
+        return sum(1 for room in hotel.rooms if room.stays.overlaps(today, today + 1))
+
+    registry.gauge("rooms", "Rooms in inventory", lambda: len(hotel.rooms))
+    registry.gauge("active_bookings", "Stays in progress today", active_bookings)
+    registry.gauge("guests", "Guests known to this process", lambda: len(hotel.guests))
+    registry.gauge("service_queue_depth", "Service requests waiting for staff", lambda: len(hotel.dispatcher))
+    registry.gauge("service_in_progress", "Service requests being handled",
+                   lambda: hotel.dispatcher.stats()["in_progress"] + hotel.dispatcher.stats()["assigned"])
+    for name in ("hits", "misses", "evictions", "invalidations", "entries", "bytes"):
+        registry.gauge(f"search_cache_{name}", f"Room search cache {name}",
+                       lambda name=name: hotel.search_cache.stats()[name])
+    for name in ("pending", "settled", "failed", "retried"):
+        registry.gauge(f"payments_{name}", f"Payment settlement {name}",
+                       lambda name=name: hotel.settlement.stats()[name])
+    registry.gauge("waitlist_waiting", "Guests waiting for a room", lambda: len(hotel.waitlist))
+    registry.gauge("waitlist_offered", "Rooms offered from the waitlist", lambda: hotel.waitlist.offered)
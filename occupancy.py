@@ -0,0 +1,204 @@
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+
+from hotel.room import _ordinal
+
+
+class OccupancyMatrix:
+    """
+    Dense rooms x calendar-days occupancy grid for bulk availability queries.
+
+    Each row is a room and each column a night; a True cell means the night is
+    booked. The calendar is a ring buffer: advancing the window clears the
+    nights that fall off the front and reuses their columns for the new end,
+    refilled from the rooms' stays, so rolling forward never reallocates the
+    grid. The matrix listens to its rooms, so reservations, releases and
+    rooms going out of service are reflected as they happen. Queries must
+    fall inside the window; stays are clipped to it.
+    """
+    def __init__(self, rooms, start_date, days=730):
+        """
+        Initialize the occupancy matrix.
+        :param rooms: list, Room objects to track
+        :param start_date: date, first night of the calendar window
+        :param days: int, number of nights covered by the window
+        """
+        rooms = list(rooms)
+        self._days = days
+        self._origin = _ordinal(start_date)
+        self._head = 0
+        self._lock = threading.Lock()
+        self._rooms = rooms
+        self._grid = np.zeros((len(rooms), days), dtype=bool)
+        self._room_numbers = np.array([room.room_number for room in rooms])
+        self._rows = {room.room_number: row for row, room in enumerate(rooms)}
+        self._in_service = np.array([room.is_available for room in rooms], dtype=bool)
+        self._type_names = sorted({room.__class__.__name__ for room in rooms})
+        type_codes = {name: code for code, name in enumerate(self._type_names)}
+        self._types = np.array([type_codes[room.__class__.__name__] for room in rooms], dtype=np.int16)
+        for room in rooms:
+            room.add_listener(self._on_room_changed)
+
+    @classmethod
+    def from_rooms(cls, rooms, start_date, days=730):
+        """
+        Build a matrix pre-filled with the stays already held by each room.
+        :param rooms: list, Room objects to track
+        :param start_date: date, first night of the calendar window
+        :param days: int, number of nights covered by the window
+        :return: OccupancyMatrix
+        """
+        matrix = cls(rooms, start_date, days)
+        with matrix._lock:
+            matrix._fill(matrix._origin, matrix._origin + days)
+        return matrix
+
+    def close(self):
+        """
+        Stop following the rooms' changes.
+        """
+        for room in self._rooms:
+            room.remove_listener(self._on_room_changed)
+
+    def _on_room_changed(self, room, field, old_value):
+        """
+        Keep the grid in sync with a room's reservations, releases and service status.
+        """
+        row = self._rows.get(room.room_number)
+        if row is None:
+            return
+        if field == "stays":
+            start, end, delta = old_value
+            with self._lock:
+                self._grid[row, self._columns(start, end, clip=True)] = delta > 0
+        elif field == "is_available":
+            self._in_service[row] = room.is_available
+
+    def _fill(self, start, end):
+        """
+        Copy the rooms' stays over a night range of the window into the grid (call with the lock held).
+        """
+        columns = self._columns(start, end, clip=True)
+        for row, room in enumerate(self._rooms):
+            self._grid[row, columns] = True
+            for free_start, free_end in room.stays.free_ranges(start, end):
+                self._grid[row, self._columns(free_start, free_end, clip=True)] = False
+
+    @property
+    def start_date(self):
+        return date.fromordinal(self._origin)
+
+    @property
+    def end_date(self):
+        return date.fromordinal(self._origin + self._days)
+
+    @property
+    def room_numbers(self):
+        return self._room_numbers
+
+    def _columns(self, check_in, check_out, clip=False):
+        """
+        Map a night range onto ring-buffer column indices.
+        :param clip: bool, clip the range to the window instead of rejecting it
+        :return: numpy array, column indices in night order
+        :raises ValueError: if the range is not inside the window and clip is False
+        """
+        start = _ordinal(check_in) - self._origin
+        end = _ordinal(check_out) - self._origin
+        if not clip and (start < 0 or end > self._days):
+            raise ValueError(f"{date.fromordinal(start + self._origin)} to {date.fromordinal(end + self._origin)} "
+                             f"is outside the calendar window {self.start_date} to {self.end_date}")
+        start, end = max(start, 0), min(end, self._days)
+        if end <= start:
+            return np.empty(0, dtype=np.intp)
+        return (np.arange(start, end) + self._head) % self._days
+
+    def _type_mask(self, room_type):
+        """
+        Build a row mask selecting one room class, or every room if None.
+        """
+        if room_type is None:
+            return np.ones(len(self._types), dtype=bool)
+        name = room_type if isinstance(room_type, str) else room_type.__name__
+        if name not in self._type_names:
+            return np.zeros(len(self._types), dtype=bool)
+        return self._types == self._type_names.index(name)
+
+    def add_stay(self, room_number, check_in, check_out):
+        """
+        Mark a room as booked for a night range (the part inside the window).
+        """
+        with self._lock:
+            self._grid[self._rows[room_number], self._columns(check_in, check_out, clip=True)] = True
+
+    def remove_stay(self, room_number, check_in, check_out):
+        """
+        Mark a room as free again for a night range (the part inside the window).
+        """
+        with self._lock:
+            self._grid[self._rows[room_number], self._columns(check_in, check_out, clip=True)] = False
+
+    def add_booking(self, booking):
+        """
+        Record a Booking in the matrix.
+        :param booking: Booking object
+        """
+        self.add_stay(booking.room.room_number, booking.check_in_date, booking.check_out_date)
+
+    def advance(self, new_start_date):
+        """
+        Roll the calendar window forward, reusing the nights that drop off for the rooms' later stays.
+        :param new_start_date: date, new first night of the window
+        """
+        shift = _ordinal(new_start_date) - self._origin
+        if shift < 0:
+            raise ValueError("The calendar window can only move forward")
+        with self._lock:
+            old_end = self._origin + self._days
+            self._head = (self._head + min(shift, self._days)) % self._days
+            self._origin += shift
+            self._fill(max(old_end, self._origin), self._origin + self._days)
+
+    def free_rooms(self, check_in, check_out, room_type=None):
+        """
+        Find the rooms free for every night of a range.
+        :param check_in: date, check-in date
+        :param check_out: date, check-out date (exclusive)
+        :param room_type: class or str, restrict to one room class (e.g. DoubleRoom)
+        :return: numpy array, room numbers of the free rooms that are in service
+        :raises ValueError: if the range is not inside the calendar window
+        """
+        booked = self._grid[:, self._columns(check_in, check_out)].any(axis=1)
+        return self._room_numbers[~booked & self._in_service & self._type_mask(room_type)]
+
+    def free_count_per_night(self, start_date=None, nights=365, room_type=None):
+        """
+        Count the free rooms for each night of a range.
+        :param start_date: date, first night to report (defaults to the window start)
+        :param nights: int, number of nights to report
+        :param room_type: class or str, restrict to one room class
+        :return: numpy array, free room count per night among the rooms in service
+        :raises ValueError: if the range is not inside the calendar window
+        """
+        start = self._origin if start_date is None else _ordinal(start_date)
+        columns = self._columns(start, start + nights)
+        rows = self._type_mask(room_type) & self._in_service
+        return rows.sum() - self._grid[np.ix_(rows, columns)].sum(axis=0)
+
+    def occupancy_rate(self, check_in, check_out):
+        """
+        Compute the share of booked room-nights over a range.
+        :return: float, occupancy between 0 and 1
+        :raises ValueError: if the range is not inside the calendar window
+        """
+        cells = self._grid[:, self._columns(check_in, check_out)]
+        return float(cells.mean()) if cells.size else 0.0
+
+    def dates(self, start_date=None, nights=365):
+        """
+        List the calendar dates matching a free_count_per_night result.
+        """
+        start = date.fromordinal(self._origin if start_date is None else _ordinal(start_date))
+        return [start + timedelta(days=offset) for offset in range(nights)]
@@ -0,0 +1,230 @@
+import threading
+from bisect import bisect_right
+from datetime import date
+
+from hotel.room import _ordinal
+
+
+BLOCK_NIGHTS = 32
+
+
+class PricingEngine:
+    """
+    Per-night dynamic pricing from weekend, season and occupancy rules.
+
+    Each room class has a rate calendar of price multipliers, computed in
+    blocks of BLOCK_NIGHTS nights and cached. A rule change drops only the
+    blocks it can affect, and the live per-night occupancy count (fed by
+    the rooms' stay notifications) drops a block only when a night crosses
+    an occupancy surcharge threshold. A room's nightly price is its
+    price_per_night times the multiplier for its class and night.
+    """
+    def __init__(self, rooms, weekend_multiplier=1.0, weekend_nights=(4, 5), occupancy_surcharges=()):
+        """
+        Initialize the pricing engine.
+        :param rooms: list, Room objects whose bookings drive occupancy
+        :param weekend_multiplier: float, multiplier for weekend nights
+        :param weekend_nights: tuple, weekday numbers (Monday=0) of weekend nights
+        :param occupancy_surcharges: iterable, (occupancy threshold, multiplier) pairs
+        """
+        self._lock = threading.RLock()
+        self._weekend_multiplier = weekend_multiplier
+        self._weekend_nights = frozenset(weekend_nights)
+        self._seasons = {}
+        self._next_season_id = 1
+        self._thresholds, self._surcharges = [], []
+        self._room_counts = {}
+        self._booked = {}
+        self._calendars = {}
+        self._rules_version = 0
+        self.set_occupancy_surcharges(occupancy_surcharges)
+        for room in rooms:
+            self.add_room(room)
+
+    def add_room(self, room):
+        """
+        Start tracking a room's class size and bookings.
+        """
+        with self._lock:
+            room_type = room.__class__.__name__
+            self._room_counts[room_type] = self._room_counts.get(room_type, 0) + 1
+            booked = self._booked.setdefault(room_type, {})
+            for start, end, _ in room.stays:
+                for night in range(start, end):
+                    booked[night] = booked.get(night, 0) + 1
+            self._invalidate(room_type)
+        room.add_listener(self._on_room_changed)
+
+    @property
+    def rules_version(self):
+        """
+        Counter bumped whenever a pricing rule (or the set of rooms) changes.
+        """
+        return self._rules_version
+
+    # Rules
+
+    def set_weekend_multiplier(self, multiplier, weekend_nights=None):
+        """
+        Change the weekend rule.
+        :param multiplier: float, multiplier for weekend nights
+        :param weekend_nights: tuple, weekday numbers (Monday=0) of weekend nights
+        """
+        with self._lock:
+            self._weekend_multiplier = multiplier
+            if weekend_nights is not None:
+                self._weekend_nights = frozenset(weekend_nights)
+            self._invalidate()
+
+    def add_season(self, start_date, end_date, multiplier, room_types=None):
+        """
+        Add a seasonal multiplier over [start_date, end_date).
+        :param room_types: iterable, room class names the season applies to (None for all)
+        :return: int, season ID usable with remove_season
+        """
+        with self._lock:
+            season_id = self._next_season_id
+            self._next_season_id += 1
+            types = frozenset(room_types) if room_types is not None else None
+            self._seasons[season_id] = (_ordinal(start_date), _ordinal(end_date), multiplier, types)
+            self._invalidate_season(self._seasons[season_id])
+            return season_id
+
+    def remove_season(self, season_id):
+        """
+        Remove a season added with add_season.
+        """
+        with self._lock:
+            self._invalidate_season(self._seasons.pop(season_id))
+
+    def set_occupancy_surcharges(self, surcharges):
+        """
+        Replace the occupancy surcharge ladder.
+        :param surcharges: iterable, (occupancy threshold, multiplier) pairs; the highest threshold
+                           reached by a night's occupancy for a room class applies
+        """
+        with self._lock:
+            ladder = sorted(surcharges)
+            self._thresholds = [threshold for threshold, _ in ladder]
+            self._surcharges = [1.0] + [multiplier for _, multiplier in ladder]
+            self._invalidate()
+
+    # Cache maintenance
+
+    def _invalidate(self, room_type=None):
+        self._rules_version += 1
+        if room_type is None:
+            self._calendars.clear()
+        else:
+            for key in [key for key in self._calendars if key[0] == room_type]:
+                del self._calendars[key]
+
+    def _invalidate_season(self, season):
+        self._rules_version += 1
+        start, end, _, types = season
+        for key in [key for key in self._calendars
+                    if (types is None or key[0] in types)
+                    and key[1] * BLOCK_NIGHTS < end and start < (key[1] + 1) * BLOCK_NIGHTS]:
+            del self._calendars[key]
+
+    def _level(self, room_type, booked):
+        return bisect_right(self._thresholds, booked / self._room_counts[room_type])
+
+    def _on_room_changed(self, room, field, old_value):
+        """
+        Update live occupancy and drop calendar blocks whose surcharge level changed.
+        """
+        if field != "stays":
+            return
+        start, end, delta = old_value
+        room_type = room.__class__.__name__
+        with self._lock:
+            booked = self._booked[room_type]
+            for night in range(start, end):
+                before = booked.get(night, 0)
+                booked[night] = before + delta
+                if self._thresholds and self._level(room_type, before) != self._level(room_type, before + delta):
+                    self._calendars.pop((room_type, night // BLOCK_NIGHTS), None)
+
+    def _block(self, room_type, block):
+        """
+        Get (computing and caching if needed) one block of a rate calendar.
+        """
+        key = (room_type, block)
+        calendar = self._calendars.get(key)
+        if calendar is None:
+            with self._lock:
+                booked = self._booked.get(room_type, {})
+                first = block * BLOCK_NIGHTS
+                seasons = [season for season in self._seasons.values()
+                           if (season[3] is None or room_type in season[3])
+                           and season[0] < first + BLOCK_NIGHTS and first < season[1]]
+                calendar = []
+                for night in range(first, first + BLOCK_NIGHTS):
+                    multiplier = 1.0
+                    # Ordinal 1 (0001-01-01) was a Monday, so weekday() == (ordinal - 1) % 7.
+                    if (night - 1) % 7 in self._weekend_nights:
+                        multiplier *= self._weekend_multiplier
+                    for start, end, season_multiplier, _ in seasons:
+                        if start <= night < end:
+                            multiplier *= season_multiplier
+                    if self._thresholds and room_type in self._room_counts:
+                        multiplier *= self._surcharges[self._level(room_type, booked.get(night, 0))]
+                    calendar.append(multiplier)
+                self._calendars[key] = calendar
+        return calendar
+
+    # Queries
+
+    def rate_calendar(self, room_type, start_date, nights):
+        """
+        List the price multipliers of a room class for consecutive nights.
+        :param room_type: class or str, room class
+        :param start_date: date, first night
+        :param nights: int, number of nights
+        :return: list, multipliers
+        """
+        name = room_type if isinstance(room_type, str) else room_type.__name__
+        start = _ordinal(start_date)
+        multipliers = []
+        night, end = start, start + nights
+        while night < end:
+            block, offset = divmod(night, BLOCK_NIGHTS)
+            take = min(BLOCK_NIGHTS - offset, end - night)
+            multipliers.extend(self._block(name, block)[offset:offset + take])
+            night += take
+        return multipliers
+
+    def nightly_rates(self, room, check_in, check_out):
+        """
+        List a room's price for every night of a stay.
+        :return: list, (date, price) pairs
+        """
+        start = _ordinal(check_in)
+        multipliers = self.rate_calendar(room.__class__, start, _ordinal(check_out) - start)
+        return [(date.fromordinal(start + i), round(room.price_per_night * m, 2)) for i, m in enumerate(multipliers)]
+
+    def quote(self, room, check_in, check_out):
+        """
+        Price a stay in one room.
+        :return: float, total price of the stay
+        """
+        start = _ordinal(check_in)
+        return round(room.price_per_night * sum(self.rate_calendar(room.__class__, start, _ordinal(check_out) - start)), 2)
+
+    def quote_many(self, rooms, check_in, check_out):
+        """
+        Price the same stay across many rooms; each room class's calendar is summed once.
+        :return: dict, room number -> total price
+        """
+        start = _ordinal(check_in)
+        nights = _ordinal(check_out) - start
+        factors = {}
+        quotes = {}
+        for room in rooms:
+            room_type = room.__class__
+            factor = factors.get(room_type)
+            if factor is None:
+                factor = factors[room_type] = sum(self.rate_calendar(room_type, start, nights))
+            quotes[room.room_number] = round(room.price_per_night * factor, 2)
+        return quotes
@@ -0,0 +1,252 @@
+import heapq
+import os
+import pickle
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+
+from hotel.inventory import InventoryIndex
+from hotel.pricing import PricingEngine
+
+
+Offer = namedtuple("Offer", ["price", "property_id", "room_number", "room_type"])
+
+
+class Property:
+    """
+    One hotel of the group: its rooms, their stays, a search index and a pricing engine.
+
+    Only the rooms and pricing settings are pickled; the index and engine
+    are rebuilt on load, so a property can be shipped to a worker process.
+    """
+    def __init__(self, property_id, rooms, name=None, weekend_multiplier=1.0, occupancy_surcharges=()):
+        """
+        Initialize a property.
+        :param property_id: str, unique property identifier
+        :param rooms: list, Room objects (room numbers are unique within the property only)
+        :param name: str, display name
+        :param weekend_multiplier: float, passed to the property's PricingEngine
+        :param occupancy_surcharges: iterable, passed to the property's PricingEngine
+        """
+        self.property_id = property_id
+        self.name = name or property_id
+        self.rooms = list(rooms)
+        self.weekend_multiplier = weekend_multiplier
+        self.occupancy_surcharges = tuple(occupancy_surcharges)
+        self.inventory = InventoryIndex(self.rooms)
+        self.pricing = PricingEngine(self.rooms, weekend_multiplier=weekend_multiplier,
+                                     occupancy_surcharges=occupancy_surcharges)
+
+    def __getstate__(self):
+        return {"property_id": self.property_id, "rooms": self.rooms, "name": self.name,
+                "weekend_multiplier": self.weekend_multiplier, "occupancy_surcharges": self.occupancy_surcharges}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def search(self, check_in, check_out, room_type=None, min_price=None, max_price=None, amenities=(), limit=10):
+        """
+        Find the cheapest free rooms for a stay.
+        :return: list, up to ``limit`` Offer tuples, cheapest first
+        """
+        rooms = self.inventory.find(room_type, min_price, max_price, amenities, check_in, check_out)
+        quotes = self.pricing.quote_many(rooms, check_in, check_out)
+        return heapq.nsmallest(limit, (Offer(quotes[room.room_number], self.property_id, room.room_number,
+                                             room.__class__.__name__) for room in rooms))
+
+    def free_rooms(self, check_in, check_out, room_type=None):
+        """
+        Count the rooms free for every night of a stay.
+        :return: int, number of rooms
+        """
+        return len(self.inventory.find(room_type, check_in=check_in, check_out=check_out))
+
+    def reserve(self, room_number, check_in, check_out, booking_id=None):
+        """
+        Reserve a stay in one of the property's rooms.
+        :raises ValueError: if the room is unknown or not free
+        """
+        room = self.inventory.get(room_number)
+        if room is None:
+            raise ValueError(f"Unknown room {room_number} at {self.property_id}")
+        if not room.is_available_for(check_in, check_out):
+            raise ValueError(f"Room {room_number} at {self.property_id} is not available "
+                             f"from {check_in} to {check_out}")
+        room.reserve(check_in, check_out, booking_id)
+
+    def release(self, room_number, check_in, check_out):
+        """
+        Free a reserved stay.
+        :raises ValueError: if the room is unknown or has no such stay
+        """
+        room = self.inventory.get(room_number)
+        if room is None:
+            raise ValueError(f"Unknown room {room_number} at {self.property_id}")
+        room.release(check_in, check_out)
+
+
+# Shard held by this worker process: property ID -> Property.
+_shard = {}
+
+
+def _load_shard(properties):
+    _shard.clear()
+    _shard.update((prop.property_id, prop) for prop in properties)
+
+
+def _search_shard(shard, query, limit):
+    offers = [prop.search(*query, limit=limit) for prop in shard.values()]
+    return list(islice(heapq.merge(*offers), limit))
+
+
+def _availability_shard(shard, query):
+    return {property_id: prop.free_rooms(*query) for property_id, prop in shard.items()}
+
+
+def _call_property(shard, property_id, method, args):
+    return getattr(shard[property_id], method)(*args)
+
+
+def _export_property(shard, property_id):
+    return shard[property_id]
+
+
+def _in_worker(func, *args):
+    return func(_shard, *args)
+
+
+class PropertyGroup:
+    """
+    Inventory of many properties, partitioned into shards held by worker processes.
+
+    Properties are spread over the shards by room count. Every shard lives in
+    its own single-process executor, so its rooms and stays stay resident in
+    that worker and each request for a property is routed to the one process
+    that owns it. Group-wide searches fan out to every shard at once, each
+    shard returns its own top k offers by price, and the parent merges them,
+    so searches scale with cores instead of queuing on one interpreter's GIL.
+
+    Reservations made through the group change only the worker's copy of a
+    property; nothing is persisted. Callers that need to keep them save the
+    property returned by export(), e.g. after the day's bookings.
+    """
+    def __init__(self, properties, workers=None):
+        """
+        Partition the properties and start the shard workers.
+        :param properties: iterable, Property objects
+        :param workers: int, number of shard processes (defaults to the CPU count); 0 keeps every
+                        shard in this process
+        """
+        properties = sorted(properties, key=lambda prop: len(prop.rooms), reverse=True)
+        count = max(1, min(len(properties), (os.cpu_count() or 1) if workers is None else workers))
+        shards, sizes = [[] for _ in range(count)], [0] * count
+        self._owners = {}
+        for prop in properties:
+            if prop.property_id in self._owners:
+                raise ValueError(f"Property {prop.property_id} is listed twice")
+            # Largest first onto the lightest shard keeps the shards within one property of each other.
+            index = sizes.index(min(sizes))
+            shards[index].append(prop)
+            sizes[index] += len(prop.rooms)
+            self._owners[prop.property_id] = index
+        self._local = workers == 0
+        if self._local:
+            self._shards = [{prop.property_id: prop for prop in shard} for shard in shards]
+        else:
+            self._shards = [ProcessPoolExecutor(1, initializer=_load_shard, initargs=(shard,)) for shard in shards]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._owners)
+
+    def close(self):
+        """
+        Stop the shard workers.
+        """
+        if not self._local:
+            for shard in self._shards:
+                shard.shutdown()
+
+    @property
+    def property_ids(self):
+        return sorted(self._owners)
+
+    def _submit(self, shard, func, *args):
+        """
+        Run func(shard properties, *args) where the shard lives.
+        :return: Future
+        """
+        if not self._local:
+            return shard.submit(_in_worker, func, *args)
+        future = Future()
+        try:
+            future.set_result(func(shard, *args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _call(self, property_id, method, *args):
+        index = self._owners.get(property_id)
+        if index is None:
+            raise ValueError(f"Unknown property: {property_id}")
+        return self._submit(self._shards[index], _call_property, property_id, method, args).result()
+
+    def search(self, check_in, check_out, room_type=None, min_price=None, max_price=None, amenities=(), limit=10):
+        """
+        Find the cheapest free rooms for a stay across every property.
+        :param check_in: date, check-in date
+        :param check_out: date, check-out date (exclusive)
+        :param room_type: str, optional room class name filter
+        :param min_price: float, optional lower bound on the nightly base price
+        :param max_price: float, optional upper bound on the nightly base price
+        :param amenities: iterable, amenities every room must have
+        :param limit: int, number of offers returned
+        :return: list, Offer tuples, cheapest first
+        """
+        query = (check_in, check_out, room_type, min_price, max_price, tuple(amenities))
+        futures = [self._submit(shard, _search_shard, query, limit) for shard in self._shards]
+        return list(islice(heapq.merge(*(future.result() for future in futures)), limit))
+
+    def availability(self, check_in, check_out, room_type=None):
+        """
+        Count the free rooms for a stay at every property.
+        :return: dict, property ID -> number of free rooms
+        """
+        futures = [self._submit(shard, _availability_shard, (check_in, check_out, room_type))
+                   for shard in self._shards]
+        counts = {}
+        for future in futures:
+            counts.update(future.result())
+        return counts
+
+    def export(self, property_id):
+        """
+        Fetch the current state of a property, stays included, from the worker owning it.
+        :return: Property object, a copy detached from the worker
+        :raises ValueError: if the property is unknown
+        """
+        index = self._owners.get(property_id)
+        if index is None:
+            raise ValueError(f"Unknown property: {property_id}")
+        prop = self._submit(self._shards[index], _export_property, property_id).result()
+        # In-process shards hand back the live object; copy it so callers get a snapshot either way.
+        return pickle.loads(pickle.dumps(prop)) if self._local else prop
+
+    def reserve(self, property_id, room_number, check_in, check_out, booking_id=None):
+        """
+        Reserve a stay in the worker owning the property.
+        :raises ValueError: if the property or room is unknown or the room is not free
+        """
+        self._call(property_id, "reserve", room_number, check_in, check_out, booking_id)
+
+    def release(self, property_id, room_number, check_in, check_out):
+        """
+        Free a reserved stay in the worker owning the property.
+        :raises ValueError: if the property or room is unknown or has no such stay
+        """
+        self._call(property_id, "release", room_number, check_in, check_out)
@@ -0,0 +1,139 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from hotel.room import _ordinal
+from hotel.booking_store import PAYMENT_TYPES
+
+
+class BookingColumns:
+    """
+    Bookings loaded as NumPy columns for vectorized reporting.
+
+    Columns: room number, room type code, check-in and check-out ordinals,
+    nightly rate and payment type code. Type and payment codes index into
+    ``room_type_names`` and ``payment_type_names``.
+    """
+    def __init__(self, room_numbers, room_types, check_ins, check_outs, rates, payment_types,
+                 room_type_names, payment_type_names=PAYMENT_TYPES):
+        self.room_numbers = np.asarray(room_numbers, dtype=np.int64)
+        self.room_types = np.asarray(room_types, dtype=np.int64)
+        self.check_ins = np.asarray(check_ins, dtype=np.int64)
+        self.check_outs = np.asarray(check_outs, dtype=np.int64)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        self.payment_types = np.asarray(payment_types, dtype=np.int64)
+        self.room_type_names = list(room_type_names)
+        self.payment_type_names = list(payment_type_names)
+
+    def __len__(self):
+        return len(self.room_numbers)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build columns from (room_number, room_type, check_in, check_out, rate, payment_type) rows.
+        Dates may be date objects or ordinals; type names are strings (payment type may be None).
+        """
+        type_codes, payment_codes = {}, {name: code for code, name in enumerate(PAYMENT_TYPES)}
+        columns = ([], [], [], [], [], [])
+        for room_number, room_type, check_in, check_out, rate, payment_type in rows:
+            columns[0].append(room_number)
+            columns[1].append(type_codes.setdefault(room_type, len(type_codes)))
+            columns[2].append(_ordinal(check_in))
+            columns[3].append(_ordinal(check_out))
+            columns[4].append(rate)
+            columns[5].append(payment_codes.setdefault(payment_type or "", len(payment_codes)))
+        payment_names = sorted(payment_codes, key=payment_codes.get)
+        return cls(*columns, room_type_names=list(type_codes), payment_type_names=payment_names)
+
+    @classmethod
+    def from_bookings(cls, bookings):
+        """
+        Build columns from Booking objects; the nightly rate comes from the invoice when there is one.
+        """
+        def rows():
+            for booking in bookings:
+                nights = (booking.check_out_date - booking.check_in_date).days
+                invoice = booking.invoice
+                rate = invoice["total"] / nights if invoice else booking.room.price_per_night
+                payment = booking.payment
+                yield (booking.room.room_number, booking.room.__class__.__name__, booking.check_in_date,
+                       booking.check_out_date, rate, payment.__class__.__name__ if payment else None)
+        return cls.from_rows(rows())
+
+    @classmethod
+    def from_store(cls, store):
+        """
+        Wrap the arrays of a BookingStore without copying them.
+        """
+        def view(column, dtype):
+            return np.frombuffer(column, dtype=dtype) if len(column) else np.empty(0, dtype=dtype)
+        return cls(view(store.room_numbers, np.dtype("l")), view(store.room_types, np.int8),
+                   view(store.check_ins, np.dtype("l")), view(store.check_outs, np.dtype("l")),
+                   view(store.rates, np.float64), view(store.payment_types, np.int8),
+                   store.room_type_names, store.payment_type_names)
+
+
+def _nights_in_range(columns, start, end):
+    """
+    Number of nights of each stay falling inside [start, end).
+    """
+    return np.clip(np.minimum(columns.check_outs, end) - np.maximum(columns.check_ins, start), 0, None)
+
+
+def daily_occupancy(columns, start_date, end_date, room_count):
+    """
+    Spread every stay across its nights and total them per night.
+    :param columns: BookingColumns
+    :param start_date: date, first night reported
+    :param end_date: date, end of the range (exclusive)
+    :param room_count: int, rooms in inventory
+    :return: dict, per-night numpy arrays "rooms_sold", "revenue" and "occupancy", plus "dates"
+    """
+    start, end = _ordinal(start_date), _ordinal(end_date)
+    days = end - start
+    # Difference arrays: +1 (and +rate) on the first night, -1 after the last, then a running sum.
+    first = np.clip(columns.check_ins - start, 0, days)
+    last = np.clip(columns.check_outs - start, 0, days)
+    sold = np.bincount(first, minlength=days + 1) - np.bincount(last, minlength=days + 1)
+    revenue = (np.bincount(first, weights=columns.rates, minlength=days + 1)
+               - np.bincount(last, weights=columns.rates, minlength=days + 1))
+    rooms_sold = np.cumsum(sold)[:days]
+    return {
+        "dates": [date.fromordinal(start) + timedelta(days=offset) for offset in range(days)],
+        "rooms_sold": rooms_sold,
+        "revenue": np.cumsum(revenue)[:days],
+        "occupancy": rooms_sold / room_count if room_count else np.zeros(days),
+    }
+
+
+def revenue_summary(columns, start_date, end_date, room_count):
+    """
+    Compute occupancy, ADR, RevPAR and revenue breakdowns for a date range.
+    :param columns: BookingColumns
+    :param start_date: date, first night included
+    :param end_date: date, end of the range (exclusive)
+    :param room_count: int, rooms in inventory
+    :return: dict, report figures
+    """
+    start, end = _ordinal(start_date), _ordinal(end_date)
+    nights = _nights_in_range(columns, start, end)
+    revenue = nights * columns.rates
+    room_nights_sold = int(nights.sum())
+    total_revenue = float(revenue.sum())
+    available = room_count * max(end - start, 0)
+    by_type = np.bincount(columns.room_types, weights=revenue, minlength=len(columns.room_type_names))
+    by_payment = np.bincount(columns.payment_types, weights=revenue, minlength=len(columns.payment_type_names))
+    return {
+        "start": date.fromordinal(start),
+        "end": date.fromordinal(end),
+        "room_nights_sold": room_nights_sold,
+        "room_nights_available": available,
+        "occupancy": room_nights_sold / available if available else 0.0,
+        "revenue": total_revenue,
+        "adr": total_revenue / room_nights_sold if room_nights_sold else 0.0,
+        "revpar": total_revenue / available if available else 0.0,
+        "revenue_by_room_type": {name: float(by_type[code]) for code, name in enumerate(columns.room_type_names)},
+        "revenue_by_payment_method": {name or "Unpaid": float(by_payment[code])
+                                      for code, name in enumerate(columns.payment_type_names) if by_payment[code]},
+    }
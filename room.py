@@ -1,19 +1,187 @@
+import sys
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+
+def _ordinal(day):
+    """
+    Convert a date (or an ordinal already) to its proleptic Gregorian ordinal.
+    """
+    return day if isinstance(day, int) else day.toordinal()
+
+
+_AMENITY_SETS = {}
+
+
+def shared_amenities(amenities):
+    """
+    Return the interned, shared tuple for a list of amenities.
+
+    Rooms with identical amenities (every SingleRoom, DoubleRoom or Suite)
+    then point at one tuple of interned strings instead of a list each.
+    """
+    key = tuple(sys.intern(amenity) for amenity in amenities)
+    return _AMENITY_SETS.setdefault(key, key)
+
+
+class StayIndex:
+    """
+    Interval index over the booked stays of a single room.
+
+    Stays are half-open night ranges [check_in, check_out) stored as parallel
+    sorted arrays of start and end ordinals. Stays in one room never overlap,
+    so both arrays are sorted in the same order and every query is a bisect.
+    """
+    __slots__ = ("_starts", "_ends", "_booking_ids")
+
+    def __init__(self):
+        """
+        Initialize an empty stay index.
+        """
+        self._starts = []
+        self._ends = []
+        self._booking_ids = []
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        """
+        Iterate over (check_in, check_out, booking_id) ordinal triples in stay order.
+        """
+        return iter(zip(self._starts, self._ends, self._booking_ids))
+
+    def overlaps(self, check_in, check_out):
+        """
+        Check whether any booked stay overlaps the given range.
+        :param check_in: date or int ordinal, first night of the range
+        :param check_out: date or int ordinal, departure day (exclusive)
+        :return: bool, True if the range collides with an existing stay
+        """
+        start, end = _ordinal(check_in), _ordinal(check_out)
+        # The only candidate is the last stay starting before our range ends.
+        i = bisect_left(self._starts, end) - 1
+        return i >= 0 and self._ends[i] > start
+
+    def free_gap(self, check_in, check_out):
+        """
+        Find the booked stays enclosing a free range.
+        :param check_in: date or int ordinal, first night of the range
+        :param check_out: date or int ordinal, departure day (exclusive)
+        :return: tuple, (end of the previous stay, start of the next stay) ordinals, None where there is none
+        """
+        end = _ordinal(check_out)
+        i = bisect_left(self._starts, end)
+        return (self._ends[i - 1] if i else None), (self._starts[i] if i < len(self._starts) else None)
+
+    def add(self, check_in, check_out, booking_id=None):
+        """
+        Insert a stay into the index.
+        :param check_in: date or int ordinal, first night of the stay
+        :param check_out: date or int ordinal, departure day (exclusive)
+        :param booking_id: str, booking the stay belongs to
+        """
+        start, end = _ordinal(check_in), _ordinal(check_out)
+        if end <= start:
+            raise ValueError("Check-out date must be after check-in date")
+        if self.overlaps(start, end):
+            raise ValueError("Room is already booked for the selected dates")
+        i = bisect_left(self._starts, start)
+        # Grow ends before starts (and shrink starts first on removal) so a
+        # lock-free reader indexing ends by a position found in starts never
+        # runs off the end; torn values are caught by the room version check.
+        self._ends.insert(i, end)
+        self._booking_ids.insert(i, booking_id)
+        self._starts.insert(i, start)
+
+    def remove(self, check_in, check_out):
+        """
+        Remove a stay from the index.
+        :param check_in: date or int ordinal, first night of the stay
+        :param check_out: date or int ordinal, departure day (exclusive)
+        """
+        start, end = _ordinal(check_in), _ordinal(check_out)
+        i = bisect_left(self._starts, start)
+        if i == len(self._starts) or self._starts[i] != start or self._ends[i] != end:
+            raise ValueError("No such stay in this room")
+        del self._starts[i]
+        del self._booking_ids[i]
+        del self._ends[i]
+
+    def free_ranges(self, window_start, window_end):
+        """
+        Compute the free night ranges inside a window.
+        :param window_start: date or int ordinal, start of the window
+        :param window_end: date or int ordinal, end of the window (exclusive)
+        :return: list, (start, end) ordinal pairs of unbooked ranges
+        """
+        start, end = _ordinal(window_start), _ordinal(window_end)
+        free = []
+        cursor = start
+        # First stay that ends after the window opens.
+        i = bisect_right(self._ends, start)
+        while i < len(self._starts) and self._starts[i] < end:
+            if self._starts[i] > cursor:
+                free.append((cursor, self._starts[i]))
+            cursor = max(cursor, self._ends[i])
+            i += 1
+        if cursor < end:
+            free.append((cursor, end))
+        return free
+
+
 class Room:
     """
     Abstract base class for hotel rooms.
     """
+    __slots__ = ("_room_number", "_price_per_night", "_amenities", "_is_available",
+                 "_stays", "_version", "_listeners")
+
     def __init__(self, room_number, price_per_night, amenities, is_available=True):
         """
         Initialize a room.
         :param room_number: int, unique room number
         :param price_per_night: float, price per night for the room
-        :param amenities: list, available amenities in the room
-        :param is_available: bool, room availability status
+        :param amenities: list, available amenities in the room (stored as a shared tuple)
+        :param is_available: bool, whether the room is in service at all
         """
         self._room_number = room_number
         self._price_per_night = price_per_night
-        self._amenities = amenities
+        self._amenities = shared_amenities(amenities)
         self._is_available = is_available
+        self._stays = StayIndex()
+        self._version = 0
+        self._listeners = ()
+
+    def __getstate__(self):
+        # Listeners belong to in-process indexes; they are not part of the room.
+        state = {name: getattr(self, name) for name in Room.__slots__}
+        state["_listeners"] = ()
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._amenities = shared_amenities(self._amenities)
+
+    def add_listener(self, listener):
+        """
+        Register a callback run after the room changes.
+        :param listener: callable, called as listener(room, field, old_value); for
+                         "stays" changes old_value is (start, end, delta): the ordinal
+                         range touched and +1 for a reservation or -1 for a release
+        """
+        self._listeners += (listener,)
+
+    def remove_listener(self, listener):
+        """
+        Unregister a callback added with add_listener.
+        """
+        self._listeners = tuple(l for l in self._listeners if l != listener)
+
+    def _notify(self, field, old_value):
+        for listener in self._listeners:
+            listener(self, field, old_value)
 
     @property
     def room_number(self):
@@ -25,7 +193,8 @@ class Room:
 
     @price_per_night.setter
     def price_per_night(self, value):
-        self._price_per_night = value
+        old_value, self._price_per_night = self._price_per_night, value
+        self._notify("price_per_night", old_value)
 
     @property
     def amenities(self):
@@ -33,7 +202,8 @@ class Room:
 
     @amenities.setter
     def amenities(self, value):
-        self._amenities = value
+        old_value, self._amenities = self._amenities, shared_amenities(value)
+        self._notify("amenities", old_value)
 
     @property
     def is_available(self):
@@ -41,13 +211,69 @@ class Room:
 
     @is_available.setter
     def is_available(self, value):
-        self._is_available = value
+        self.update_availability(value)
+
+    @property
+    def stays(self):
+        return self._stays
+
+    @property
+    def version(self):
+        # Sequence counter: odd while a stay is being written, even once the stay index is consistent.
+        return self._version
 
     def update_availability(self, status):
         """
         Update the room availability status.
         """
-        self._is_available = status
+        old_value, self._is_available = self._is_available, status
+        self._notify("is_available", old_value)
+
+    def is_available_for(self, check_in, check_out):
+        """
+        Check whether the room can be booked for a date range.
+        :param check_in: date, check-in date
+        :param check_out: date, check-out date (exclusive)
+        :return: bool, True if the room is in service and free for every night
+        """
+        return self._is_available and not self._stays.overlaps(check_in, check_out)
+
+    def reserve(self, check_in, check_out, booking_id=None):
+        """
+        Mark the room as booked for a date range.
+        :param check_in: date, check-in date
+        :param check_out: date, check-out date (exclusive)
+        :param booking_id: str, booking holding the stay
+        """
+        self._version += 1
+        try:
+            self._stays.add(check_in, check_out, booking_id)
+        finally:
+            self._version += 1
+        self._notify("stays", (_ordinal(check_in), _ordinal(check_out), 1))
+
+    def release(self, check_in, check_out):
+        """
+        Free a previously reserved date range.
+        :param check_in: date, check-in date
+        :param check_out: date, check-out date (exclusive)
+        """
+        self._version += 1
+        try:
+            self._stays.remove(check_in, check_out)
+        finally:
+            self._version += 1
+        self._notify("stays", (_ordinal(check_in), _ordinal(check_out), -1))
+
+    def free_ranges(self, window_start, window_end):
+        """
+        List the unbooked date ranges of the room inside a window.
+        :param window_start: date, start of the window
+        :param window_end: date, end of the window (exclusive)
+        :return: list, (start, end) date pairs of free ranges
+        """
+        return [(date.fromordinal(start), date.fromordinal(end))
+                for start, end in self._stays.free_ranges(window_start, window_end)]
 
     def __str__(self):
         """
@@ -55,14 +281,20 @@ class Room:
         """
         return f"Room {self._room_number} - ${self._price_per_night}/night, Available: {self._is_available}"
 class SingleRoom(Room):
+    __slots__ = ()
+
     def __init__(self, room_number):
         super().__init__(room_number, 100, ["WiFi", "TV", "Air Conditioning"])
 
 class DoubleRoom(Room):
+    __slots__ = ()
+
     def __init__(self, room_number):
         super().__init__(room_number, 150, ["WiFi", "TV", "Mini Fridge", "Air Conditioning"])
 
 class Suite(Room):
+    __slots__ = ()
+
     def __init__(self, room_number):
         super().__init__(room_number, 300, ["WiFi", "TV", "Mini Fridge", "Jacuzzi", "Living Area"])
 
@@ -70,6 +302,8 @@ class Booking:
     """
     Represents a hotel room booking.
     """
+    __slots__ = ("_guest", "_room", "_check_in_date", "_check_out_date", "_booking_id", "_payment", "_invoice")
+
     def __init__(self, guest, room, check_in_date, check_out_date, booking_id):
         """
         Initialize a new booking.
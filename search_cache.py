@@ -0,0 +1,187 @@
+import json
+import sys
+import threading
+from collections import OrderedDict
+
+from hotel.room import _ordinal
+
+
+# Night stamps kept before stamps no live entry can see are pruned.
+MIN_NIGHT_STAMPS = 65536
+
+
+def normalize_amenities(amenities):
+    """
+    Canonical form of a search's required amenities: trimmed, without blanks or repeats, sorted.
+    Search with the result, so the computed value matches the key it is cached under.
+    :return: tuple, amenity names
+    """
+    return tuple(sorted({amenity.strip() for amenity in amenities if amenity.strip()}))
+
+
+def search_key(check_in, check_out, room_type=None, min_price=None, max_price=None, amenities=()):
+    """
+    Normalize room search parameters into a hashable cache key.
+    :return: tuple, (check-in ordinal, check-out ordinal, room type, min price, max price, amenities)
+    """
+    return (_ordinal(check_in), _ordinal(check_out), room_type or None,
+            None if min_price is None else float(min_price), None if max_price is None else float(max_price),
+            normalize_amenities(amenities))
+
+
+def _size_of(value):
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    return len(json.dumps(value, default=str))
+
+
+class SearchCache:
+    """
+    LRU cache of room search results with generation-based invalidation.
+
+    Every change that can alter a search result stamps a generation from one
+    counter: a booking or release stamps each night it covers for its room
+    class, and a price, amenity or availability change stamps the room
+    class. An entry remembers the counter when it was computed and is served
+    only while nothing it depends on (its room class, or every class when it
+    did not filter by one, and each night of its stay) has a newer stamp.
+    A pricing rule change invalidates every entry. Entries are evicted least
+    recently used first once either the entry or the byte budget is full.
+    Night stamps no newer than every live entry can invalidate nothing, so
+    they are pruned once they pile up.
+    """
+    def __init__(self, rooms=(), pricing=None, max_entries=4096, max_bytes=16 * 1024 * 1024):
+        """
+        Initialize the cache.
+        :param rooms: iterable, Room objects whose changes invalidate entries
+        :param pricing: PricingEngine, whose rule changes invalidate every entry
+        :param max_entries: int, most entries kept
+        :param max_bytes: int, approximate memory budget for cached values
+        """
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._clock = 0
+        self._type_stamps = {}
+        self._night_stamps = {}
+        self._night_count = 0
+        self._prune_at = MIN_NIGHT_STAMPS
+        self._pricing = pricing
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        for room in rooms:
+            self.add_room(room)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add_room(self, room):
+        """
+        Start following a room's changes.
+        """
+        self._on_room_changed(room, "added", None)
+        room.add_listener(self._on_room_changed)
+
+    def _on_room_changed(self, room, field, old_value):
+        room_type = room.__class__.__name__
+        with self._lock:
+            self._clock += 1
+            if field == "stays":
+                start, end, _ = old_value
+                nights = self._night_stamps.setdefault(room_type, {})
+                before = len(nights)
+                for night in range(start, end):
+                    nights[night] = self._clock
+                self._night_count += len(nights) - before
+                if self._night_count > self._prune_at:
+                    self._prune_nights()
+            else:
+                self._type_stamps[room_type] = self._clock
+
+    def _prune_nights(self):
+        """
+        Drop the night stamps not newer than the oldest live entry; they can never make one stale.
+        If long-lived entries keep too many stamps relevant, drop those entries and every stamp.
+        """
+        oldest = min((entry[1][0] for entry in self._entries.values()), default=self._clock)
+        for room_type, nights in self._night_stamps.items():
+            self._night_stamps[room_type] = {night: stamp for night, stamp in nights.items() if stamp > oldest}
+        self._night_count = sum(len(nights) for nights in self._night_stamps.values())
+        if self._night_count > MIN_NIGHT_STAMPS:
+            self.evictions += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            self._night_stamps.clear()
+            self._night_count = 0
+        self._prune_at = max(MIN_NIGHT_STAMPS, 2 * self._night_count)
+
+    def _fresh(self, key, stamp):
+        created, pricing_version = stamp
+        if self._pricing is not None and self._pricing.rules_version != pricing_version:
+            return False
+        check_in, check_out, room_type = key[1], key[2], key[3]
+        for name in (room_type,) if room_type else self._type_stamps:
+            if self._type_stamps.get(name, 0) > created:
+                return False
+            nights = self._night_stamps.get(name)
+            if nights and any(nights.get(night, 0) > created for night in range(check_in, check_out)):
+                return False
+        return True
+
+    def get_or_compute(self, namespace, key, compute):
+        """
+        Return a cached search result, computing and caching it on a miss.
+        :param namespace: str, kind of result (e.g. "listing" or "api"), so formats never mix
+        :param key: tuple, from search_key()
+        :param compute: callable, builds the result from scratch
+        :return: the cached or newly computed result
+        """
+        full_key = (namespace,) + key
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None:
+                if self._fresh(full_key, entry[1]):
+                    self._entries.move_to_end(full_key)
+                    self.hits += 1
+                    return entry[0]
+                self._drop(full_key)
+                self.invalidations += 1
+            self.misses += 1
+            # Stamp before computing: a change made while computing makes the entry stale at once.
+            stamp = (self._clock, self._pricing.rules_version if self._pricing is not None else None)
+        value = compute()
+        size = _size_of(value)
+        with self._lock:
+            if size > self._max_bytes:
+                return value
+            if full_key in self._entries:
+                self._drop(full_key)
+            self._entries[full_key] = (value, stamp, size)
+            self._bytes += size
+            while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return value
+
+    def _drop(self, full_key):
+        self._bytes -= self._entries.pop(full_key)[2]
+
+    def clear(self):
+        """
+        Drop every entry (statistics are kept).
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Snapshot of the cache counters.
+        :return: dict, hits, misses, evictions, invalidations, hit ratio, entries and bytes
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "invalidations": self.invalidations, "hit_ratio": self.hits / lookups if lookups else 0.0,
+                    "entries": len(self._entries), "bytes": self._bytes}
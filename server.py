@@ -0,0 +1,481 @@
+import argparse
+import asyncio
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+from hotel.cli import HotelCLI
+from hotel.booking_service import BookingConflictError
+from hotel.search_cache import search_key, normalize_amenities
+from hotel.waitlist import OFFERED
+
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 500
+# Detail fields each payment method accepts besides "method".
+PAYMENT_FIELDS = {"credit_card": ("card_number", "expiry_date"), "mobile_wallet": ("wallet_type", "phone_number")}
+
+
+class HTTPError(Exception):
+    """
+    Error carrying the HTTP status to answer with.
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_date(value, field):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{field} must be a YYYY-MM-DD date")
+
+
+def _text(body, field, required=False):
+    value = body.get(field)
+    if value is None and not required:
+        return None
+    if not isinstance(value, str) or not value.strip():
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{field} must be a non-empty string")
+    return value.strip()
+
+
+def _parse_payment(body):
+    """
+    Validate the payment object of a booking request.
+    :return: tuple, (method, dict of payment details)
+    """
+    payment = body.get("payment")
+    if not isinstance(payment, dict):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "payment must be an object")
+    method = payment.get("method")
+    if method not in PAYMENT_FIELDS:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"payment.method must be one of {', '.join(PAYMENT_FIELDS)}")
+    unknown = sorted(set(payment) - {"method"} - set(PAYMENT_FIELDS[method]))
+    if unknown:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Unexpected payment fields for {method}: {', '.join(unknown)}")
+    details = {field: _text(payment, field) for field in PAYMENT_FIELDS[method]}
+    return method, details
+
+
+def guest_to_dict(guest):
+    account = guest.loyalty_account
+    return {"guest_id": guest.guest_id, "name": guest.name, "email": guest.email, "contact": guest.contact,
+            "loyalty": {"points": account.points, "tier": account.tier}}
+
+
+def room_to_dict(room):
+    return {"room_number": room.room_number, "room_type": room.__class__.__name__,
+            "price_per_night": room.price_per_night, "amenities": room.amenities}
+
+
+def booking_to_dict(booking):
+    payment = booking.payment
+    return {"booking_id": booking.booking_id, "guest_id": booking.guest.guest_id,
+            "room": room_to_dict(booking.room),
+            "check_in": str(booking.check_in_date), "check_out": str(booking.check_out_date),
+            "flexible": booking.flexible, "cancelled": booking.cancelled,
+            "total": booking.invoice["total"] if booking.invoice else None,
+            "payment": None if payment is None else {
+                "method": payment.__class__.__name__, "amount": payment.amount,
+                "transaction_id": payment.transaction_id, "confirmation": payment.process_payment(),
+                "status": booking.invoice.get("payment_status") if booking.invoice else None,
+                "reference": booking.invoice.get("payment_reference") if booking.invoice else None}}
+
+
+def hold_to_dict(hold, expires_in):
+    return {"hold_id": hold.hold_id, "guest_id": hold.guest.guest_id, "room": room_to_dict(hold.room),
+            "check_in": str(hold.check_in_date), "check_out": str(hold.check_out_date),
+            "expires_in": round(expires_in, 3)}
+
+
+def waitlist_entry_to_dict(entry, hotel):
+    hold = entry.hold if entry.status == OFFERED else None
+    return {"entry_id": entry.entry_id, "guest_id": entry.guest.guest_id, "room_type": entry.room_type,
+            "check_in": str(entry.check_in_date), "check_out": str(entry.check_out_date), "status": entry.status,
+            "hold": None if hold is None else hold_to_dict(hold, hotel.holds.time_left(hold))}
+
+
+def feedback_to_dict(feedback):
+    return {"rating": feedback.rating, "comments": feedback.comments, "guest_name": feedback.guest_name,
+            "feedback_date": feedback.feedback_date, "booking_id": feedback.booking_id,
+            "room_type": feedback.room_type}
+
+
+class HotelAPIServer:
+    """
+    asyncio HTTP/JSON server exposing the HotelCLI operations.
+
+    Connections are kept alive across requests. Request parsing happens on the
+    event loop, while every operation runs on a thread pool so storage and
+    search work never stalls the loop for other clients.
+    """
+    def __init__(self, hotel=None, host="127.0.0.1", port=8080, workers=8, idle_timeout=30):
+        """
+        Initialize the API server.
+        :param hotel: HotelCLI, hotel state and operations to expose
+        :param host: str, interface to bind
+        :param port: int, TCP port to listen on
+        :param workers: int, executor threads for operations
+        :param idle_timeout: float, seconds a keep-alive connection may stay idle
+        """
+        self.hotel = hotel or HotelCLI()
+        self._host = host
+        self._port = port
+        self._idle_timeout = idle_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hotel-api")
+        self._server = None
+        self._routes = [
+            ("POST", re.compile(r"^/guests$"), self.create_guest),
+            ("GET", re.compile(r"^/guests/(?P<guest_id>[^/]+)$"), self.get_guest),
+            ("GET", re.compile(r"^/rooms$"), self.search_rooms),
+            ("GET", re.compile(r"^/rooms/cache$"), self.cache_stats),
+            ("POST", re.compile(r"^/bookings$"), self.make_booking),
+            ("GET", re.compile(r"^/payments/settlement$"), self.settlement_stats),
+            ("POST", re.compile(r"^/holds$"), self.create_hold),
+            ("DELETE", re.compile(r"^/holds/(?P<hold_id>[^/]+)$"), self.release_hold),
+            ("GET", re.compile(r"^/guests/(?P<guest_id>[^/]+)/bookings$"), self.reservation_history),
+            ("PATCH", re.compile(r"^/guests/(?P<guest_id>[^/]+)/bookings/(?P<booking_id>[^/]+)$"),
+             self.modify_booking),
+            ("DELETE", re.compile(r"^/guests/(?P<guest_id>[^/]+)/bookings/(?P<booking_id>[^/]+)$"),
+             self.cancel_booking),
+            ("POST", re.compile(r"^/waitlist$"), self.join_waitlist),
+            ("GET", re.compile(r"^/waitlist/(?P<entry_id>[^/]+)$"), self.get_waitlist_entry),
+            ("DELETE", re.compile(r"^/waitlist/(?P<entry_id>[^/]+)$"), self.leave_waitlist),
+            ("POST", re.compile(r"^/service-requests$"), self.request_service),
+            ("POST", re.compile(r"^/service-requests/(?P<request_id>[^/]+)/complete$"), self.complete_service),
+            ("POST", re.compile(r"^/feedback$"), self.submit_feedback),
+            ("GET", re.compile(r"^/feedback/summary$"), self.feedback_summary),
+            ("GET", re.compile(r"^/feedback/search$"), self.search_feedback),
+        ]
+
+    # Endpoint handlers; each runs on the executor
+
+    def _guest(self, guest_id):
+        guest = self.hotel.find_guest(guest_id)
+        if guest is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown guest: {guest_id}")
+        return guest
+
+    def _room(self, room_number):
+        if not isinstance(room_number, int) or isinstance(room_number, bool):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "room_number must be an integer")
+        room = self.hotel.booking_service.get_room(room_number)
+        if room is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown room: {room_number}")
+        return room
+
+    def create_guest(self, params, query, body):
+        guest = self.hotel.register_guest(_text(body, "name", required=True), _text(body, "email"),
+                                          _text(body, "contact"))
+        return HTTPStatus.CREATED, guest_to_dict(guest)
+
+    def get_guest(self, params, query, body):
+        return HTTPStatus.OK, guest_to_dict(self._guest(params["guest_id"]))
+
+    def search_rooms(self, params, query, body):
+        check_in = _parse_date(query.get("check_in"), "check_in")
+        check_out = _parse_date(query.get("check_out"), "check_out")
+        if check_out <= check_in:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Check-out date must be after check-in date")
+        try:
+            min_price = float(query["min_price"]) if "min_price" in query else None
+            max_price = float(query["max_price"]) if "max_price" in query else None
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "min_price and max_price must be numbers")
+        amenities = normalize_amenities(query.get("amenities", "").split(","))
+        room_type = query.get("room_type")
+
+        def compute():
+            rooms = self.hotel.available_rooms(check_in, check_out, room_type, min_price, max_price, amenities)
+            quotes = self.hotel.pricing.quote_many(rooms, check_in, check_out)
+            return [dict(room_to_dict(room), stay_total=quotes[room.room_number]) for room in rooms]
+
+        key = search_key(check_in, check_out, room_type, min_price, max_price, amenities)
+        return HTTPStatus.OK, self.hotel.search_cache.get_or_compute("api", key, compute)
+
+    def cache_stats(self, params, query, body):
+        return HTTPStatus.OK, self.hotel.search_cache.stats()
+
+    def settlement_stats(self, params, query, body):
+        return HTTPStatus.OK, self.hotel.settlement.stats()
+
+    def make_booking(self, params, query, body):
+        guest = self._guest(_text(body, "guest_id", required=True))
+        method, payment = _parse_payment(body)
+        hold_id = _text(body, "hold_id")
+        if hold_id:
+            # Confirm a hold: the booking takes over the held room and dates.
+            hold = self.hotel.holds.get(hold_id)
+            if hold is None or hold.guest.guest_id != guest.guest_id:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown or expired hold: {hold_id}")
+            booking = self.hotel.book_room(guest, hold.room, hold.check_in_date, hold.check_out_date,
+                                           method, hold=hold, **payment)
+            return HTTPStatus.CREATED, booking_to_dict(booking)
+        check_in = _parse_date(body.get("check_in"), "check_in")
+        check_out = _parse_date(body.get("check_out"), "check_out")
+        if body.get("room_number") is None and body.get("room_type") is not None:
+            # Booking by room type: the hotel picks the room (and may move it before arrival).
+            booking = self.hotel.book_room_type(guest, _text(body, "room_type", required=True), check_in, check_out,
+                                                method, **payment)
+            return HTTPStatus.CREATED, booking_to_dict(booking)
+        room = self._room(body.get("room_number"))
+        booking = self.hotel.book_room(guest, room, check_in, check_out, method, **payment)
+        return HTTPStatus.CREATED, booking_to_dict(booking)
+
+    def create_hold(self, params, query, body):
+        guest = self._guest(body.get("guest_id"))
+        room = self._room(body.get("room_number"))
+        ttl = body.get("ttl")
+        if ttl is not None and (not isinstance(ttl, (int, float)) or ttl <= 0):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "ttl must be a positive number of seconds")
+        hold = self.hotel.hold_room(guest, room, _parse_date(body.get("check_in"), "check_in"),
+                                    _parse_date(body.get("check_out"), "check_out"), ttl)
+        return HTTPStatus.CREATED, hold_to_dict(hold, self.hotel.holds.time_left(hold))
+
+    def release_hold(self, params, query, body):
+        if not self.hotel.release_hold(params["hold_id"]):
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown or expired hold: {params['hold_id']}")
+        return HTTPStatus.OK, {"hold_id": params["hold_id"], "released": True}
+
+    def reservation_history(self, params, query, body):
+        guest = self._guest(params["guest_id"])
+        try:
+            limit = min(int(query.get("limit", HISTORY_PAGE_SIZE)), MAX_HISTORY_PAGE_SIZE)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "limit must be an integer")
+        start = _parse_date(query["from"], "from") if "from" in query else None
+        end = _parse_date(query["to"], "to") if "to" in query else None
+        if query.get("order", "asc") not in ("asc", "desc"):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "order must be asc or desc")
+        bookings, cursor = guest.view_reservation_history().page(
+            limit, query.get("cursor"), start, end, query.get("when"), descending=query.get("order") == "desc")
+        return HTTPStatus.OK, {"bookings": [booking_to_dict(booking) for booking in bookings], "next_cursor": cursor}
+
+    def _booking(self, guest, booking_id):
+        booking = self.hotel.find_booking(guest, booking_id)
+        if booking is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown booking: {booking_id}")
+        return booking
+
+    def modify_booking(self, params, query, body):
+        guest = self._guest(params["guest_id"])
+        booking = self._booking(guest, params["booking_id"])
+        check_in = _parse_date(body["check_in"], "check_in") if "check_in" in body else None
+        check_out = _parse_date(body["check_out"], "check_out") if "check_out" in body else None
+        room = None
+        if body.get("room_number") is not None:
+            room = self._room(body["room_number"])
+        booking = self.hotel.modify_booking(guest, booking.booking_id, check_in, check_out, room)
+        return HTTPStatus.OK, booking_to_dict(booking)
+
+    def cancel_booking(self, params, query, body):
+        guest = self._guest(params["guest_id"])
+        booking = self.hotel.cancel_booking(guest, self._booking(guest, params["booking_id"]).booking_id)
+        return HTTPStatus.OK, booking_to_dict(booking)
+
+    def join_waitlist(self, params, query, body):
+        guest = self._guest(_text(body, "guest_id", required=True))
+        entry = self.hotel.join_waitlist(guest, _text(body, "room_type"),
+                                         _parse_date(body.get("check_in"), "check_in"),
+                                         _parse_date(body.get("check_out"), "check_out"))
+        return HTTPStatus.CREATED, waitlist_entry_to_dict(entry, self.hotel)
+
+    def get_waitlist_entry(self, params, query, body):
+        entry = self.hotel.waitlist.get(params["entry_id"])
+        if entry is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown waitlist entry: {params['entry_id']}")
+        return HTTPStatus.OK, waitlist_entry_to_dict(entry, self.hotel)
+
+    def leave_waitlist(self, params, query, body):
+        if not self.hotel.waitlist.leave(params["entry_id"]):
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown waitlist entry: {params['entry_id']}")
+        self.hotel.fill_waitlist()
+        return HTTPStatus.OK, {"entry_id": params["entry_id"], "left": True}
+
+    def request_service(self, params, query, body):
+        guest = self._guest(_text(body, "guest_id", required=True))
+        room_number = body.get("room_number")
+        if room_number is not None:
+            room_number = self._room(room_number).room_number
+        service_request = self.hotel.file_service_request(guest, _text(body, "request_type", required=True),
+                                                          _text(body, "details"), room_number)
+        return HTTPStatus.CREATED, {"request_id": service_request.request_id, "room_number": service_request.room_number,
+                                    "request_type": service_request.request_type, "details": service_request.details,
+                                    "status": service_request.status}
+
+    def complete_service(self, params, query, body):
+        service_request = self.hotel.complete_service_request(params["request_id"])
+        if service_request is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No open service request: {params['request_id']}")
+        return HTTPStatus.OK, {"request_id": service_request.request_id, "status": service_request.status}
+
+    def submit_feedback(self, params, query, body):
+        guest = self._guest(_text(body, "guest_id", required=True))
+        try:
+            rating = int(body.get("rating"))
+        except (TypeError, ValueError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "rating must be an integer")
+        comments = body.get("comments", "")
+        if not isinstance(comments, str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "comments must be a string")
+        feedback = self.hotel.record_feedback(guest, rating, comments, _text(body, "booking_id"))
+        return HTTPStatus.CREATED, feedback_to_dict(feedback)
+
+    def feedback_summary(self, params, query, body):
+        return HTTPStatus.OK, self.hotel.feedback.summary()
+
+    def search_feedback(self, params, query, body):
+        try:
+            limit = int(query.get("limit", 20))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "limit must be an integer")
+        return HTTPStatus.OK, [feedback_to_dict(feedback)
+                               for feedback in self.hotel.feedback.search(query.get("q", ""), limit)]
+
+    # HTTP plumbing
+
+    def _dispatch(self, method, target, body):
+        """
+        Route one request to its handler and return (status, payload).
+        """
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        path_matched = False
+        for route_method, pattern, handler in self._routes:
+            match = pattern.match(url.path)
+            if match:
+                path_matched = True
+                if route_method == method:
+                    try:
+                        return handler(match.groupdict(), query, body)
+                    except HTTPError as e:
+                        return e.status, {"error": str(e)}
+                    except BookingConflictError as e:
+                        return HTTPStatus.CONFLICT, {"error": str(e)}
+                    except ValueError as e:
+                        return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+                    except Exception:
+                        # The details stay in the server log; clients only learn that the request failed.
+                        logger.exception("Unhandled error in %s %s", method, url.path)
+                        return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}
+        if path_matched:
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"{method} not allowed on {url.path}"}
+        return HTTPStatus.NOT_FOUND, {"error": f"No such endpoint: {url.path}"}
+
+    async def _read_request(self, reader):
+        """
+        Read one HTTP/1.1 request.
+        :return: tuple, (method, target, keep_alive, body bytes), or None at end of stream
+        """
+        request_line = await asyncio.wait_for(reader.readline(), self._idle_timeout)
+        if not request_line.strip():
+            return None
+        method, target, version = request_line.decode("latin-1").split()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        body = await reader.readexactly(length) if length else b""
+        keep_alive = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+        return method, target, keep_alive, body
+
+    async def _handle_connection(self, reader, writer):
+        """
+        Serve requests on one connection until the client closes it or goes idle.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+                    break
+                if request is None:
+                    break
+                method, target, keep_alive, raw_body = request
+                try:
+                    body = json.loads(raw_body) if raw_body else {}
+                except ValueError:
+                    body = None
+                if not isinstance(body, dict):
+                    status, payload = HTTPStatus.BAD_REQUEST, {"error": "Request body must be a JSON object"}
+                else:
+                    status, payload = await loop.run_in_executor(self._executor, self._dispatch, method, target, body)
+                data = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def start(self):
+        """
+        Start listening for connections.
+        """
+        self._server = await asyncio.start_server(self._handle_connection, self._host, self._port)
+        return self._server
+
+    async def serve_forever(self):
+        """
+        Start the server and serve until cancelled.
+        """
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+    async def stop(self):
+        """
+        Stop accepting connections and release the executor.
+        """
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Royal Stay Hotel JSON API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", help="SQLite database file for persistent storage")
+    parser.add_argument("--journal", help="directory for the event journal and snapshots")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics and profiling toggles on this port")
+    parser.add_argument("--node-id", type=int, help="ID minting node of this process (default: $HOTEL_NODE_ID, "
+                                                    "else a free one leased next to the journal or database)")
+    args = parser.parse_args()
+
+    repository = journal = None
+    if args.db:
+        from hotel.storage import HotelRepository
+        repository = HotelRepository(args.db)
+    if args.journal:
+        from hotel.journal import HotelJournal
+        journal = HotelJournal(args.journal)
+    hotel = HotelCLI(repository, journal, node_id=args.node_id)
+    if args.metrics_port:
+        hotel.enable_metrics(args.metrics_port)
+    try:
+        asyncio.run(HotelAPIServer(hotel, args.host, args.port).serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        hotel.close()
+        if journal:
+            journal.close()
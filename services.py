@@ -3,18 +3,42 @@ class ServiceRequest:
     """
     Represents a service request made by a hotel guest.
     """
-    def __init__(self, request_type, details, status="Pending", request_date=None):
+    def __init__(self, request_type, details, status="Pending", request_date=None, request_id=None,
+                 guest_id=None, room_number=None):
         """
         Initialize a service request.
         :param request_type: str, type of service requested (e.g., Housekeeping, Room Service)
         :param details: str, additional details about the request
         :param status: str, current status of the request (default: Pending)
         :param request_date: str, date of request submission
+        :param request_id: str, unique identifier for the request
+        :param guest_id: str, ID of the guest who made the request
+        :param room_number: int, room the request is for
         """
         self._request_type = request_type
         self._details = details
         self._status = status
         self._request_date = request_date
+        self._request_id = request_id
+        self._guest_id = guest_id
+        self._room_number = room_number
+
+    def __setstate__(self, state):
+        # Snapshots written before requests were keyed to a guest and room lack those fields.
+        self.__dict__.update(_request_id=None, _guest_id=None, _room_number=None)
+        self.__dict__.update(state)
+
+    @property
+    def request_id(self):
+        return self._request_id
+
+    @property
+    def guest_id(self):
+        return self._guest_id
+
+    @property
+    def room_number(self):
+        return self._room_number
 
     @property
     def request_type(self):
@@ -52,25 +76,43 @@ class ServiceRequest:
         """
         String representation of the service request.
         """
-        return f"{self._request_type}: {self._details} ({self._status}), Date: {self._request_date}"
+        room = f", Room: {self._room_number}" if self._room_number is not None else ""
+        return f"{self._request_type}: {self._details} ({self._status}), Date: {self._request_date}{room}"
 
 
 class Feedback:
     """
     Represents guest feedback for hotel services.
     """
-    def __init__(self, rating, comments, guest_name, feedback_date):
+    def __init__(self, rating, comments, guest_name, feedback_date, booking_id=None, room_type=None):
         """
         Initialize a feedback entry.
         :param rating: int, rating out of 5
         :param comments: str, additional feedback comments
         :param guest_name: str, name of the guest providing feedback
         :param feedback_date: str, date feedback was given
+        :param booking_id: str, booking the feedback is about
+        :param room_type: str, room class of that booking
         """
         self._rating = rating
         self._comments = comments
         self._guest_name = guest_name
         self._feedback_date = feedback_date
+        self._booking_id = booking_id
+        self._room_type = room_type
+
+    def __setstate__(self, state):
+        # Snapshots written before feedback was linked to bookings lack those fields.
+        self.__dict__.update(_booking_id=None, _room_type=None)
+        self.__dict__.update(state)
+
+    @property
+    def booking_id(self):
+        return self._booking_id
+
+    @property
+    def room_type(self):
+        return self._room_type
 
     @property
     def rating(self):
@@ -0,0 +1,292 @@
+import asyncio
+import random
+import threading
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+from hotel.booking import PAYMENT_PENDING, PAYMENT_SETTLED, PAYMENT_FAILED
+
+
+Charge = namedtuple("Charge", ["idempotency_key", "booking_id", "method", "amount"])
+ChargeResult = namedtuple("ChargeResult", ["idempotency_key", "ok", "reference", "error", "retryable"])
+
+
+def idempotency_key(payment):
+    """
+    Key under which a payment is charged; resubmitting it never charges twice.
+    :param payment: Payment object
+    :return: str, key derived from the payment's transaction ID
+    """
+    return f"pay-{payment.transaction_id}"
+
+
+class GatewayError(Exception):
+    """
+    A whole gateway call failed (timeout, outage); every charge in it may be retried.
+    """
+
+
+class PaymentGateway(ABC):
+    """
+    Adapter to a payment processor that settles charges in batches.
+    """
+    @abstractmethod
+    async def charge_batch(self, charges):
+        """
+        Settle a batch of charges in one round trip.
+
+        A charge whose idempotency key was seen before must not be charged
+        again; the gateway answers with the outcome of the first attempt.
+        :param charges: list, Charge tuples
+        :return: list, one ChargeResult per charge, in the same order
+        :raises GatewayError: if the call as a whole failed
+        """
+
+
+class FakeGateway(PaymentGateway):
+    """
+    Local stand-in for a payment processor that simulates latency and failures.
+
+    Each call costs ``latency`` seconds plus ``per_charge`` seconds per charge.
+    A call fails outright with probability ``outage_rate``; each charge in a
+    call that goes through is declined for good with probability
+    ``decline_rate`` or fails transiently with probability ``failure_rate``.
+    Final outcomes are remembered by idempotency key, like a real gateway.
+    """
+    def __init__(self, latency=0.05, per_charge=0.0005, failure_rate=0.0, decline_rate=0.0, outage_rate=0.0,
+                 seed=None):
+        """
+        Initialize the fake gateway.
+        :param latency: float, seconds per call
+        :param per_charge: float, extra seconds per charge in a call
+        :param failure_rate: float, probability that a charge fails transiently
+        :param decline_rate: float, probability that a charge is declined
+        :param outage_rate: float, probability that a whole call fails
+        :param seed: int, random seed for reproducible failures
+        """
+        self._latency = latency
+        self._per_charge = per_charge
+        self._failure_rate = failure_rate
+        self._decline_rate = decline_rate
+        self._outage_rate = outage_rate
+        self._random = random.Random(seed)
+        self.outcomes = {}
+        self.calls = 0
+        self.charges = 0
+
+    async def charge_batch(self, charges):
+        self.calls += 1
+        await asyncio.sleep(self._latency + self._per_charge * len(charges))
+        if self._random.random() < self._outage_rate:
+            raise GatewayError("Gateway unavailable")
+        results = []
+        for charge in charges:
+            result = self.outcomes.get(charge.idempotency_key)
+            if result is None:
+                draw = self._random.random()
+                if draw < self._failure_rate:
+                    result = ChargeResult(charge.idempotency_key, False, None, "Temporarily unavailable", True)
+                else:
+                    if draw < self._failure_rate + self._decline_rate:
+                        result = ChargeResult(charge.idempotency_key, False, None, "Declined", False)
+                    else:
+                        self.charges += 1
+                        result = ChargeResult(charge.idempotency_key, True, f"ch_{self.charges:010d}", None, False)
+                    self.outcomes[charge.idempotency_key] = result
+            results.append(result)
+        return results
+
+
+class PaymentSettlement:
+    """
+    Asynchronous, batched settlement of booking payments.
+
+    Booking only queues the payment: submit() hands it to an asyncio event
+    loop on a background thread and returns at once, so no gateway round trip
+    is part of booking latency. Up to ``concurrency`` workers each take
+    whatever has queued (up to ``batch_size`` payments, waiting ``max_wait``
+    seconds for more when the queue is short) and settle it in one gateway
+    call, so per-payment overhead falls as load rises. Transient failures are
+    queued again after an exponential backoff with jitter; the outcome is
+    recorded on the booking's invoice and reported to ``on_settled``. Every
+    charge carries an idempotency key derived from its transaction ID, so
+    retries and resubmissions after a restart never charge twice.
+    """
+    def __init__(self, gateway, batch_size=50, max_wait=0.01, concurrency=4, max_attempts=5, backoff=0.5,
+                 max_backoff=30.0, on_settled=None):
+        """
+        Initialize the settlement queue.
+        :param gateway: PaymentGateway, adapter the charges are sent to
+        :param batch_size: int, most payments settled per gateway call
+        :param max_wait: float, seconds a short queue waits for more payments before a call
+        :param concurrency: int, gateway calls in flight at once
+        :param max_attempts: int, attempts before a transiently failing payment is marked failed
+        :param backoff: float, seconds before the first retry; doubles with every attempt
+        :param max_backoff: float, longest wait between attempts
+        :param on_settled: callable, called off the event loop with each list of Bookings whose payments
+                           settled or failed
+        """
+        self._gateway = gateway
+        self._batch_size = batch_size
+        self._max_wait = max_wait
+        self._concurrency = concurrency
+        self._max_attempts = max_attempts
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._on_settled = on_settled
+        self._random = random.Random()
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._loop = None
+        self._queue = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._submitted = self._settled = self._failed = self._retried = self._duplicates = 0
+        self._batches = self._batched = self._errors = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def start(self):
+        """
+        Start the event loop thread (once).
+        """
+        with self._cond:
+            if self._thread is None:
+                self._ready.clear()
+                self._thread = threading.Thread(target=self._run, name="payment-settlement", daemon=True)
+                self._thread.start()
+        self._ready.wait()
+
+    def stop(self, drain=True, timeout=None):
+        """
+        Stop the event loop thread.
+        :param drain: bool, first wait for every queued payment to settle or fail
+        :param timeout: float, longest wait for the queue to drain
+        """
+        if self._thread is None:
+            return
+        if drain:
+            self.drain(timeout)
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join()
+        self._ready.clear()
+        self._thread = None
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        self._queue = asyncio.Queue()
+        self._stopping = asyncio.Event()
+        workers = [asyncio.create_task(self._work()) for _ in range(self._concurrency)]
+        self._ready.set()
+        await self._stopping.wait()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def submit(self, booking):
+        """
+        Queue a booking's payment for settlement (starting the loop thread if needed) without waiting for it.
+        :param booking: Booking object with a payment
+        :return: bool, False if the payment is already queued or settled
+        """
+        invoice = booking.invoice
+        if invoice is not None and invoice.get("payment_status") not in (None, PAYMENT_PENDING):
+            return False
+        if not self._ready.is_set():
+            # Another thread may have created the loop thread but not yet its loop; start() waits for both.
+            self.start()
+        key = idempotency_key(booking.payment)
+        with self._cond:
+            if key in self._pending:
+                self._duplicates += 1
+                return False
+            self._pending[key] = booking
+            self._submitted += 1
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (key, booking, 1))
+        return True
+
+    def drain(self, timeout=None):
+        """
+        Wait until every queued payment has settled or failed.
+        :return: bool, False if the timeout passed first
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+
+    async def _work(self):
+        while True:
+            batch = [await self._queue.get()]
+            if self._max_wait and self._queue.qsize() < self._batch_size - 1:
+                await asyncio.sleep(self._max_wait)
+            while len(batch) < self._batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._settle(batch)
+            except Exception:
+                # A failing on_settled must not stop the worker; the outcomes are on the invoices.
+                with self._cond:
+                    self._errors += 1
+
+    def _retry_delay(self, attempt):
+        delay = min(self._max_backoff, self._backoff * 2 ** (attempt - 1))
+        return delay * (0.5 + self._random.random() / 2)
+
+    async def _settle(self, batch):
+        charges = [Charge(key, booking.booking_id, booking.payment.__class__.__name__, booking.payment.amount)
+                   for key, booking, _ in batch]
+        try:
+            results = await self._gateway.charge_batch(charges)
+        except Exception as e:
+            results = [ChargeResult(charge.idempotency_key, False, None, str(e) or e.__class__.__name__, True)
+                       for charge in charges]
+        done, retried = [], 0
+        for (key, booking, attempt), result in zip(batch, results):
+            if result.ok:
+                booking.record_settlement(PAYMENT_SETTLED, reference=result.reference)
+            elif result.retryable and attempt < self._max_attempts:
+                retried += 1
+                self._loop.call_later(self._retry_delay(attempt), self._queue.put_nowait, (key, booking, attempt + 1))
+                continue
+            else:
+                booking.record_settlement(PAYMENT_FAILED, error=result.error)
+            done.append((key, booking))
+        try:
+            if done and self._on_settled:
+                await asyncio.to_thread(self._on_settled, [booking for _, booking in done])
+        finally:
+            with self._cond:
+                self._batches += 1
+                self._batched += len(batch)
+                self._retried += retried
+                for key, booking in done:
+                    del self._pending[key]
+                    if booking.invoice["payment_status"] == PAYMENT_SETTLED:
+                        self._settled += 1
+                    else:
+                        self._failed += 1
+                self._cond.notify_all()
+
+    def stats(self):
+        """
+        Snapshot of the settlement counters.
+        :return: dict, queue depth, outcomes, retries and average batch size
+        """
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "submitted": self._submitted,
+                "settled": self._settled,
+                "failed": self._failed,
+                "retried": self._retried,
+                "duplicates": self._duplicates,
+                "batches": self._batches,
+                "batch_avg": self._batched / self._batches if self._batches else 0.0,
+                "errors": self._errors,
+            }
@@ -0,0 +1,641 @@
+import sqlite3
+import threading
+from datetime import date
+
+from hotel.directory import normalize_contact, normalize_email, normalize_name
+from hotel.guest import Guest, LoyaltyAccount
+from hotel.room import SingleRoom, DoubleRoom, Suite
+from hotel.booking import Booking, CreditCardPayment, MobileWalletPayment, PAYMENT_SETTLED
+from hotel.services import ServiceRequest
+
+
+ROOM_CLASSES = {cls.__name__: cls for cls in (SingleRoom, DoubleRoom, Suite)}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS guests (
+    guest_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT,
+    contact TEXT,
+    loyalty_points INTEGER NOT NULL DEFAULT 0,
+    loyalty_tier TEXT NOT NULL DEFAULT 'Basic',
+    loyalty_updated TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS guest_keys (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    guest_id TEXT NOT NULL REFERENCES guests(guest_id),
+    PRIMARY KEY (kind, key, guest_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rooms (
+    room_number INTEGER PRIMARY KEY,
+    room_type TEXT NOT NULL,
+    price_per_night NUMERIC NOT NULL,
+    amenities TEXT NOT NULL,
+    is_available INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS bookings (
+    booking_id TEXT PRIMARY KEY,
+    guest_id TEXT NOT NULL REFERENCES guests(guest_id),
+    room_number INTEGER NOT NULL REFERENCES rooms(room_number),
+    check_in INTEGER NOT NULL,
+    check_out INTEGER NOT NULL,
+    total NUMERIC
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bookings_by_guest ON bookings (guest_id, check_in);
+CREATE INDEX IF NOT EXISTS bookings_by_room ON bookings (room_number, check_in, check_out);
+CREATE INDEX IF NOT EXISTS bookings_by_check_in ON bookings (check_in);
+CREATE INDEX IF NOT EXISTS bookings_by_check_out ON bookings (check_out);
+CREATE TABLE IF NOT EXISTS flexible_bookings (
+    booking_id TEXT PRIMARY KEY REFERENCES bookings(booking_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS payments (
+    transaction_id TEXT PRIMARY KEY,
+    booking_id TEXT NOT NULL REFERENCES bookings(booking_id),
+    method TEXT NOT NULL,
+    amount NUMERIC NOT NULL,
+    payment_date TEXT,
+    card_number TEXT,
+    expiry_date TEXT,
+    wallet_type TEXT,
+    phone_number TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS payments_by_booking ON payments (booking_id);
+CREATE TABLE IF NOT EXISTS payment_settlements (
+    transaction_id TEXT PRIMARY KEY REFERENCES payments(transaction_id),
+    status TEXT NOT NULL,
+    reference TEXT,
+    error TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cancelled_bookings (
+    booking_id TEXT PRIMARY KEY,
+    guest_id TEXT NOT NULL REFERENCES guests(guest_id),
+    room_number INTEGER NOT NULL,
+    check_in INTEGER NOT NULL,
+    check_out INTEGER NOT NULL,
+    total NUMERIC,
+    transaction_id TEXT,
+    cancelled_on TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS service_requests (
+    request_id TEXT PRIMARY KEY,
+    guest_id TEXT NOT NULL REFERENCES guests(guest_id),
+    room_number INTEGER REFERENCES rooms(room_number),
+    request_type TEXT,
+    details TEXT,
+    status TEXT NOT NULL,
+    request_date TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS service_requests_by_status ON service_requests (status, request_date);
+CREATE TABLE IF NOT EXISTS loyalty_ledger (
+    account_id TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    reference TEXT
+);
+CREATE INDEX IF NOT EXISTS loyalty_ledger_by_account ON loyalty_ledger (account_id);
+"""
+
+# Statements are module constants so sqlite3's per-connection statement
+# cache compiles each one once and reuses the prepared form.
+UPSERT_GUEST = """
+INSERT INTO guests (guest_id, name, email, contact, loyalty_points, loyalty_tier, loyalty_updated)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (guest_id) DO UPDATE SET
+    name = excluded.name, email = excluded.email, contact = excluded.contact,
+    loyalty_points = excluded.loyalty_points, loyalty_tier = excluded.loyalty_tier,
+    loyalty_updated = excluded.loyalty_updated
+"""
+INSERT_GUEST_KEY = "INSERT OR IGNORE INTO guest_keys (kind, key, guest_id) VALUES (?, ?, ?)"
+UPSERT_ROOM = """
+INSERT INTO rooms (room_number, room_type, price_per_night, amenities, is_available)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (room_number) DO UPDATE SET
+    room_type = excluded.room_type, price_per_night = excluded.price_per_night,
+    amenities = excluded.amenities, is_available = excluded.is_available
+"""
+INSERT_BOOKING = """
+INSERT INTO bookings (booking_id, guest_id, room_number, check_in, check_out, total)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+INSERT_FLEXIBLE_BOOKING = "INSERT INTO flexible_bookings (booking_id) VALUES (?)"
+MOVE_BOOKING = "UPDATE bookings SET room_number = ? WHERE booking_id = ?"
+CHANGE_BOOKING = "UPDATE bookings SET room_number = ?, check_in = ?, check_out = ?, total = ? WHERE booking_id = ?"
+ARCHIVE_CANCELLED_BOOKING = """
+INSERT INTO cancelled_bookings (booking_id, guest_id, room_number, check_in, check_out, total, transaction_id,
+                                cancelled_on)
+SELECT b.booking_id, b.guest_id, b.room_number, b.check_in, b.check_out, b.total, p.transaction_id, ?
+FROM bookings b LEFT JOIN payments p ON p.booking_id = b.booking_id WHERE b.booking_id = ?
+"""
+DELETE_CANCELLED_BOOKING = (
+    "DELETE FROM payment_settlements WHERE transaction_id IN "
+    "(SELECT transaction_id FROM payments WHERE booking_id = ?)",
+    "DELETE FROM payments WHERE booking_id = ?",
+    "DELETE FROM flexible_bookings WHERE booking_id = ?",
+    "DELETE FROM bookings WHERE booking_id = ?",
+)
+INSERT_PAYMENT = """
+INSERT INTO payments (transaction_id, booking_id, method, amount, payment_date,
+                      card_number, expiry_date, wallet_type, phone_number)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+UPSERT_SETTLEMENT = """
+INSERT INTO payment_settlements (transaction_id, status, reference, error)
+SELECT transaction_id, ?, ?, ? FROM payments WHERE transaction_id = ?
+ON CONFLICT (transaction_id) DO UPDATE SET
+    status = excluded.status, reference = excluded.reference, error = excluded.error
+"""
+UPSERT_SERVICE_REQUEST = """
+INSERT INTO service_requests (request_id, guest_id, room_number, request_type, details, status, request_date)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (request_id) DO UPDATE SET status = excluded.status
+"""
+GUEST_COLUMNS = "SELECT guest_id, name, email, contact, loyalty_points, loyalty_tier, loyalty_updated FROM guests"
+SELECT_GUEST = GUEST_COLUMNS + " WHERE guest_id = ?"
+SELECT_GUEST_ID_BY_KEY = "SELECT guest_id FROM guest_keys WHERE kind = ? AND key = ? ORDER BY guest_id LIMIT 1"
+SELECT_GUEST_IDS_BY_NAME = """
+SELECT guest_id FROM guest_keys WHERE kind = 'name' AND key >= ? AND key < ? ORDER BY key, guest_id LIMIT ?
+"""
+SELECT_ROOM = "SELECT room_number, room_type, price_per_night, amenities, is_available FROM rooms WHERE room_number = ?"
+SELECT_ROOMS = "SELECT room_number, room_type, price_per_night, amenities, is_available FROM rooms ORDER BY room_number"
+BOOKING_COLUMNS = """
+SELECT b.booking_id, b.guest_id, b.room_number, b.check_in, b.check_out, b.total, p.transaction_id, p.method,
+       p.amount, p.payment_date, p.card_number, p.expiry_date, p.wallet_type, p.phone_number,
+       f.booking_id IS NOT NULL, s.status, s.reference, s.error
+FROM bookings b LEFT JOIN payments p ON p.booking_id = b.booking_id
+LEFT JOIN flexible_bookings f ON f.booking_id = b.booking_id
+LEFT JOIN payment_settlements s ON s.transaction_id = p.transaction_id
+"""
+SELECT_BOOKING = BOOKING_COLUMNS + "WHERE b.booking_id = ?"
+SELECT_BOOKINGS_BY_GUEST = BOOKING_COLUMNS + "WHERE b.guest_id = ? ORDER BY b.check_in"
+SELECT_ALL_BOOKINGS = BOOKING_COLUMNS + "ORDER BY b.guest_id, b.check_in"
+SELECT_BOOKINGS_BY_ROOM = BOOKING_COLUMNS + "WHERE b.room_number = ? ORDER BY b.check_in"
+SELECT_BOOKINGS_BY_CHECK_IN = BOOKING_COLUMNS + "WHERE b.check_in >= ? AND b.check_in < ? ORDER BY b.check_in"
+SELECT_UNSETTLED_BOOKINGS = BOOKING_COLUMNS + "WHERE p.transaction_id IS NOT NULL AND s.status IS NULL"
+SELECT_STAYS = "SELECT room_number, check_in, check_out, booking_id FROM bookings"
+SELECT_CURRENT_STAYS = SELECT_STAYS + " WHERE check_out > ?"
+SELECT_FLEXIBLE_BOOKING_IDS = """
+SELECT b.booking_id FROM flexible_bookings f JOIN bookings b ON b.booking_id = f.booking_id WHERE b.check_in >= ?
+"""
+SELECT_REPORT_ROWS = """
+SELECT b.room_number, r.room_type, b.check_in, b.check_out,
+       COALESCE(b.total * 1.0 / (b.check_out - b.check_in), r.price_per_night), p.method
+FROM bookings b JOIN rooms r ON r.room_number = b.room_number
+LEFT JOIN payments p ON p.booking_id = b.booking_id
+WHERE b.check_in < ? AND b.check_out > ?
+"""
+SELECT_OPEN_SERVICE_REQUESTS = """
+SELECT request_id, guest_id, room_number, request_type, details, status, request_date
+FROM service_requests WHERE status IN ('Pending', 'In Progress') ORDER BY request_date
+"""
+INSERT_LEDGER_ENTRY = "INSERT INTO loyalty_ledger (account_id, day, points, kind, reference) VALUES (?, ?, ?, ?, ?)"
+SELECT_LEDGER_ENTRIES = "SELECT account_id, day, points, kind, reference FROM loyalty_ledger ORDER BY rowid"
+SELECT_ACCOUNT_LEDGER_ENTRIES = """
+SELECT account_id, day, points, kind, reference FROM loyalty_ledger WHERE account_id = ? ORDER BY rowid
+"""
+SELECT_TABLE = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+BACKFILL_SETTLEMENTS = """
+INSERT OR IGNORE INTO payment_settlements (transaction_id, status) SELECT transaction_id, ? FROM payments
+"""
+SELECT_BOOKING_ID = """
+SELECT 1 FROM bookings WHERE booking_id = ? UNION ALL SELECT 1 FROM cancelled_bookings WHERE booking_id = ? LIMIT 1
+"""
+SELECT_TRANSACTION_ID = "SELECT 1 FROM payments WHERE transaction_id = ? LIMIT 1"
+SELECT_CONFLICT = """
+SELECT 1 FROM bookings WHERE room_number = ? AND check_in < ? AND check_out > ? LIMIT 1
+"""
+
+
+class HotelRepository:
+    """
+    Persistent repository for guests, rooms and bookings backed by SQLite.
+
+    The database runs in WAL mode so readers never block the writer, and every
+    lookup goes through a primary key or secondary index instead of loading
+    whole tables into Python lists.
+    """
+    def __init__(self, path=":memory:"):
+        """
+        Open (and if needed create) the repository database.
+        :param path: str, SQLite database file path
+        """
+        self._path = path
+        self._conn = sqlite3.connect(path, cached_statements=64, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        tracks_settlements = self._conn.execute(SELECT_TABLE, ("payment_settlements",)).fetchone() is not None
+        has_guest_keys = self._conn.execute(SELECT_TABLE, ("guest_keys",)).fetchone() is not None
+        self._conn.executescript(SCHEMA)
+        if not tracks_settlements:
+            # Payments stored before settlement was tracked were charged when booked; never resubmit them.
+            with self._conn:
+                self._conn.execute(BACKFILL_SETTLEMENTS, (PAYMENT_SETTLED,))
+        if not has_guest_keys:
+            # Guests stored before lookups went to disk get their email, phone and name keys now.
+            with self._conn:
+                self._conn.executemany(INSERT_GUEST_KEY, (
+                    key for row in self._conn.execute(GUEST_COLUMNS).fetchall()
+                    for key in self._guest_keys(row[0], row[1], row[2], row[3])))
+        self._rooms = {}
+        # One connection is shared across threads; transactions must not interleave.
+        self._write_lock = threading.RLock()
+
+    @property
+    def path(self):
+        return self._path
+
+    def close(self):
+        """
+        Close the underlying database connection.
+        """
+        self._conn.close()
+
+    # Guests
+
+    @staticmethod
+    def _guest_keys(guest_id, name, email, contact):
+        # Normalized the way GuestDirectory indexes them, so lookups agree whether the guest is loaded or not.
+        keys = [("name", normalize_name(name), guest_id)]
+        if normalize_email(email):
+            keys.append(("email", normalize_email(email), guest_id))
+        if normalize_contact(contact):
+            keys.append(("contact", normalize_contact(contact), guest_id))
+        return keys
+
+    def _guest_row(self, guest):
+        account = guest.loyalty_account
+        return (guest.guest_id, guest.name, guest.email, guest.contact,
+                account.points, account.tier, account.last_updated)
+
+    def save_guest(self, guest):
+        """
+        Insert or update a guest and their loyalty account.
+        :param guest: Guest object
+        """
+        self.save_guests([guest])
+
+    def save_guests(self, guests):
+        """
+        Insert or update many guests in a single transaction.
+        :param guests: iterable, Guest objects
+        """
+        guests = list(guests)
+        with self._write_lock, self._conn:
+            self._conn.executemany(UPSERT_GUEST, (self._guest_row(guest) for guest in guests))
+            self._conn.executemany(INSERT_GUEST_KEY, (
+                key for guest in guests
+                for key in self._guest_keys(guest.guest_id, guest.name, guest.email, guest.contact)))
+
+    def get_guest(self, guest_id, with_bookings=True):
+        """
+        Load a guest by ID.
+        :param guest_id: str, guest identifier
+        :param with_bookings: bool, also load the guest's booking history
+        :return: Guest object, or None if unknown
+        """
+        row = self._conn.execute(SELECT_GUEST, (guest_id,)).fetchone()
+        if row is None:
+            return None
+        guest = self._guest_from_row(row)
+        if with_bookings:
+            for booking_row in self._conn.execute(SELECT_BOOKINGS_BY_GUEST, (guest_id,)):
+                guest.add_booking(self._booking_from_row(booking_row, guest))
+        return guest
+
+    def _guest_from_row(self, row):
+        guest_id, name, email, contact, points, tier, updated = row
+        return Guest(guest_id, name, email, contact, LoyaltyAccount(guest_id, points, tier, updated))
+
+    def lookup_guest_id(self, key):
+        """
+        Resolve a guest ID, email address or phone number to a guest ID through the key index.
+        :param key: str, whatever the guest gave at the front desk
+        :return: str, guest ID, or None if no guest matches
+        """
+        key = (key or "").strip()
+        row = self._conn.execute(SELECT_GUEST, (key,)).fetchone()
+        if row is None and "@" in key:
+            row = self._conn.execute(SELECT_GUEST_ID_BY_KEY, ("email", normalize_email(key))).fetchone()
+        if row is None and normalize_contact(key):
+            row = self._conn.execute(SELECT_GUEST_ID_BY_KEY, ("contact", normalize_contact(key))).fetchone()
+        return row[0] if row else None
+
+    def search_guest_ids(self, prefix, limit=10):
+        """
+        Type-ahead search of the guests whose name starts with a prefix.
+        :param prefix: str, beginning of the name
+        :param limit: int, maximum number of matches
+        :return: list, guest IDs ordered by name
+        """
+        prefix = normalize_name(prefix)
+        return [row[0] for row in self._conn.execute(SELECT_GUEST_IDS_BY_NAME, (prefix, prefix + "\U0010ffff", limit))]
+
+    def load_guests(self):
+        """
+        Load every guest with their booking history in two queries (for whole-hotel batch jobs).
+        :return: list, Guest objects
+        """
+        guests = {row[0]: self._guest_from_row(row) for row in self._conn.execute(GUEST_COLUMNS)}
+        for booking_row in self._conn.execute(SELECT_ALL_BOOKINGS):
+            guest = guests[booking_row[1]]
+            guest.add_booking(self._booking_from_row(booking_row, guest))
+        return list(guests.values())
+
+    # Rooms
+
+    def _room_row(self, room):
+        return (room.room_number, room.__class__.__name__, room.price_per_night,
+                "|".join(room.amenities), int(room.is_available))
+
+    def save_room(self, room):
+        """
+        Insert or update a room.
+        :param room: Room object
+        """
+        with self._write_lock, self._conn:
+            self._conn.execute(UPSERT_ROOM, self._room_row(room))
+        self._rooms[room.room_number] = room
+
+    def save_rooms(self, rooms):
+        """
+        Insert or update many rooms in a single transaction.
+        :param rooms: iterable, Room objects
+        """
+        rooms = list(rooms)
+        with self._write_lock, self._conn:
+            self._conn.executemany(UPSERT_ROOM, (self._room_row(room) for room in rooms))
+        self._rooms.update((room.room_number, room) for room in rooms)
+
+    def _room_from_row(self, row):
+        room_number, room_type, price, amenities, is_available = row
+        room = ROOM_CLASSES[room_type](room_number)
+        room.price_per_night = price
+        room.amenities = amenities.split("|") if amenities else []
+        room.is_available = bool(is_available)
+        return room
+
+    def get_room(self, room_number):
+        """
+        Load a room by number; rooms are cached so each is materialized once.
+        :param room_number: int, room number
+        :return: Room object, or None if unknown
+        """
+        room = self._rooms.get(room_number)
+        if room is None:
+            row = self._conn.execute(SELECT_ROOM, (room_number,)).fetchone()
+            if row is None:
+                return None
+            room = self._rooms[room_number] = self._room_from_row(row)
+        return room
+
+    def load_rooms(self, stays_after=None):
+        """
+        Load every room with its booked stays rebuilt from the bookings table.
+        :param stays_after: date, only rebuild the stays ending after it (every stay if None)
+        :return: list, Room objects ordered by room number
+        :raises ValueError: if two stored bookings overlap in one room
+        """
+        rooms = []
+        for row in self._conn.execute(SELECT_ROOMS):
+            room = self._rooms.get(row[0]) or self._room_from_row(row)
+            self._rooms[room.room_number] = room
+            rooms.append(room)
+        if stays_after is None:
+            stays = self._conn.execute(SELECT_STAYS)
+        else:
+            stays = self._conn.execute(SELECT_CURRENT_STAYS, (stays_after.toordinal(),))
+        for room_number, check_in, check_out, booking_id in stays:
+            room = self._rooms[room_number]
+            if room.stays.overlaps(check_in, check_out):
+                # A room loaded before keeps its stays; anything else is a double booking on disk.
+                clash = next(stay for stay in room.stays if stay[0] < check_out and stay[1] > check_in)
+                if clash == (check_in, check_out, booking_id):
+                    continue
+                raise ValueError(f"Booking {booking_id} overlaps booking {clash[2]} in room {room_number}")
+            room.reserve(check_in, check_out, booking_id)
+        return rooms
+
+    def has_conflict(self, room_number, check_in, check_out):
+        """
+        Check the bookings index for a stay overlapping a date range.
+        :return: bool, True if the room is already booked in the range
+        """
+        row = self._conn.execute(SELECT_CONFLICT, (room_number, check_out.toordinal(), check_in.toordinal())).fetchone()
+        return row is not None
+
+    # Bookings
+
+    def _booking_rows(self, booking):
+        payment = booking.payment
+        invoice = booking.invoice
+        booking_row = (booking.booking_id, booking.guest.guest_id, booking.room.room_number,
+                       booking.check_in_date.toordinal(), booking.check_out_date.toordinal(),
+                       invoice["total"] if invoice else None)
+        if payment is None:
+            return booking_row, None
+        payment_row = (payment.transaction_id, booking.booking_id, payment.__class__.__name__,
+                       payment.amount, payment.payment_date,
+                       getattr(payment, "card_number", None), getattr(payment, "expiry_date", None),
+                       getattr(payment, "wallet_type", None), getattr(payment, "phone_number", None))
+        return booking_row, payment_row
+
+    def save_booking(self, booking):
+        """
+        Persist a booking, its payment and the guest's loyalty balance atomically.
+        :param booking: Booking object
+        """
+        self.save_bookings([booking])
+
+    def save_bookings(self, bookings):
+        """
+        Persist a batch of bookings in one transaction.
+        :param bookings: iterable, Booking objects
+        """
+        booking_rows, payment_rows, flexible_rows, guests = [], [], [], {}
+        for booking in bookings:
+            booking_row, payment_row = self._booking_rows(booking)
+            booking_rows.append(booking_row)
+            if payment_row is not None:
+                payment_rows.append(payment_row)
+            if booking.flexible:
+                flexible_rows.append((booking.booking_id,))
+            guests[booking.guest.guest_id] = booking.guest
+        with self._write_lock, self._conn:
+            self._conn.executemany(UPSERT_GUEST, (self._guest_row(guest) for guest in guests.values()))
+            self._conn.executemany(INSERT_BOOKING, booking_rows)
+            self._conn.executemany(INSERT_PAYMENT, payment_rows)
+            self._conn.executemany(INSERT_FLEXIBLE_BOOKING, flexible_rows)
+
+    def move_bookings(self, moves):
+        """
+        Reassign bookings to other rooms in one transaction.
+        :param moves: iterable, (booking_id, room_number) pairs
+        """
+        with self._write_lock, self._conn:
+            self._conn.executemany(MOVE_BOOKING, ((room_number, booking_id) for booking_id, room_number in moves))
+
+    def cancel_booking(self, booking, cancelled_on):
+        """
+        Archive a cancelled booking, drop it from the live tables and save the guest's loyalty balance.
+        :param booking: Booking object
+        :param cancelled_on: date, day of the cancellation
+        """
+        with self._write_lock, self._conn:
+            self._conn.execute(ARCHIVE_CANCELLED_BOOKING, (cancelled_on.isoformat(), booking.booking_id))
+            for statement in DELETE_CANCELLED_BOOKING:
+                self._conn.execute(statement, (booking.booking_id,))
+            self._conn.execute(UPSERT_GUEST, self._guest_row(booking.guest))
+
+    def change_booking(self, booking):
+        """
+        Save a booking's new room, dates and total together with the guest's loyalty balance.
+        :param booking: Booking object
+        """
+        invoice = booking.invoice
+        with self._write_lock, self._conn:
+            self._conn.execute(CHANGE_BOOKING, (booking.room.room_number, booking.check_in_date.toordinal(),
+                                                booking.check_out_date.toordinal(),
+                                                invoice["total"] if invoice else None, booking.booking_id))
+            self._conn.execute(UPSERT_GUEST, self._guest_row(booking.guest))
+
+    def flexible_booking_ids(self, start_date):
+        """
+        List the bookings made by room type that check in on or after a date.
+        :return: set, booking IDs
+        """
+        return {row[0] for row in self._conn.execute(SELECT_FLEXIBLE_BOOKING_IDS, (start_date.toordinal(),))}
+
+    def save_settlements(self, bookings):
+        """
+        Record the settlement outcome of many bookings' payments in one transaction.
+
+        Payments no longer stored (their booking was cancelled meanwhile) are skipped.
+        :param bookings: iterable, Booking objects whose invoice carries a payment status
+        """
+        rows = [(booking.invoice["payment_status"], booking.invoice.get("payment_reference"),
+                 booking.invoice.get("payment_error"), booking.payment.transaction_id)
+                for booking in bookings]
+        with self._write_lock, self._conn:
+            self._conn.executemany(UPSERT_SETTLEMENT, rows)
+
+    def unsettled_bookings(self):
+        """
+        Load the bookings whose payment has no recorded settlement outcome.
+        :return: list, Booking objects
+        """
+        return [self._booking_from_row(row) for row in self._conn.execute(SELECT_UNSETTLED_BOOKINGS)]
+
+    def _booking_from_row(self, row, guest=None):
+        (booking_id, guest_id, room_number, check_in, check_out, total, transaction_id, method,
+         amount, payment_date, card_number, expiry_date, wallet_type, phone_number, flexible,
+         payment_status, payment_reference, payment_error) = row
+        if guest is None:
+            guest = self.get_guest(guest_id, with_bookings=False)
+        booking = Booking(guest, self.get_room(room_number), date.fromordinal(check_in),
+                          date.fromordinal(check_out), booking_id, bool(flexible))
+        if method == "CreditCardPayment":
+            booking.set_payment(CreditCardPayment(amount, card_number, expiry_date, payment_date, transaction_id))
+        elif method == "MobileWalletPayment":
+            booking.set_payment(MobileWalletPayment(amount, wallet_type, phone_number, payment_date, transaction_id))
+        if total is not None:
+            booking.generate_invoice()
+            # Prices may have changed since; the stored total is what was invoiced.
+            booking.invoice["total"] = total
+        if payment_status is not None:
+            booking.record_settlement(payment_status, payment_reference, payment_error)
+        return booking
+
+    def has_booking_id(self, booking_id):
+        """
+        Check whether a booking ID is taken by a current or cancelled booking.
+        :return: bool, True if the ID is already used
+        """
+        return self._conn.execute(SELECT_BOOKING_ID, (booking_id, booking_id)).fetchone() is not None
+
+    def has_transaction_id(self, transaction_id):
+        """
+        Check whether a payment transaction ID is already stored.
+        :return: bool, True if the ID is already used
+        """
+        return self._conn.execute(SELECT_TRANSACTION_ID, (transaction_id,)).fetchone() is not None
+
+    def get_booking(self, booking_id):
+        """
+        Load a booking by ID.
+        :param booking_id: str, booking identifier
+        :return: Booking object, or None if unknown
+        """
+        row = self._conn.execute(SELECT_BOOKING, (booking_id,)).fetchone()
+        return None if row is None else self._booking_from_row(row)
+
+    def bookings_for_room(self, room_number):
+        """
+        Load the bookings of a room ordered by check-in date.
+        :return: list, Booking objects
+        """
+        return [self._booking_from_row(row) for row in self._conn.execute(SELECT_BOOKINGS_BY_ROOM, (room_number,))]
+
+    def report_rows(self, start_date, end_date):
+        """
+        Fetch the reporting columns of every stay overlapping a date range.
+        :return: cursor, (room_number, room_type, check_in, check_out, rate, payment_type) rows
+        """
+        return self._conn.execute(SELECT_REPORT_ROWS, (end_date.toordinal(), start_date.toordinal()))
+
+    def bookings_checking_in(self, start_date, end_date):
+        """
+        Load the bookings whose check-in falls in a date range.
+        :param start_date: date, first check-in date included
+        :param end_date: date, end of the range (exclusive)
+        :return: list, Booking objects ordered by check-in date
+        """
+        rows = self._conn.execute(SELECT_BOOKINGS_BY_CHECK_IN, (start_date.toordinal(), end_date.toordinal()))
+        return [self._booking_from_row(row) for row in rows]
+
+    # Service requests
+
+    def save_service_request(self, service_request):
+        """
+        Insert a service request, or update its status if it is already stored.
+        :param service_request: ServiceRequest object keyed to a guest
+        """
+        with self._write_lock, self._conn:
+            self._conn.execute(UPSERT_SERVICE_REQUEST, (
+                service_request.request_id, service_request.guest_id, service_request.room_number,
+                service_request.request_type, service_request.details, service_request.status,
+                service_request.request_date))
+
+    def open_service_requests(self):
+        """
+        Load the service requests not yet done, oldest first.
+        :return: list, ServiceRequest objects
+        """
+        return [ServiceRequest(request_type, details, status, request_date, request_id, guest_id, room_number)
+                for request_id, guest_id, room_number, request_type, details, status, request_date
+                in self._conn.execute(SELECT_OPEN_SERVICE_REQUESTS)]
+
+    # Loyalty ledger
+
+    def save_ledger_entries(self, entries):
+        """
+        Append loyalty ledger rows.
+        :param entries: iterable, (account_id, day ordinal, points, kind, reference) rows
+        """
+        with self._write_lock, self._conn:
+            self._conn.executemany(INSERT_LEDGER_ENTRY, entries)
+
+    def load_ledger_entries(self):
+        """
+        Load the whole loyalty ledger in the order it was written.
+        :return: list, (account_id, day ordinal, points, kind, reference) rows
+        """
+        return self._conn.execute(SELECT_LEDGER_ENTRIES).fetchall()
+
+    def ledger_entries(self, account_id):
+        """
+        Load one account's loyalty ledger rows in the order they were written.
+        :return: list, (account_id, day ordinal, points, kind, reference) rows
+        """
+        return self._conn.execute(SELECT_ACCOUNT_LEDGER_ENTRIES, (account_id,)).fetchall()
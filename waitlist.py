@@ -0,0 +1,345 @@
+import threading
+from bisect import bisect_left, insort
+from datetime import date
+
+from hotel.booking_service import BookingConflictError
+from hotel.ids import new_id
+
+
+WAITING = "Waiting"
+OFFERED = "Offered"
+BOOKED = "Booked"
+EXPIRED = "Expired"
+LEFT = "Left"
+
+# Seconds a guest has to confirm a room offered from the waitlist.
+OFFER_TTL = 3600
+# End of a "whole calendar" freed range, used when a room comes back into service.
+_FOREVER = date.max.toordinal() + 1
+
+
+class WaitlistEntry:
+    """
+    A guest waiting for a room of a class to free up for a stay.
+    """
+    __slots__ = ("_entry_id", "_guest", "_room_type", "_check_in_date", "_check_out_date", "_sequence", "_status",
+                 "_hold", "_passed")
+
+    def __init__(self, entry_id, guest, room_type, check_in_date, check_out_date, sequence):
+        self._entry_id = entry_id
+        self._guest = guest
+        self._room_type = room_type
+        self._check_in_date = check_in_date
+        self._check_out_date = check_out_date
+        self._sequence = sequence
+        self._status = WAITING
+        self._hold = None
+        # Rooms whose offer the guest let lapse; they are not offered to this entry again.
+        self._passed = frozenset()
+
+    @property
+    def entry_id(self):
+        return self._entry_id
+
+    @property
+    def guest(self):
+        return self._guest
+
+    @property
+    def room_type(self):
+        return self._room_type
+
+    @property
+    def check_in_date(self):
+        return self._check_in_date
+
+    @property
+    def check_out_date(self):
+        return self._check_out_date
+
+    @property
+    def status(self):
+        return self._status
+
+    @property
+    def hold(self):
+        return self._hold
+
+    def _key(self):
+        return self._check_in_date.toordinal(), self._sequence
+
+    def __str__(self):
+        return (f"Waitlist {self._entry_id}: {self._room_type or 'any room'} from {self._check_in_date} "
+                f"to {self._check_out_date} ({self._status})")
+
+
+class Waitlist:
+    """
+    Guests waiting for sold-out stays, matched against inventory as it frees up.
+
+    Waiting entries are indexed per room class (None for any class) in a
+    list sorted by check-in, with the longest stay waiting in each class.
+    The index listens to every room: releasing a stay records the freed
+    nights. match() merges the nights freed since the last run per room and,
+    for each run, bisects out only the entries that overlap it (those
+    checking in before it ends and at most the longest stay before it
+    starts) instead of scanning the whole list. Candidates are served first
+    come, first served, and a match places a hold on the room for the guest,
+    who confirms it by booking with the hold. A booked or given back offer
+    leaves the waitlist; one left to expire goes back to waiting behind the
+    guests already there, for any room but the one it passed up. Entries
+    whose check-in has passed are dropped as Expired, so only stays that can
+    still be served are kept. Entries are kept in memory only.
+    """
+    def __init__(self, rooms, inventory, holds, ttl=OFFER_TTL, on_offer=None):
+        """
+        Initialize the waitlist.
+        :param rooms: iterable, Room objects whose freed stays are matched
+        :param inventory: InventoryIndex, for finding a free room when a guest joins
+        :param holds: HoldManager, places the holds offered to matched guests
+        :param ttl: float, seconds an offered hold lasts
+        :param on_offer: callable, called with each WaitlistEntry when it is offered a room
+        """
+        self._inventory = inventory
+        self._holds = holds
+        self._ttl = ttl
+        self._on_offer = on_offer
+        self._lock = threading.RLock()
+        self._freed_lock = threading.Lock()
+        self._freed = []
+        self._entries = {}
+        self._offers = {}
+        self._index = {}
+        self._max_nights = {}
+        self._sequence = 0
+        self.offered = 0
+        for room in rooms:
+            self.add_room(room)
+
+    def __len__(self):
+        return sum(len(keys) for keys in self._index.values())
+
+    def add_room(self, room):
+        """
+        Start following a room's released stays.
+        """
+        room.add_listener(self._on_room_changed)
+
+    def _on_room_changed(self, room, field, old_value):
+        # Runs under the booking service's room lock: only note what was freed.
+        if field == "stays":
+            start, end, delta = old_value
+            if delta < 0:
+                with self._freed_lock:
+                    self._freed.append((room, start, end))
+        elif field == "is_available" and room.is_available and not old_value:
+            with self._freed_lock:
+                self._freed.append((room, 0, _FOREVER))
+
+    def get(self, entry_id):
+        """
+        Look up a waitlist entry.
+        :return: WaitlistEntry, or None if unknown or left
+        """
+        return self._entries.get(entry_id)
+
+    def entries_for(self, guest_id):
+        """
+        List a guest's waiting and offered entries, oldest first.
+        :return: list, WaitlistEntry objects
+        """
+        with self._lock:
+            return sorted((entry for entry in self._entries.values() if entry.guest.guest_id == guest_id),
+                          key=lambda entry: entry._sequence)
+
+    def join(self, guest, room_type, check_in, check_out):
+        """
+        Put a guest on the waitlist, or offer a room at once if one is already free.
+        :param guest: Guest object
+        :param room_type: str, room class name, or None for any class
+        :param check_in: date, check-in date
+        :param check_out: date, check-out date (exclusive)
+        :return: WaitlistEntry object
+        """
+        if check_out <= check_in:
+            raise ValueError("Check-out date must be after check-in date")
+        if room_type is not None and room_type not in self._inventory.room_types():
+            raise ValueError(f"Unknown room type: {room_type}")
+        with self._lock:
+            self._sequence += 1
+            entry = WaitlistEntry(new_id(), guest, room_type, check_in, check_out, self._sequence)
+            self._entries[entry.entry_id] = entry
+            for room in self._inventory.find(room_type, check_in=check_in, check_out=check_out):
+                if self._offer(entry, room):
+                    return entry
+            self._index_entry(entry)
+        return entry
+
+    def _index_entry(self, entry):
+        insort(self._index.setdefault(entry.room_type, []), (entry._key(), entry))
+        nights = (entry.check_out_date - entry.check_in_date).days
+        if nights > self._max_nights.get(entry.room_type, 0):
+            self._max_nights[entry.room_type] = nights
+
+    def _unindex(self, entry):
+        keys = self._index[entry.room_type]
+        del keys[bisect_left(keys, (entry._key(),))]
+
+    def leave(self, entry_id):
+        """
+        Take a guest off the waitlist, giving back a room offered and not yet booked.
+        :return: bool, True if the entry was known
+        """
+        with self._lock:
+            entry = self._entries.pop(entry_id, None)
+            if entry is None:
+                return False
+            if entry.status == WAITING:
+                self._unindex(entry)
+            else:
+                self._offers.pop(entry.hold.hold_id, None)
+            status, entry._status = entry.status, LEFT
+        if status == OFFERED:
+            self._holds.release(entry.hold.hold_id)
+        return True
+
+    def _offer(self, entry, room):
+        """
+        Hold a room for an entry's stay.
+        :return: bool, False if the room was taken meanwhile
+        """
+        try:
+            entry._hold = self._holds.hold(entry.guest, room, entry.check_in_date, entry.check_out_date, self._ttl)
+        except BookingConflictError:
+            return False
+        entry._status = OFFERED
+        self._offers[entry.hold.hold_id] = entry
+        self.offered += 1
+        if self._on_offer:
+            self._on_offer(entry)
+        return True
+
+    def _retire(self, hold_id, status):
+        with self._lock:
+            entry = self._offers.pop(hold_id, None)
+            if entry is None:
+                return None
+            del self._entries[entry.entry_id]
+            entry._status = status
+        return entry
+
+    def confirmed(self, hold_id):
+        """
+        Take an entry off the waitlist once the guest has booked the hold it was offered.
+        :param hold_id: str, ID of the booked hold
+        :return: WaitlistEntry, the booked entry, or None if the hold was not a waitlist offer
+        """
+        return self._retire(hold_id, BOOKED)
+
+    def declined(self, hold_id):
+        """
+        Take an entry off the waitlist once the guest has given back the hold it was offered.
+        :param hold_id: str, ID of the released hold
+        :return: WaitlistEntry, the entry, now Left, or None if the hold was not a waitlist offer
+        """
+        return self._retire(hold_id, LEFT)
+
+    def lapsed(self, hold_id, today=None):
+        """
+        Put an entry whose offered hold expired on the waitlist again, behind those waiting.
+
+        The room it let go is not offered to it again, so an absent guest
+        cannot keep one room blocked by being re-offered it every OFFER_TTL.
+        :param hold_id: str, ID of the expired hold
+        :param today: date, entries checking in before it are dropped instead (default: today)
+        :return: WaitlistEntry, the entry, Waiting again or Expired, or None if the hold was not a waitlist offer
+        """
+        with self._lock:
+            entry = self._offers.pop(hold_id, None)
+            if entry is None:
+                return None
+            entry._passed |= {entry.hold.room.room_number}
+            entry._hold = None
+            if entry.check_in_date < (today or date.today()):
+                del self._entries[entry.entry_id]
+                entry._status = EXPIRED
+            else:
+                self._sequence += 1
+                entry._sequence = self._sequence
+                entry._status = WAITING
+                self._index_entry(entry)
+        return entry
+
+    def _expire(self, today):
+        """
+        Drop the waiting entries checking in before a day; they can no longer be served.
+        """
+        cutoff = ((today.toordinal(),),)
+        for keys in self._index.values():
+            stale = bisect_left(keys, cutoff)
+            for _, entry in keys[:stale]:
+                del self._entries[entry.entry_id]
+                entry._status = EXPIRED
+            del keys[:stale]
+
+    def _overlapping(self, room_type, start, end):
+        """
+        Waiting entries of one index key whose stay overlaps the nights [start, end).
+        """
+        keys = self._index.get(room_type)
+        if not keys:
+            return
+        low = bisect_left(keys, ((start - self._max_nights[room_type] + 1,),))
+        high = bisect_left(keys, ((end,),))
+        for index in range(low, high):
+            entry = keys[index][1]
+            if entry.check_out_date.toordinal() > start:
+                yield entry
+
+    def match(self, today=None):
+        """
+        Offer the rooms freed since the last run to the guests waiting for them.
+        :param today: date, waiting entries checking in before it expire first (default: today)
+        :return: list, WaitlistEntry objects offered a room, in waitlist order
+        """
+        with self._lock:
+            self._expire(today or date.today())
+        with self._freed_lock:
+            freed, self._freed = self._freed, []
+        if not freed:
+            return []
+        runs = {}
+        for room, start, end in freed:
+            runs.setdefault(room, []).append((start, end))
+        with self._lock:
+            candidates = {}
+            for room, ranges in runs.items():
+                ranges.sort()
+                merged = [list(ranges[0])]
+                for start, end in ranges[1:]:
+                    if start <= merged[-1][1]:
+                        merged[-1][1] = max(merged[-1][1], end)
+                    else:
+                        merged.append([start, end])
+                for start, end in merged:
+                    for room_type in (room.__class__.__name__, None):
+                        for entry in self._overlapping(room_type, start, end):
+                            candidates.setdefault(entry, {})[room] = None
+            offered = []
+            for entry in sorted(candidates, key=lambda entry: entry._sequence):
+                for room in candidates[entry]:
+                    if room.room_number in entry._passed:
+                        continue
+                    if room.is_available_for(entry.check_in_date, entry.check_out_date) and self._offer(entry, room):
+                        self._unindex(entry)
+                        offered.append(entry)
+                        break
+        return offered
+
+    def stats(self):
+        """
+        Snapshot of the waitlist counters.
+        :return: dict, waiting entries, outstanding offers, offers made and freed runs awaiting a match
+        """
+        return {"waiting": len(self), "outstanding_offers": len(self._offers), "offered": self.offered,
+                "freed_pending": len(self._freed)}